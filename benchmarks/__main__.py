@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from typing import List, Optional
+
+import migrations
+from benchmarks import baseline
+from benchmarks.dataset import CampusSpec, generate
+from benchmarks.runner import build_client, load_campus, run_mix
+from models import SessionLocal, engine, async_engine
+
+
+def generate_campus(args: argparse.Namespace) -> int:
+    migrations.migrate(engine)
+    spec = CampusSpec(
+        buildings=args.buildings,
+        rooms_per_building=args.rooms_per_building,
+        lecturers=args.lecturers,
+        schedules_per_lecturer=args.schedules_per_lecturer,
+        semester_start=args.semester_start,
+        weeks=args.weeks,
+        seed=args.seed,
+    )
+    db = SessionLocal()
+    try:
+        counts = generate(db, spec)
+    finally:
+        db.close()
+    print(", ".join(f"{count} {name}" for name, count in counts.items()))
+    return 0
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    db = SessionLocal()
+    try:
+        campus = load_campus(db)
+    finally:
+        db.close()
+    async with build_client(args.url) as client:
+        report = await run_mix(
+            client, campus,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            warmup=args.warmup,
+            seed=args.seed,
+        )
+    # the in-process app shares this loop, close its connections before asyncio.run tears the loop down
+    await async_engine.dispose()
+    report["meta"] = {
+        "target": args.url or "in-process",
+        "database": engine.url.get_backend_name(),
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "seed": args.seed,
+        "recorded_at": datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+    }
+    return report
+
+
+def run(args: argparse.Namespace) -> int:
+    report = asyncio.run(run_benchmark(args))
+    print(baseline.format_report(report))
+    if args.output:
+        baseline.save(report, args.output)
+    if not args.baseline:
+        return 0
+
+    regressions = baseline.compare(report, baseline.load(args.baseline), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Synthetic campus load tests")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="Migrate and fill an empty database with a synthetic campus")
+    generate_parser.add_argument("--buildings", type=int, default=10)
+    generate_parser.add_argument("--rooms-per-building", type=int, default=20)
+    generate_parser.add_argument("--lecturers", type=int, default=200)
+    generate_parser.add_argument("--schedules-per-lecturer", type=int, default=3)
+    generate_parser.add_argument(
+        "--semester-start", type=lambda value: datetime.strptime(value, "%Y-%m-%d").date(),
+        default=CampusSpec.semester_start, help="YYYY-MM-DD"
+    )
+    generate_parser.add_argument("--weeks", type=int, default=15)
+    generate_parser.add_argument("--seed", type=int, default=42)
+    generate_parser.set_defaults(handler=generate_campus)
+
+    run_parser = commands.add_parser("run", help="Run the request mix and report throughput and latency per route")
+    run_parser.add_argument("--url", help="Base URL of a running server, the app runs in-process when omitted")
+    run_parser.add_argument("--concurrency", type=int, default=8)
+    run_parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    run_parser.add_argument("--warmup", type=float, default=1.0, help="Unmeasured seconds before the run")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", help="Write the JSON report here, e.g. to record a new baseline")
+    run_parser.add_argument("--baseline", help="Fail when the run regresses against this JSON report")
+    run_parser.add_argument("--tolerance", type=float, default=baseline.DEFAULT_TOLERANCE)
+    run_parser.set_defaults(handler=run)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import json
+from typing import Any, Dict, List
+
+# Relative slack before a change counts as a regression, benchmark noise on a laptop is easily 10-15%.
+DEFAULT_TOLERANCE = 0.25
+# routes with fewer baseline samples than this are reported but never gate, their p99 is noise
+MIN_SAMPLES = 20
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as file:
+        return json.load(file)
+
+
+def save(report: Dict[str, Any], path: str):
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    regressions = []
+    routes = dict(report["routes"], total=report["total"])
+    baseline_routes = dict(baseline["routes"], total=baseline["total"])
+    for name, expected in baseline_routes.items():
+        actual = routes.get(name)
+        if actual is None or expected["requests"] < MIN_SAMPLES:
+            continue
+        if not actual["requests"]:
+            regressions.append(f"{name}: no requests completed")
+            continue
+        if actual["p99_ms"] > expected["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {actual['p99_ms']:.1f}ms, baseline {expected['p99_ms']:.1f}ms")
+        if actual["throughput"] < expected["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {actual['throughput']:.1f}/s, baseline {expected['throughput']:.1f}/s"
+            )
+        if actual["errors"] / actual["requests"] > expected["errors"] / expected["requests"] + 0.01:
+            regressions.append(f"{name}: {actual['errors']} errors in {actual['requests']} requests")
+    return regressions
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'route':<22}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"]
+    for name, route in sorted(report["routes"].items()) + [("total", report["total"])]:
+        lines.append(
+            f"{name:<22}{route['requests']:>10}{route['errors']:>8}{route['throughput']:>10.1f}"
+            f"{route['p50_ms']:>10.2f}{route['p99_ms']:>10.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+import random
+from dataclasses import dataclass, asdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from models import Building, Room, Lecturer, Schedule, RoomReservation, TimeBlock, Gender, Faculty
+from services import occupancy
+from utils.crypto import get_password_hash
+
+BENCH_PASSWORD = "bench-password"
+INSERT_CHUNK_SIZE = 5000
+BLOCKS = list(TimeBlock)
+
+
+@dataclass
+class CampusSpec:
+    buildings: int = 10
+    rooms_per_building: int = 20
+    lecturers: int = 200
+    schedules_per_lecturer: int = 3
+    semester_start: date = date(2024, 1, 8)
+    weeks: int = 15
+    seed: int = 42
+
+    def describe(self) -> Dict[str, Any]:
+        spec = asdict(self)
+        spec["semester_start"] = self.semester_start.isoformat()
+        return spec
+
+
+def bench_username(index: int) -> str:
+    return f"bench{index}"
+
+
+def insert_returning_ids(session: Session, model, rows: List[Dict[str, Any]]) -> List[int]:
+    ids = []
+    for offset in range(0, len(rows), INSERT_CHUNK_SIZE):
+        ids.extend(session.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True),
+            rows[offset:offset + INSERT_CHUNK_SIZE]
+        ).scalars().all())
+    return ids
+
+
+# Fills an empty database with a deterministic campus: the same spec always produces the same rows.
+def generate(session: Session, spec: CampusSpec) -> Dict[str, int]:
+    if session.scalar(select(Lecturer.id).where(Lecturer.username == bench_username(0))) is not None:
+        raise ValueError("Benchmark data already exists, generate into an empty database")
+
+    rng = random.Random(spec.seed)
+    building_ids = insert_returning_ids(session, Building, [
+        {"name": f"Building {index}", "code": f"B{index}"} for index in range(spec.buildings)
+    ])
+    room_ids = insert_returning_ids(session, Room, [
+        {
+            "name": f"Room {building_index}.{index}",
+            "code": f"B{building_index}-{index}",
+            "capacity": rng.choice((20, 30, 40, 60, 120)),
+            "building_id": building_id,
+        }
+        for building_index, building_id in enumerate(building_ids)
+        for index in range(spec.rooms_per_building)
+    ])
+
+    # one hash for every lecturer, hashing thousands of passwords would dominate generation time
+    password = get_password_hash(BENCH_PASSWORD)
+    lecturer_ids = insert_returning_ids(session, Lecturer, [
+        {
+            "username": bench_username(index),
+            "password": password,
+            "first_name": "Bench",
+            "last_name": str(index),
+            "email": f"{bench_username(index)}@bench.local",
+            "dob": datetime(1980, 1, 1) + timedelta(days=rng.randrange(7000)),
+            "gender": rng.choice(list(Gender)),
+            "faculty": rng.choice(list(Faculty)),
+            "enabled": True,
+            "active": True,
+        }
+        for index in range(spec.lecturers)
+    ])
+
+    schedules = []
+    for lecturer_id in lecturer_ids:
+        for index in range(spec.schedules_per_lecturer):
+            start = rng.randrange(len(BLOCKS))
+            end = min(start + rng.choice((0, 1, 2)), len(BLOCKS) - 1)
+            schedules.append({
+                "lecturer_id": lecturer_id,
+                "course": f"Course {lecturer_id}.{index}",
+                "start_block": BLOCKS[start].value,
+                "end_block": BLOCKS[end].value,
+            })
+    schedule_ids = insert_returning_ids(session, Schedule, schedules)
+
+    # every schedule meets once a week in the same room, weekly slots are packed without overlaps
+    used: Dict[tuple, int] = {}
+    reservations = []
+    for schedule_id, schedule in zip(schedule_ids, schedules):
+        mask = occupancy.block_mask(schedule["start_block"], schedule["end_block"])
+        for _ in range(20):
+            room_id, weekday = rng.choice(room_ids), rng.randrange(5)
+            if not used.get((room_id, weekday), 0) & mask:
+                break
+        else:
+            continue
+        used[(room_id, weekday)] = used.get((room_id, weekday), 0) | mask
+        first_day = spec.semester_start + timedelta(days=weekday)
+        for week in range(spec.weeks):
+            day = first_day + timedelta(weeks=week)
+            reservations.append({
+                "room_id": room_id,
+                "schedule_id": schedule_id,
+                "lecturer_id": schedule["lecturer_id"],
+                "date": datetime(day.year, day.month, day.day),
+                "start_block": schedule["start_block"],
+                "end_block": schedule["end_block"],
+            })
+    for offset in range(0, len(reservations), INSERT_CHUNK_SIZE):
+        session.execute(insert(RoomReservation), reservations[offset:offset + INSERT_CHUNK_SIZE])
+
+    occupancy_rows = occupancy.rebuild(session)
+    session.commit()
+    return {
+        "buildings": len(building_ids),
+        "rooms": len(room_ids),
+        "lecturers": len(lecturer_ids),
+        "schedules": len(schedule_ids),
+        "reservations": len(reservations),
+        "occupancy_rows": occupancy_rows,
+    }
@@ -0,0 +1,190 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from benchmarks.dataset import BENCH_PASSWORD, bench_username
+from models import Building, Room, Lecturer, Schedule, RoomReservation, TimeBlock
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+BLOCKS = list(TimeBlock)
+
+
+@dataclass
+class Campus:
+    building_ids: List[int]
+    room_ids: List[int]
+    lecturer_ids: List[int]
+    schedule_ids: List[int]
+    semester_days: List[date]
+
+
+def load_campus(session: Session) -> Campus:
+    days = sorted({value.date() for value in session.scalars(select(RoomReservation.date).distinct())})
+    return Campus(
+        building_ids=list(session.scalars(select(Building.id).order_by(Building.id))),
+        room_ids=list(session.scalars(select(Room.id).order_by(Room.id))),
+        lecturer_ids=list(session.scalars(select(Lecturer.id).order_by(Lecturer.id))),
+        schedule_ids=list(session.scalars(select(Schedule.id).order_by(Schedule.id))),
+        semester_days=days or [date.today()],
+    )
+
+
+def format_day(day: date) -> str:
+    return day.strftime(DATE_FORMAT)
+
+
+def random_blocks(rng: random.Random) -> Tuple[str, str]:
+    start = rng.randrange(len(BLOCKS))
+    return BLOCKS[start].value, BLOCKS[min(start + rng.randrange(3), len(BLOCKS) - 1)].value
+
+
+# A request builder returns (path, query params, json body) for one call.
+Builder = Callable[[random.Random, Campus], Tuple[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    weight: int
+    build: Builder
+    expected: Tuple[int, ...] = (200,)
+    auth: bool = False
+
+
+def create_reservation(rng: random.Random, campus: Campus):
+    # weekends are outside the generated timetable, so most of these succeed and the rest conflict
+    day = rng.choice(campus.semester_days)
+    day += timedelta(days=5 + rng.randrange(2) - day.weekday())
+    start_block, end_block = random_blocks(rng)
+    return "/reservation/", None, {
+        "room_id": rng.choice(campus.room_ids),
+        "schedule_id": rng.choice(campus.schedule_ids),
+        "date": format_day(day),
+        "start_block": start_block,
+        "end_block": end_block,
+    }
+
+
+def available_rooms(rng: random.Random, campus: Campus):
+    start_block, end_block = random_blocks(rng)
+    return "/room/available", {
+        "date": format_day(rng.choice(campus.semester_days)),
+        "start_block": start_block,
+        "end_block": end_block,
+    }, None
+
+
+DEFAULT_MIX: List[Scenario] = [
+    Scenario("list_buildings", "GET", 8, lambda rng, campus: ("/building/", {"limit": 20}, None)),
+    Scenario("get_building", "GET", 8, lambda rng, campus: (f"/building/{rng.choice(campus.building_ids)}", None, None)),
+    Scenario("list_rooms", "GET", 8, lambda rng, campus: ("/room/", {"limit": 50}, None)),
+    Scenario("get_room", "GET", 10, lambda rng, campus: (f"/room/{rng.choice(campus.room_ids)}", None, None)),
+    Scenario("available_rooms", "GET", 15, available_rooms),
+    Scenario("list_reservations", "GET", 12, lambda rng, campus: ("/reservation/", {"limit": 50}, None)),
+    Scenario("get_lecturer", "GET", 6, lambda rng, campus: (f"/lecturer/{rng.choice(campus.lecturer_ids)}", None, None)),
+    Scenario("get_schedule", "GET", 6, lambda rng, campus: (f"/schedule/{rng.choice(campus.schedule_ids)}", None, None)),
+    Scenario("create_reservation", "POST", 4, create_reservation, expected=(201, 409), auth=True),
+]
+
+
+@dataclass
+class RouteStats:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(stats: RouteStats, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(stats.latencies)
+    return {
+        "requests": len(ordered),
+        "errors": stats.errors,
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "statuses": {str(code): count for code, count in sorted(stats.statuses.items())},
+    }
+
+
+async def login(client: httpx.AsyncClient) -> Dict[str, str]:
+    response = await client.post("/auth/token", data={"username": bench_username(0), "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_mix(
+        client: httpx.AsyncClient,
+        campus: Campus,
+        mix: List[Scenario] = DEFAULT_MIX,
+        concurrency: int = 8,
+        duration: float = 10.0,
+        warmup: float = 1.0,
+        seed: int = 42,
+) -> Dict[str, Any]:
+    headers = await login(client)
+    stats: Dict[str, RouteStats] = {scenario.name: RouteStats() for scenario in mix}
+    weights = [scenario.weight for scenario in mix]
+    recording = False
+
+    async def worker(index: int, deadline: float):
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(mix, weights)[0]
+            path, params, body = scenario.build(rng, campus)
+            started = time.perf_counter()
+            try:
+                response = await client.request(
+                    scenario.method, path, params=params, json=body,
+                    headers=headers if scenario.auth else None
+                )
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            elapsed = time.perf_counter() - started
+            if recording:
+                route = stats[scenario.name]
+                route.latencies.append(elapsed)
+                route.statuses[status] += 1
+                route.errors += status not in scenario.expected
+
+    if warmup:
+        await asyncio.gather(*(worker(index, time.perf_counter() + warmup) for index in range(concurrency)))
+
+    recording = True
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index, started + duration) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    total = RouteStats()
+    for route in stats.values():
+        total.latencies.extend(route.latencies)
+        total.statuses.update(route.statuses)
+        total.errors += route.errors
+    return {
+        "elapsed_seconds": elapsed,
+        "routes": {name: summarize(route, elapsed) for name, route in stats.items()},
+        "total": summarize(total, elapsed),
+    }
+
+
+def build_client(url: Optional[str]) -> httpx.AsyncClient:
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=30)
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=30)
@@ -43,6 +43,7 @@ class RoomInfo(BaseModel):
     id: Optional[int] = None
     name: Optional[str] = None
     code: Optional[str] = None
+    building_id: Optional[int] = None
     building: Optional["BuildingInfo"] = None
     capacity: Optional[int] = None
     reservations: Optional[List["RoomReservationInfo"]] = None
@@ -66,8 +67,149 @@ class RoomReservationUpdate(BaseModel):
     end_block: Optional[str] = None
 
 
+class RoomReservationBulkCreate(BaseModel):
+    schedule_id: int
+    room_id: int
+    lecturer_id: Optional[int] = None
+    start_date: str
+    end_date: str
+    # 0 = Monday ... 6 = Sunday
+    weekdays: List[int]
+
+
+class RoomReservationBulkResult(BaseModel):
+    date: str
+    accepted: bool
+    reservation_id: Optional[int] = None
+    error_message: Optional[str] = None
+
+
+class RoomAssignmentRequest(BaseModel):
+    start_date: str
+    end_date: str
+    # 0 = Monday ... 6 = Sunday
+    weekdays: List[int]
+    # defaults to every schedule without a reservation in the term
+    schedule_ids: Optional[List[int]] = None
+    faculty: Optional[Faculty] = None
+    building_ids: Optional[List[int]] = None
+    min_capacity: Optional[int] = None
+
+
+class ScheduleAssignment(BaseModel):
+    schedule_id: int
+    room_id: Optional[int] = None
+    building_id: Optional[int] = None
+
+
+class RoomAssignmentPlan(BaseModel):
+    assignments: List[ScheduleAssignment]
+    assigned: int
+    unassigned: int
+    building_changes: int
+    partitions: int
+    elapsed_ms: float
+
+
+class RoomAssignmentCommit(BaseModel):
+    start_date: str
+    end_date: str
+    weekdays: List[int]
+    assignments: List[ScheduleAssignment]
+
+
+class RoomAssignmentResult(BaseModel):
+    schedules: int
+    reservations: int
+
+
+class ReservationOverlapInfo(BaseModel):
+    # "room" or "lecturer", owner_id is the room or lecturer that is double booked
+    kind: str
+    owner_id: int
+    date: str
+    reservation_ids: List[int]
+    start_block: str
+    end_block: str
+
+
+class ReservationAuditInfo(BaseModel):
+    run_id: int
+    mode: str
+    since: Optional[str] = None
+    rows_scanned: int
+    room_conflicts: int
+    lecturer_conflicts: int
+    overlaps: List[ReservationOverlapInfo]
+
+
+class RoomUtilization(BaseModel):
+    start_date: str
+    end_date: str
+    days: int
+    blocks: List[str]
+    weekdays: List[str]
+    # shares of reserved (room, day, block) slots between 0 and 1
+    rate: float
+    block_rates: List[float]
+    peak_blocks: List[str]
+    # matrices are row per weekday, building or room and column per block
+    weekday_block_rates: List[List[float]]
+    building_ids: List[int]
+    building_rates: List[float]
+    building_block_rates: List[List[float]]
+    room_ids: List[int]
+    room_building_ids: List[int]
+    room_rates: List[float]
+    room_block_rates: List[List[float]]
+    idle_room_ids: List[int]
+
+
+class TimetableImportError(BaseModel):
+    line: int
+    error_message: str
+
+
+class TimetableImportResult(BaseModel):
+    rows: int
+    imported: int
+    rejected: int
+    schedules_created: int
+    errors: List[TimetableImportError] = []
+
+
+class TimetableEntry(BaseModel):
+    reservation_id: int
+    schedule_id: int
+    course: Optional[str] = None
+    room_id: int
+    room_code: Optional[str] = None
+    lecturer_id: int
+    lecturer_username: Optional[str] = None
+    start_block: str
+    end_block: str
+
+
+class TimetableDay(BaseModel):
+    date: str
+    # one list per TimeBlock holding indexes into Timetable.entries, empty when the block is free
+    blocks: List[List[int]]
+
+
+class Timetable(BaseModel):
+    week: str
+    start_date: str
+    end_date: str
+    blocks: List[str]
+    entries: List[TimetableEntry]
+    days: List[TimetableDay]
+
+
 class RoomReservationInfo(BaseModel):
     id: Optional[int] = None
+    schedule_id: Optional[int] = None
+    room_id: Optional[int] = None
+    lecturer_id: Optional[int] = None
     schedule: Optional['ScheduleInfo'] = None
     room: Optional["RoomInfo"] = None
     lecturer: Optional["LecturerInfo"] = None
@@ -133,6 +275,7 @@ class LectureUpdate(BaseModel):
 
 class ScheduleInfo(BaseModel):
     id: Optional[int] = None
+    lecturer_id: Optional[int] = None
     reservations: Optional[List["RoomReservationInfo"]] = None
     lecturer: Optional["LecturerInfo"] = None
     course: Optional[str] = None
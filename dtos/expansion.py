@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Type
+
+from pydantic import BaseModel
+
+from dtos.dtos import BuildingInfo, LecturerInfo, RoomInfo, ScheduleInfo, RoomReservationInfo
+from models import Building, Lecturer, Room, Schedule, RoomReservation
+
+# ?include=rooms.reservations,rooms.building expands relations as a tree, everything else stays shallow.
+Include = Dict[str, "Include"]
+
+MAX_INCLUDE_DEPTH = 3
+
+# relation name -> resource it points to, per resource
+RELATIONS: Dict[str, Dict[str, str]] = {
+    "building": {"rooms": "room"},
+    "room": {"building": "building", "reservations": "reservation"},
+    "lecturer": {"schedules": "schedule", "reservations": "reservation"},
+    "schedule": {"lecturer": "lecturer", "reservations": "reservation"},
+    "reservation": {"room": "room", "lecturer": "lecturer", "schedule": "schedule"},
+}
+TO_MANY = {"rooms", "reservations", "schedules"}
+
+INFO_MODELS: Dict[str, Type[BaseModel]] = {
+    "building": BuildingInfo,
+    "room": RoomInfo,
+    "lecturer": LecturerInfo,
+    "schedule": ScheduleInfo,
+    "reservation": RoomReservationInfo,
+}
+RESOURCE_MODELS = {
+    "building": Building,
+    "room": Room,
+    "lecturer": Lecturer,
+    "schedule": Schedule,
+    "reservation": RoomReservation,
+}
+
+
+def _split(value: Optional[str]) -> List[List[str]]:
+    if not value:
+        return []
+    return [path.strip().split(".") for path in value.split(",") if path.strip()]
+
+
+def parse_include(resource: str, value: Optional[str]) -> Include:
+    include: Include = {}
+    for path in _split(value):
+        if len(path) > MAX_INCLUDE_DEPTH:
+            raise ValueError(f"include {'.'.join(path)} is deeper than {MAX_INCLUDE_DEPTH} levels")
+        node, current = include, resource
+        for relation in path:
+            if relation not in RELATIONS[current]:
+                raise ValueError(f"Unknown relation {relation} on {current}")
+            node = node.setdefault(relation, {})
+            current = RELATIONS[current][relation]
+    return include
+
+
+def parse_fields(resource: str, value: Optional[str]) -> Optional[Dict[str, Any]]:
+    # turns dotted paths into the include argument of model_dump, list relations select through "__all__"
+    paths = _split(value)
+    if not paths:
+        return None
+    selection: Dict[str, Any] = {}
+    for path in paths:
+        node, current = selection, resource
+        for depth, name in enumerate(path):
+            if name not in INFO_MODELS[current].model_fields:
+                raise ValueError(f"Unknown field {name} on {current}")
+            if depth == len(path) - 1:
+                node[name] = True
+                break
+            if name not in RELATIONS[current]:
+                raise ValueError(f"Field {name} on {current} has no nested fields")
+            if node.get(name) is True:
+                break
+            child = node.setdefault(name, {"__all__": {}} if name in TO_MANY else {})
+            node = child["__all__"] if name in TO_MANY else child
+            current = RELATIONS[current][name]
+    return selection
+
+
+def included_resources(resource: str, include: Include) -> List[str]:
+    resources = [resource]
+    for relation, nested in include.items():
+        for name in included_resources(RELATIONS[resource][relation], nested):
+            if name not in resources:
+                resources.append(name)
+    return resources
+
+
+@dataclass(frozen=True)
+class Expansion:
+    resource: str
+    include: Include
+    fields: Optional[Dict[str, Any]]
+
+    @property
+    def resources(self) -> FrozenSet[str]:
+        return frozenset(included_resources(self.resource, self.include))
+
+    @property
+    def models(self) -> List[Any]:
+        # the resource's own model first, then every model its expanded relations read
+        return [RESOURCE_MODELS[name] for name in included_resources(self.resource, self.include)]
+
+    def render(self, info: BaseModel) -> Any:
+        return info if self.fields is None else info.model_dump(include=self.fields)
+
+
+def parse_expansion(resource: str, include: Optional[str] = None, fields: Optional[str] = None) -> Expansion:
+    return Expansion(resource, parse_include(resource, include), parse_fields(resource, fields))
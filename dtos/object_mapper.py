@@ -1,21 +1,38 @@
 from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
 
 from dtos import BuildingInfo, LecturerInfo, RoomInfo, ScheduleInfo, RoomReservationInfo
+from dtos.expansion import Include
 from models import Building, Lecturer, Room, Schedule, RoomReservation
 
 
 def datetime_to_string(date_time: datetime) -> str:
-    return date_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+    # same output as strftime("%Y-%m-%dT%H:%M:%SZ"), isoformat is several times faster
+    return date_time.replace(tzinfo=None, microsecond=0).isoformat() + "Z"
 
 
 def string_to_datetime(date_time: str) -> datetime:
     return datetime.strptime(date_time, "%Y-%m-%dT%H:%M:%SZ")
 
 
-def to_building_info(building: Building, include_room: bool = True) -> BuildingInfo:
+# Loaders and mappers take the same include tree, relations missing from it are neither loaded nor nested.
+
+def building_info_loader(include: Optional[Include] = None) -> List[LoaderOption]:
+    include = include or {}
+    options = []
+    if "rooms" in include:
+        options.append(selectinload(Building.rooms).options(*room_info_loader(include["rooms"])))
+    return options
+
+
+def to_building_info(building: Building, include: Optional[Include] = None) -> BuildingInfo:
+    include = include or {}
     rooms = None
-    if include_room:
-        rooms = [to_room_info(room) for room in building.rooms]
+    if "rooms" in include:
+        rooms = [to_room_info(room, include["rooms"]) for room in building.rooms]
 
     return BuildingInfo(
         id=building.id,
@@ -27,19 +44,27 @@ def to_building_info(building: Building, include_room: bool = True) -> BuildingI
     )
 
 
-def to_lecturer_info(
-        lecturer: Lecturer,
-        include_schedules: bool = True,
-        include_reservation: bool = True
-) -> LecturerInfo:
+def lecturer_info_loader(include: Optional[Include] = None) -> List[LoaderOption]:
+    include = include or {}
+    options = []
+    if "schedules" in include:
+        options.append(selectinload(Lecturer.schedules).options(*schedule_info_loader(include["schedules"])))
+    if "reservations" in include:
+        options.append(
+            selectinload(Lecturer.reservations).options(*room_reservation_loader(include["reservations"]))
+        )
+    return options
+
+
+def to_lecturer_info(lecturer: Lecturer, include: Optional[Include] = None) -> LecturerInfo:
+    include = include or {}
     schedule = None
-    if include_schedules:
-        schedule = [to_schedule_info(sch) for sch in lecturer.schedules]
+    if "schedules" in include:
+        schedule = [to_schedule_info(sch, include["schedules"]) for sch in lecturer.schedules]
 
     reservations = None
-    if include_reservation:
-        reservations = [to_room_reservation(re, include_lecturer=False, include_room=False) for
-                        re in lecturer.reservations]
+    if "reservations" in include:
+        reservations = [to_room_reservation(re, include["reservations"]) for re in lecturer.reservations]
 
     return LecturerInfo(
         id=lecturer.id,
@@ -59,43 +84,61 @@ def to_lecturer_info(
     )
 
 
-def to_room_info(
-        room: Room,
-        include_reservation: bool = True,
-        include_building: bool = True
-) -> RoomInfo:
+def room_info_loader(include: Optional[Include] = None) -> List[LoaderOption]:
+    include = include or {}
+    options = []
+    if "building" in include:
+        options.append(joinedload(Room.building).options(*building_info_loader(include["building"])))
+    if "reservations" in include:
+        options.append(selectinload(Room.reservations).options(*room_reservation_loader(include["reservations"])))
+    return options
+
+
+def to_room_info(room: Room, include: Optional[Include] = None) -> RoomInfo:
+    include = include or {}
     room_building = None
-    if include_building:
-        room_building = to_building_info(room.building, include_room=False)
+    if "building" in include:
+        room_building = to_building_info(room.building, include["building"])
 
     reservation = None
-    if include_reservation:
-        reservation = [to_room_reservation(res, include_room=False) for res in room.reservations]
+    if "reservations" in include:
+        reservation = [to_room_reservation(res, include["reservations"]) for res in room.reservations]
 
     return RoomInfo(
         id=room.id,
         name=room.name,
         code=room.code,
+        building_id=room.building_id,
         building=room_building,
         capacity=room.capacity,
         reservations=reservation,
     )
 
 
-def to_schedule_info(
-        sch: Schedule,
-        include_lecturer: bool = True,
-        include_reservations: bool = True,
-) -> ScheduleInfo:
+def schedule_info_loader(include: Optional[Include] = None) -> List[LoaderOption]:
+    include = include or {}
+    options = []
+    if "lecturer" in include:
+        options.append(joinedload(Schedule.lecturer).options(*lecturer_info_loader(include["lecturer"])))
+    if "reservations" in include:
+        options.append(
+            selectinload(Schedule.reservations).options(*room_reservation_loader(include["reservations"]))
+        )
+    return options
+
+
+def to_schedule_info(sch: Schedule, include: Optional[Include] = None) -> ScheduleInfo:
+    include = include or {}
     lecturer = None
     reservations = None
-    if include_lecturer:
-        lecturer = to_lecturer_info(sch.lecturer, include_schedules=False)
-    if reservations:
-        reservations = [to_room_reservation(res) for res in sch.reservations]
+    if "lecturer" in include:
+        lecturer = to_lecturer_info(sch.lecturer, include["lecturer"])
+    if "reservations" in include:
+        reservations = [to_room_reservation(res, include["reservations"]) for res in sch.reservations]
 
     return ScheduleInfo(
         id=sch.id,
+        lecturer_id=sch.lecturer_id,
         lecturer=lecturer,
         course=sch.course,
         start_block=sch.start_block,
@@ -106,24 +149,35 @@ def to_schedule_info(
     )
 
 
-def to_room_reservation(
-        reservation: RoomReservation,
-        include_room: bool = True,
-        include_lecturer: bool = True,
-        include_schedule: bool = True,
-) -> RoomReservationInfo:
+def room_reservation_loader(include: Optional[Include] = None) -> List[LoaderOption]:
+    include = include or {}
+    options = []
+    if "room" in include:
+        options.append(joinedload(RoomReservation.room).options(*room_info_loader(include["room"])))
+    if "lecturer" in include:
+        options.append(joinedload(RoomReservation.lecturer).options(*lecturer_info_loader(include["lecturer"])))
+    if "schedule" in include:
+        options.append(joinedload(RoomReservation.schedule).options(*schedule_info_loader(include["schedule"])))
+    return options
+
+
+def to_room_reservation(reservation: RoomReservation, include: Optional[Include] = None) -> RoomReservationInfo:
+    include = include or {}
     room = None
     lecturer = None
     schedule = None
 
-    if include_room:
-        room = to_room_info(reservation.room, include_reservation=False)
-    if include_lecturer:
-        lecturer = to_lecturer_info(reservation.lecturer, include_reservation=False, include_schedules=False)
-    if include_schedule:
-        schedule = to_schedule_info(reservation.schedule, include_lecturer=False, include_reservations=False)
+    if "room" in include:
+        room = to_room_info(reservation.room, include["room"])
+    if "lecturer" in include:
+        lecturer = to_lecturer_info(reservation.lecturer, include["lecturer"])
+    if "schedule" in include:
+        schedule = to_schedule_info(reservation.schedule, include["schedule"])
     return RoomReservationInfo(
         id=reservation.id,
+        schedule_id=reservation.schedule_id,
+        room_id=reservation.room_id,
+        lecturer_id=reservation.lecturer_id,
         schedule=schedule,
         room=room,
         lecturer=lecturer,
@@ -11,3 +11,4 @@ class ResponseEntity(BaseModel, Generic[T]):
     status: bool
     error_message: Optional[str]
     data: T
+    next_cursor: Optional[str] = None
@@ -1,127 +1,72 @@
+import time
+
+BOOT_STARTED = time.perf_counter()
+
+import logging
+import os
+import resource
+from contextlib import asynccontextmanager
+
 import uvicorn
-from fastapi import FastAPI, Depends
-from sqlalchemy.orm import Session
+from fastapi import FastAPI
+from sqlalchemy import text
 
-from models import Building, Room, Schedule, Lecturer
-from models.base import Base, engine, get_db, SessionLocal
+from models.base import engine, async_engine
+from routes.analytics import analytics_router
 from routes.auth import auth_router
+from routes.availability import availability_router
 from routes.building import building_router
+from routes.internal import internal_router, metrics_router
 from routes.lecturer import lecturer_router
 from routes.room import room_router
 from routes.room_reservation import room_reservation_router
 from routes.schedule import schedule_router
+from services.availability import availability_notifier
+from services.catalog import catalog_notifier
 from setting import settings
-from utils.crypto import get_password_hash
-
-Base.metadata.create_all(bind=engine)
+from utils.crypto import password_hasher
+from utils.jwt_token import current_user_notifier
+from utils.metrics import MetricsMiddleware, install_sql_hooks
+from utils.utils import EntityResponse
 
-app = FastAPI()
+logger = logging.getLogger("uvicorn.error")
 
 
-@app.on_event("startup")
-async def init_database():
-    db = SessionLocal()
-    print(f"\n\nusername: lecturer\npassword: 123456\n\n")
+def resident_memory_mib() -> float:
     try:
-        db.add(Lecturer(
-            **{"username": "lecturer",
-               "password": get_password_hash("123456"),
-               "first_name": "lecturer",
-               "last_name": "1",
-               "email": "lecturer1@gmail.com",
-               "dob": "2023-12-11T14:25:16Z",
-               "gender": "MALE",
-               "enabled": True,
-               "active": True,
-               "faculty": "COMPUTER_SCIENCE",
-               }
-        ))
-
-        db.bulk_save_objects(
-            objects=[
-                Building(
-                    id=0,
-                    name="Nha K",
-                    code="K"
-                ),
-                Building(
-                    id=1,
-                    name="Nha A",
-                    code="A"
-                ), Building(
-                    id=2,
-                    name="Nha B",
-                    code="B"
-                ), Building(
-                    id=3,
-                    name="Nha C",
-                    code="C"
-                ),
-            ]
-        )
-        db.commit()
-
-        db.bulk_save_objects(
-            objects=[
-                Schedule(
-                    lecturer_id=2,
-                    course="Networking",
-                    start_block="BLOCK_1",
-                    end_block="BLOCK_2",
-
-                ),
-                Schedule(
-                    lecturer_id=2,
-                    course="Distributed Systems",
-                    start_block="BLOCK_1",
-                    end_block="BLOCK_2",
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        # peak rather than current RSS, reported in KiB on Linux and bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
 
-                ),
-                Schedule(
-                    lecturer_id=2,
-                    course="Computer Organization in C Programming language perspective.",
-                    start_block="BLOCK_1",
-                    end_block="BLOCK_2",
-                )
-            ]
-        )
-        db.commit()
 
-        db.bulk_save_objects(
-            objects=[
-                Room(
-                    name="Phong 1",
-                    code="P1",
-                    building_id=0,
-                ),
-                Room(
-                    name="Phong 2",
-                    code="P2",
-                    building_id=0,
+# Engines are created lazily at import without touching the database, the first connection
+# is opened here so a misconfigured worker fails at boot instead of on its first request.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    install_sql_hooks(engine)
+    install_sql_hooks(async_engine.sync_engine)
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+    await catalog_notifier.start()
+    await availability_notifier.start()
+    await current_user_notifier.start()
+    logger.info(
+        "Worker %d ready in %.0f ms, rss %.1f MiB",
+        os.getpid(), (time.perf_counter() - BOOT_STARTED) * 1000, resident_memory_mib()
+    )
+    yield
+    await current_user_notifier.stop()
+    await availability_notifier.stop()
+    await catalog_notifier.stop()
+    await async_engine.dispose()
+    engine.dispose()
+    password_hasher.shutdown()
 
-                ),
-                Room(
-                    name="Phong 3",
-                    code="P3",
-                    building_id=1,
-                ),
 
-                Room(
-                    name="Phong 4",
-                    code="P4",
-                    building_id=2,
-                ),
-                Room(
-                    name="Phong 5",
-                    code="P5",
-                    building_id=3
-                ),
-            ]
-        )
-        db.commit()
-    except:
-        pass
-    db.close()
+app = FastAPI(default_response_class=EntityResponse, lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(router=auth_router, prefix="/auth", tags=["Auth Apis"])
 app.include_router(router=building_router, prefix="/building", tags=["Building Apis"])
@@ -129,6 +74,11 @@ app.include_router(router=lecturer_router, prefix="/lecturer", tags=["Lecturer A
 app.include_router(router=schedule_router, prefix="/schedule", tags=["Schedule Apis"])
 app.include_router(router=room_router, prefix="/room", tags=["Room Apis"])
 app.include_router(router=room_reservation_router, prefix="/reservation", tags=["Reservation Apis"])
+app.include_router(router=analytics_router, prefix="/analytics", tags=["Analytics Apis"])
+app.include_router(router=availability_router, prefix="/ws", tags=["Availability Apis"])
+app.include_router(router=internal_router, prefix="/internal", tags=["Internal Apis"])
+app.include_router(router=metrics_router, tags=["Internal Apis"])
 
 if __name__ == '__main__':
+    # development server, production runs through `python manage.py serve`
     uvicorn.run("main:app", host=settings.SERVER_HOST, port=int(settings.SERVER_PORT), reload=True)
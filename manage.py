@@ -0,0 +1,182 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+from typing import List, Optional
+
+import migrations
+from models import SessionLocal, engine
+from setting import settings
+from services.audit import run_audit, write_overlaps
+from services.demo_data import seed_demo_data, DEMO_USERNAME, DEMO_PASSWORD
+from services.export import export_reservations, EXPORT_FORMATS, DEFAULT_CHUNK_SIZE
+from services.timetable_import import import_timetable, write_errors, DEFAULT_IMPORT_CHUNK_SIZE
+
+
+def parse_day(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def export(args: argparse.Namespace) -> int:
+    db = SessionLocal()
+    try:
+        exported = export_reservations(
+            db,
+            path=args.output,
+            export_format=args.format,
+            start=args.start,
+            end=args.end,
+            building_id=args.building_id,
+            chunk_size=args.chunk_size,
+        )
+    finally:
+        db.close()
+    print(f"Exported {exported} reservations to {args.output}")
+    return 0
+
+
+def import_csv(args: argparse.Namespace) -> int:
+    db = SessionLocal()
+    try:
+        with open(args.input, newline="", encoding="utf-8-sig") as file:
+            summary = import_timetable(
+                db, file,
+                chunk_size=args.chunk_size,
+                on_chunk=lambda progress: print(f"{progress.rows} rows read, {progress.imported} imported"),
+            )
+    finally:
+        db.close()
+
+    print(f"Imported {summary.imported} of {summary.rows} rows, created {summary.schedules_created} schedules")
+    if summary.errors:
+        errors_path = args.errors or f"{args.input}.errors.csv"
+        with open(errors_path, "w", newline="") as file:
+            write_errors(summary.errors, file)
+        print(f"Rejected {summary.rejected} rows, see {errors_path}")
+    return 1 if summary.errors else 0
+
+
+def audit(args: argparse.Namespace) -> int:
+    db = SessionLocal()
+    try:
+        report = run_audit(db, incremental=args.incremental, start=args.start, end=args.end)
+    finally:
+        db.close()
+
+    scope = f"since {report.since:%Y-%m-%d %H:%M:%S}" if report.since is not None else "over all reservations"
+    print(f"Audit run {report.run_id} ({report.mode}) scanned {report.rows_scanned} rows {scope}")
+    print(f"Found {report.count('room')} room and {report.count('lecturer')} lecturer double bookings")
+    if report.overlaps:
+        if args.output:
+            with open(args.output, "w", newline="") as file:
+                write_overlaps(report.overlaps, file)
+            print(f"Double bookings written to {args.output}")
+        else:
+            write_overlaps(report.overlaps, sys.stdout)
+    return 1 if report.overlaps else 0
+
+
+def migrate(args: argparse.Namespace) -> int:
+    if args.list:
+        pending = {version for version, _ in migrations.pending(engine)}
+        for version, _ in migrations.discover():
+            print(f"{version} {'pending' if version in pending else 'applied'}")
+        return 0
+
+    run = migrations.migrate(engine)
+    for version in run.applied:
+        print(f"Applied {version}")
+    for version, reason in run.deferred:
+        print(f"Deferred {version}: {reason}")
+    if not run.applied and not run.deferred:
+        print("Database schema is up to date")
+    return 0
+
+
+def seed(args: argparse.Namespace) -> int:
+    db = SessionLocal()
+    try:
+        created = seed_demo_data(db)
+    finally:
+        db.close()
+    if created:
+        print(f"Created demo data, username: {DEMO_USERNAME} password: {DEMO_PASSWORD}")
+    else:
+        print("Demo data already exists")
+    return 0
+
+
+def default_workers() -> int:
+    return settings.WEB_CONCURRENCY or os.cpu_count() or 1
+
+
+def serve(args: argparse.Namespace) -> int:
+    import uvicorn
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        access_log=not args.no_access_log,
+        proxy_headers=True,
+    )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="manage.py", description="School management maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = commands.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_parser.add_argument("--list", action="store_true", help="Show migrations and whether they ran")
+    migrate_parser.set_defaults(handler=migrate)
+
+    export_parser = commands.add_parser("export", help="Write a flat reservation snapshot to CSV or Parquet")
+    export_parser.add_argument("output", help="Destination file")
+    export_parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export_parser.add_argument("--from", dest="start", type=parse_day, help="First day, YYYY-MM-DD")
+    export_parser.add_argument("--to", dest="end", type=parse_day, help="Last day, YYYY-MM-DD")
+    export_parser.add_argument("--building-id", type=int)
+    export_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    export_parser.set_defaults(handler=export)
+
+    import_parser = commands.add_parser("import-timetable", help="Load a registrar timetable CSV")
+    import_parser.add_argument("input", help="CSV with lecturer,course,building,room,date,start_block,end_block")
+    import_parser.add_argument("--errors", help="Where rejected rows are written, defaults to <input>.errors.csv")
+    import_parser.add_argument("--chunk-size", type=int, default=DEFAULT_IMPORT_CHUNK_SIZE)
+    import_parser.set_defaults(handler=import_csv)
+
+    audit_parser = commands.add_parser("audit", help="Report overlapping room and lecturer reservations")
+    audit_parser.add_argument(
+        "--incremental", action="store_true", help="Only re-check days with reservations changed since the last audit"
+    )
+    audit_parser.add_argument("--from", dest="start", type=parse_day, help="First day, YYYY-MM-DD")
+    audit_parser.add_argument("--to", dest="end", type=parse_day, help="Last day, YYYY-MM-DD")
+    audit_parser.add_argument("--output", help="CSV for the double bookings, printed when omitted")
+    audit_parser.set_defaults(handler=audit)
+
+    seed_parser = commands.add_parser("seed", help="Create the demo lecturer, buildings, rooms and schedules")
+    seed_parser.set_defaults(handler=seed)
+
+    serve_parser = commands.add_parser("serve", help="Run the production server with multiple workers")
+    serve_parser.add_argument("--host", default=settings.SERVER_HOST)
+    serve_parser.add_argument("--port", type=int, default=int(settings.SERVER_PORT))
+    serve_parser.add_argument(
+        "--workers", type=int, default=default_workers(), help="Defaults to WEB_CONCURRENCY or the core count"
+    )
+    serve_parser.add_argument("--log-level", default="info")
+    serve_parser.add_argument("--no-access-log", action="store_true")
+    serve_parser.set_defaults(handler=serve)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Enum, ForeignKey, Integer, MetaData, String, Table, UniqueConstraint
+)
+from sqlalchemy.engine import Connection
+
+from models.enums import Faculty, Gender
+
+# The schema as create_all produced it before migrations existed. Tables are created only when
+# missing, so databases bootstrapped by the old import-time create_all are adopted as they are.
+
+metadata = MetaData()
+
+
+def timestamps():
+    return [
+        Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+        Column("last_edited", DateTime, nullable=False, default=datetime.utcnow),
+    ]
+
+
+Table(
+    "buildings", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("code", String(30), nullable=False),
+    *timestamps(),
+)
+
+Table(
+    "rooms", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("code", String(30), nullable=False),
+    Column("capacity", Integer, nullable=False),
+    Column("building_id", Integer, ForeignKey("buildings.id"), nullable=False),
+    *timestamps(),
+)
+
+Table(
+    "lecturers", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String(200), nullable=False, unique=True),
+    Column("password", String, nullable=False),
+    Column("first_name", String(100), nullable=False),
+    Column("last_name", String(100), nullable=False),
+    Column("email", String(200), nullable=False, unique=True),
+    Column("dob", DateTime(timezone=True), nullable=False),
+    Column("gender", Enum(Gender), nullable=False),
+    Column("enabled", Boolean, nullable=False),
+    Column("active", Boolean, nullable=False),
+    Column("faculty", Enum(Faculty), nullable=False),
+    *timestamps(),
+)
+
+Table(
+    "schedules", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("lecturer_id", Integer, ForeignKey("lecturers.id"), nullable=False),
+    Column("course", String(200), nullable=False),
+    Column("start_block", String),
+    Column("end_block", String),
+    *timestamps(),
+)
+
+Table(
+    "room_reservations", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("room_id", Integer, ForeignKey("rooms.id"), nullable=False),
+    Column("schedule_id", Integer, ForeignKey("schedules.id"), nullable=False),
+    Column("lecturer_id", Integer, ForeignKey("lecturers.id"), nullable=False),
+    Column("date", DateTime, nullable=False),
+    Column("start_block", String),
+    Column("end_block", String),
+    *timestamps(),
+)
+
+Table(
+    "room_occupancies", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("room_id", Integer, ForeignKey("rooms.id"), nullable=False),
+    Column("date", Date, nullable=False),
+    Column("mask", Integer, nullable=False),
+    *timestamps(),
+    UniqueConstraint("room_id", "date", name="uq_room_occupancies_room_date"),
+)
+
+
+def upgrade(connection: Connection):
+    metadata.create_all(connection, checkfirst=True)
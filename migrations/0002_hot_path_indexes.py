@@ -0,0 +1,18 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Indexes for the lookups the routes run on every request.
+
+INDEXES = [
+    ("ix_room_reservations_room_id_date", "room_reservations", "room_id, date"),
+    ("ix_room_reservations_lecturer_id_date", "room_reservations", "lecturer_id, date"),
+    ("ix_room_reservations_schedule_id", "room_reservations", "schedule_id"),
+    ("ix_room_reservations_date", "room_reservations", "date"),
+    ("ix_schedules_lecturer_id", "schedules", "lecturer_id"),
+    ("ix_rooms_building_id_capacity", "rooms", "building_id, capacity"),
+]
+
+
+def upgrade(connection: Connection):
+    for name, table, columns in INDEXES:
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
@@ -0,0 +1,56 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Tuple
+
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, String, Table, func, insert, select
+from sqlalchemy.engine import Connection
+
+# Fills room_occupancies from the existing reservations when it is empty. Tables and the block
+# arithmetic are frozen here so later model changes cannot alter what this migration does.
+
+CHUNK_SIZE = 5000
+
+metadata = MetaData()
+
+room_reservations = Table(
+    "room_reservations", metadata,
+    Column("room_id", Integer),
+    Column("date", DateTime),
+    Column("start_block", String),
+    Column("end_block", String),
+)
+
+room_occupancies = Table(
+    "room_occupancies", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("room_id", Integer, nullable=False),
+    Column("date", Date, nullable=False),
+    Column("mask", Integer, nullable=False),
+    Column("created_at", DateTime, nullable=False, default=datetime.utcnow),
+    Column("last_edited", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+def block_mask(start_block: str, end_block: str) -> int:
+    # BLOCK_n sets bit n - 1
+    start, end = int(start_block.split("_")[1]) - 1, int(end_block.split("_")[1]) - 1
+    return ((1 << (end + 1)) - 1) ^ ((1 << start) - 1)
+
+
+def upgrade(connection: Connection):
+    if connection.scalar(select(func.count()).select_from(room_occupancies)):
+        return
+
+    masks: Dict[Tuple[int, date], int] = defaultdict(int)
+    rows = connection.execute(
+        select(
+            room_reservations.c.room_id, room_reservations.c.date,
+            room_reservations.c.start_block, room_reservations.c.end_block,
+        ).execution_options(yield_per=CHUNK_SIZE)
+    )
+    for room_id, day, start_block, end_block in rows:
+        masks[(room_id, day.date() if isinstance(day, datetime) else day)] |= block_mask(start_block, end_block)
+
+    values = [{"room_id": room_id, "date": day, "mask": mask} for (room_id, day), mask in masks.items()]
+    for offset in range(0, len(values), CHUNK_SIZE):
+        connection.execute(insert(room_occupancies), values[offset:offset + CHUNK_SIZE])
@@ -0,0 +1,55 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from migrations import MigrationDeferred
+
+# Postgres exclusion constraint rejecting overlapping block ranges for the same room and day. It cannot
+# be added while double bookings exist, so the migration reports them and stays pending until they are
+# resolved, `manage.py audit` lists every one.
+
+CONSTRAINT = "ex_room_reservations_no_overlap"
+REPORTED_OVERLAPS = 10
+
+
+def block_range(alias: str = "") -> str:
+    prefix = f"{alias}." if alias else ""
+    return (
+        f"int4range(split_part({prefix}start_block, '_', 2)::integer, "
+        f"split_part({prefix}end_block, '_', 2)::integer, '[]')"
+    )
+
+
+OVERLAPS = f"""
+    FROM room_reservations earlier
+    JOIN room_reservations later
+      ON later.room_id = earlier.room_id
+     AND later.date::date = earlier.date::date
+     AND later.id > earlier.id
+     AND {block_range("earlier")} && {block_range("later")}
+"""
+
+
+def upgrade(connection: Connection):
+    if connection.dialect.name != "postgresql":
+        return
+
+    overlaps = connection.scalar(text(f"SELECT count(*) {OVERLAPS}"))
+    if overlaps:
+        examples = connection.execute(text(
+            f"SELECT earlier.room_id, earlier.date::date, earlier.id, later.id {OVERLAPS} "
+            f"ORDER BY earlier.room_id, earlier.date, earlier.id, later.id LIMIT {REPORTED_OVERLAPS}"
+        ))
+        listed = "; ".join(
+            f"room {room_id} on {day.isoformat()}: reservations {first_id} and {second_id}"
+            for room_id, day, first_id, second_id in examples
+        )
+        raise MigrationDeferred(
+            f"{overlaps} overlapping room reservations prevent adding {CONSTRAINT} ({listed}). "
+            "Resolve them, `python manage.py audit` lists all, and run migrate again"
+        )
+
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+    connection.execute(text(
+        f"ALTER TABLE room_reservations ADD CONSTRAINT {CONSTRAINT} "
+        f"EXCLUDE USING gist (room_id WITH =, (date::date) WITH =, ({block_range()}) WITH &&)"
+    ))
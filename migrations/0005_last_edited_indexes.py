@@ -0,0 +1,15 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Conditional GETs aggregate max(last_edited) over whole tables, an index turns that into a single lookup.
+
+INDEXES = [
+    ("ix_room_reservations_last_edited", "room_reservations", "last_edited"),
+    ("ix_schedules_last_edited", "schedules", "last_edited"),
+    ("ix_lecturers_last_edited", "lecturers", "last_edited"),
+]
+
+
+def upgrade(connection: Connection):
+    for name, table, columns in INDEXES:
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+# Bookkeeping for the reservation overlap audit, incremental runs start from the last finished run.
+
+metadata = MetaData()
+
+audit_runs = Table(
+    "audit_runs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("mode", String(20), nullable=False),
+    Column("since", DateTime, nullable=True),
+    Column("started_at", DateTime, nullable=False),
+    Column("finished_at", DateTime, nullable=True),
+    Column("rows_scanned", Integer, nullable=False),
+    Column("room_conflicts", Integer, nullable=False),
+    Column("lecturer_conflicts", Integer, nullable=False),
+)
+
+
+def upgrade(connection: Connection):
+    audit_runs.create(connection, checkfirst=True)
@@ -0,0 +1,67 @@
+import importlib
+import pkgutil
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import ModuleType
+from typing import List, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+from sqlalchemy.engine import Connection, Engine
+
+# Forward-only migrations: every module named NNNN_description.py in this package exposes
+# upgrade(connection) and runs once, in version order, inside its own transaction. An upgrade that
+# raises MigrationDeferred is rolled back and stays pending for the next run, later versions still apply.
+
+MIGRATION_NAME = re.compile(r"^(\d{4})_\w+$")
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", String(64), primary_key=True),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+class MigrationDeferred(Exception):
+    pass
+
+
+@dataclass
+class MigrationRun:
+    applied: List[str] = field(default_factory=list)
+    # (version, reason) of the migrations left pending
+    deferred: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def discover() -> List[Tuple[str, ModuleType]]:
+    migrations = []
+    for module in pkgutil.iter_modules(__path__):
+        if MIGRATION_NAME.match(module.name):
+            migrations.append((module.name, importlib.import_module(f"{__name__}.{module.name}")))
+    return sorted(migrations, key=lambda migration: migration[0])
+
+
+def applied_versions(connection: Connection) -> List[str]:
+    schema_migrations.create(connection, checkfirst=True)
+    return list(connection.scalars(select(schema_migrations.c.version).order_by(schema_migrations.c.version)))
+
+
+def pending(engine: Engine) -> List[Tuple[str, ModuleType]]:
+    with engine.begin() as connection:
+        applied = set(applied_versions(connection))
+    return [(version, module) for version, module in discover() if version not in applied]
+
+
+def migrate(engine: Engine) -> MigrationRun:
+    run = MigrationRun()
+    for version, module in pending(engine):
+        try:
+            with engine.begin() as connection:
+                module.upgrade(connection)
+                connection.execute(schema_migrations.insert().values(version=version))
+        except MigrationDeferred as ex:
+            run.deferred.append((version, str(ex)))
+            continue
+        run.applied.append(version)
+    return run
@@ -1,16 +1,117 @@
-from sqlalchemy import create_engine
+import asyncio
+import contextvars
+import time
+from typing import Any, Callable, Dict, TypeVar
+
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 
 from setting import *
 
 settings: Settings = settings
 
+T = TypeVar("T")
+
+
+class PoolWaitStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        self.checkouts += 1
+        self.timeouts += int(timed_out)
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class TimedPoolMixin:
+    # Times how long callers wait for a connection to become available.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def async_database_url(url: str) -> str:
+    # SQLite needs its asyncio driver, psycopg 3 is picked up by create_async_engine on its own.
+    if is_sqlite(url):
+        return make_url(url).set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return url
+
+
+def engine_options(poolclass) -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_STATEMENT_TIMEOUT_MS and not is_sqlite(settings.SQLALCHEMY_DATABASE_URI):
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def pool_status(pool) -> Dict[str, Any]:
+    wait_stats: PoolWaitStats = pool.wait_stats
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checkouts": wait_stats.checkouts,
+        "timeouts": wait_stats.timeouts,
+        "wait_seconds_total": wait_stats.wait_seconds_total,
+        "wait_seconds_max": wait_stats.wait_seconds_max,
+    }
+
+
 engine = create_engine(
-    settings.SQLALCHEMY_DATABASE_URI.__str__()
+    settings.SQLALCHEMY_DATABASE_URI.__str__(),
+    **engine_options(TimedQueuePool)
+)
+
+async_engine = create_async_engine(
+    async_database_url(settings.SQLALCHEMY_DATABASE_URI),
+    **engine_options(TimedAsyncQueuePool)
 )
 
-print("DATABASE URL: "+settings.SQLALCHEMY_DATABASE_URI.__str__())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -22,3 +123,16 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Long imports, exports and reports run on their own sync session in a worker thread, so the event loop
+# keeps serving other requests meanwhile. The caller's context variables are copied along.
+async def run_in_sync_session(function: Callable[..., T], *args: Any) -> T:
+    def run() -> T:
+        with SessionLocal() as session:
+            return function(session, *args)
+
+    return await asyncio.get_running_loop().run_in_executor(None, contextvars.copy_context().run, run)
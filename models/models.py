@@ -1,8 +1,8 @@
 import enum
-from datetime import datetime, time
+from datetime import datetime, time, date
 from typing import List
 
-from sqlalchemy import String, Column, ForeignKey, Integer, DateTime, Date
+from sqlalchemy import String, Column, ForeignKey, Integer, DateTime, Date, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
 from . import Base, Gender, Faculty, TimeBlock
@@ -27,6 +27,7 @@ class Building(Base):
 
 class Room(Base):
     __tablename__ = "rooms"
+    __table_args__ = (Index("ix_rooms_building_id_capacity", "building_id", "capacity"),)
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(name="name", type_=String(200))
     code: Mapped[str] = mapped_column(name="code", type_=String(30))
@@ -37,6 +38,10 @@ class Room(Base):
         back_populates="room",
         cascade="all, delete-orphan",
     )
+    occupancies: Mapped[List["RoomOccupancy"]] = relationship(
+        back_populates="room",
+        cascade="all, delete-orphan",
+    )
 
     created_at: Mapped[datetime] = mapped_column(
         name="created_at", default=datetime.utcnow, nullable=False, type_=DateTime
@@ -48,6 +53,13 @@ class Room(Base):
 
 class RoomReservation(Base):
     __tablename__ = "room_reservations"
+    __table_args__ = (
+        Index("ix_room_reservations_room_id_date", "room_id", "date"),
+        Index("ix_room_reservations_lecturer_id_date", "lecturer_id", "date"),
+        Index("ix_room_reservations_schedule_id", "schedule_id"),
+        Index("ix_room_reservations_date", "date"),
+        Index("ix_room_reservations_last_edited", "last_edited"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     room_id: Mapped[int] = mapped_column(ForeignKey("rooms.id"))
     room: Mapped["Room"] = relationship("Room", back_populates="reservations")
@@ -66,8 +78,32 @@ class RoomReservation(Base):
     )
 
 
+class RoomOccupancy(Base):
+    __tablename__ = "room_occupancies"
+    __table_args__ = (
+        UniqueConstraint("room_id", "date", name="uq_room_occupancies_room_date"),
+        Index("ix_room_occupancies_date_room_id_mask", "date", "room_id", "mask"),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True)
+    room_id: Mapped[int] = mapped_column(ForeignKey("rooms.id"))
+    room: Mapped["Room"] = relationship("Room", back_populates="occupancies")
+    date: Mapped[date] = mapped_column(name="date", type_=Date, nullable=False)
+    # bit i is set when TimeBlock number i + 1 is reserved on that day
+    mask: Mapped[int] = mapped_column(name="mask", type_=Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        name="created_at", default=datetime.utcnow, nullable=False, type_=DateTime
+    )
+    last_edited: Mapped[datetime] = Column(
+        name="last_edited", default=datetime.utcnow, nullable=False, type_=DateTime, onupdate=datetime.utcnow
+    )
+
+
 class Schedule(Base):
     __tablename__ = "schedules"
+    __table_args__ = (
+        Index("ix_schedules_lecturer_id", "lecturer_id"),
+        Index("ix_schedules_last_edited", "last_edited"),
+    )
 
     reservations: Mapped[List["RoomReservation"]] = relationship(
         back_populates="schedule",
@@ -89,6 +125,7 @@ class Schedule(Base):
 
 class Lecturer(Base):
     __tablename__ = "lecturers"
+    __table_args__ = (Index("ix_lecturers_last_edited", "last_edited"),)
     id: Mapped[int] = mapped_column(primary_key=True)
     username: Mapped[str] = mapped_column(name="username", type_=String(200), unique=True, nullable=False)
     password: Mapped[str] = mapped_column(name="password", nullable=False)
@@ -109,3 +146,21 @@ class Lecturer(Base):
     last_edited: Mapped[datetime] = Column(
         name="last_edited", default=datetime.utcnow, nullable=False, type_=DateTime, onupdate=datetime.utcnow
     )
+
+
+class AuditRun(Base):
+    __tablename__ = "audit_runs"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # "full" or "incremental"
+    mode: Mapped[str] = mapped_column(name="mode", type_=String(20), nullable=False)
+    # incremental runs only look at reservations edited at or after this point
+    since: Mapped[datetime] = mapped_column(name="since", type_=DateTime, nullable=True)
+    started_at: Mapped[datetime] = mapped_column(
+        name="started_at", default=datetime.utcnow, nullable=False, type_=DateTime
+    )
+    finished_at: Mapped[datetime] = mapped_column(name="finished_at", type_=DateTime, nullable=True)
+    rows_scanned: Mapped[int] = mapped_column(name="rows_scanned", type_=Integer, default=0, nullable=False)
+    room_conflicts: Mapped[int] = mapped_column(name="room_conflicts", type_=Integer, default=0, nullable=False)
+    lecturer_conflicts: Mapped[int] = mapped_column(
+        name="lecturer_conflicts", type_=Integer, default=0, nullable=False
+    )
@@ -0,0 +1,42 @@
+from fastapi import Query, Request
+from fastapi.routing import APIRouter
+
+from dtos import *
+from dtos.object_mapper import string_to_datetime
+from models import run_in_sync_session
+from services.catalog import catalog_cache, BUILDING, ROOM, RESERVATION
+from services.utilization import room_utilization
+from utils.conditional import content_version, is_not_modified, not_modified_response, with_version
+from utils.utils import exception_to_string, error_response, success_response
+
+analytics_router = APIRouter()
+
+UTILIZATION_RESOURCES = frozenset({BUILDING, ROOM, RESERVATION})
+
+
+@analytics_router.get(path="/utilization", response_model=ResponseEntity[RoomUtilization])
+async def get_utilization(
+        request: Request,
+        start: str = Query(alias="from"),
+        end: str = Query(alias="to"),
+        building_id: Optional[int] = None,
+):
+    try:
+        cached = catalog_cache.cached_response(request, UTILIZATION_RESOURCES)
+        if cached is not None:
+            return cached
+        generation = catalog_cache.generation
+
+        utilization = await run_in_sync_session(
+            room_utilization, string_to_datetime(start).date(), string_to_datetime(end).date(), building_id
+        )
+        response = success_response(200, utilization)
+        version = content_version(bytes(response.body))
+        catalog_cache.store(request, with_version(response, version), version, generation, UTILIZATION_RESOURCES)
+        if is_not_modified(request, version):
+            return not_modified_response(version)
+        return response
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
+    except Exception as ex:
+        return error_response(500, exception_to_string(ex))
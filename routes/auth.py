@@ -1,19 +1,27 @@
 from fastapi import APIRouter
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
 
 from dtos import LecturerCreate, ResponseEntity, AuthToken, LecturerInfo
-from dtos.object_mapper import to_lecturer_info
-from utils.crypto import get_password_hash, verify_password
+from dtos.object_mapper import to_lecturer_info, lecturer_info_loader
+from services.catalog import invalidate_catalog, LECTURER
+from utils.crypto import hash_password_async, verify_and_update_password, PasswordHasherBusy
 from utils.jwt_token import *
 from utils.utils import error_response, exception_to_string, success_response
 
 auth_router = APIRouter()
 
+LOGIN_INCLUDE = {"schedules": {}}
+
 
 @auth_router.post(path="/token", response_model=dict)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     try:
-        lecturer: Optional[Lecturer] = db.query(Lecturer).filter(Lecturer.username == form_data.username).first()
+        lecturer: Optional[Lecturer] = await db.scalar(
+            select(Lecturer)
+            .options(*lecturer_info_loader(LOGIN_INCLUDE))
+            .filter(Lecturer.username == form_data.username)
+        )
         if lecturer is None:
             return error_response(
                 400,
@@ -21,46 +29,58 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
             )
 
         hashed_pass = lecturer.password
-        if not verify_password(form_data.password, hashed_pass):
+        verified, new_hash = await verify_and_update_password(form_data.password, hashed_pass)
+        if not verified:
             return error_response(
                 400,
                 msg="Incorrect email or password"
             )
+        if new_hash is not None:
+            lecturer.password = new_hash
+            await db.commit()
+            await invalidate_catalog(LECTURER)
 
         return {
             "token_type": "bearer",
-            "lecturer": to_lecturer_info(lecturer=lecturer, include_reservation=False),
+            "lecturer": to_lecturer_info(lecturer, LOGIN_INCLUDE),
             "access_token": create_access_token(
                 data={"sub": lecturer.username},
                 expires_delta=timedelta(minutes=setting.settings.ACCESS_TOKEN_EXPIRE_MINUTES),
             )
         }
 
+    except PasswordHasherBusy as ex:
+        return error_response(503, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @auth_router.post("/register", response_model=ResponseEntity[LecturerInfo])
-async def register(lecturer_info: LecturerCreate, db: Session = Depends(get_db)):
+async def register(lecturer_info: LecturerCreate, db: AsyncSession = Depends(get_async_db)):
     try:
 
-        lecturer = db.query(Lecturer).filter(Lecturer.username == lecturer_info.username).first()
+        lecturer = await db.scalar(select(Lecturer).filter(Lecturer.username == lecturer_info.username))
         if lecturer is not None:
             return error_response(
                 409,
                 "User with this username is existed!"
             )
 
-        hashed_password = get_password_hash(lecturer_info.password)
+        hashed_password = await hash_password_async(lecturer_info.password)
         lecturer_info.password = hashed_password
         new_lecturer = Lecturer(**lecturer_info.model_dump())
         db.add(new_lecturer)
-        db.commit()
-        db.refresh(new_lecturer)
+        await db.commit()
+        db.expunge_all()
+        new_lecturer = await db.scalar(
+            select(Lecturer).options(*lecturer_info_loader()).filter(Lecturer.id == new_lecturer.id)
+        )
 
         return success_response(
             201,
             to_lecturer_info(new_lecturer)
         )
+    except PasswordHasherBusy as ex:
+        return error_response(503, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
@@ -0,0 +1,80 @@
+import asyncio
+import json
+from datetime import date
+from typing import Any, Iterable, Optional, Set, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.routing import APIRouter
+
+from services.availability import availability_broker, Subscription
+
+availability_router = APIRouter()
+
+AvailabilityFilter = Tuple[Optional[Set[int]], Optional[Set[date]]]
+
+
+def parse_filter(buildings: Optional[Iterable[Any]], dates: Optional[Iterable[Any]]) -> AvailabilityFilter:
+    # missing or empty means no filter on that field, dates are YYYY-MM-DD
+    building_ids = {int(building_id) for building_id in buildings} if buildings else None
+    days = {date.fromisoformat(str(day)) for day in dates} if dates else None
+    return building_ids or None, days or None
+
+
+def filter_message(subscription: Subscription) -> str:
+    return json.dumps({
+        "type": "subscribed",
+        "buildings": sorted(subscription.buildings) if subscription.buildings is not None else None,
+        "dates": sorted(day.isoformat() for day in subscription.dates) if subscription.dates is not None else None,
+    })
+
+
+async def send_events(websocket: WebSocket, subscription: Subscription):
+    while True:
+        await websocket.send_text(await subscription.queue.get())
+
+
+async def receive_filters(websocket: WebSocket, subscription: Subscription):
+    # clients replace their filter by sending {"buildings": [...], "dates": [...]}
+    while True:
+        text = await websocket.receive_text()
+        try:
+            request = json.loads(text)
+            buildings, dates = parse_filter(request.get("buildings"), request.get("dates"))
+        except (ValueError, TypeError, AttributeError) as ex:
+            await websocket.send_text(json.dumps({"type": "error", "error_message": str(ex)}))
+            continue
+        availability_broker.refilter(subscription, buildings, dates)
+        await websocket.send_text(filter_message(subscription))
+
+
+# Pushes "reserved" and "released" deltas for the subscribed buildings and dates. A "resync" message
+# means events were dropped or missed and the client should reload what it shows.
+@availability_router.websocket("/availability")
+async def availability_socket(websocket: WebSocket, buildings: Optional[str] = None, dates: Optional[str] = None):
+    try:
+        building_ids, days = parse_filter(
+            buildings.split(",") if buildings else None,
+            dates.split(",") if dates else None,
+        )
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    subscription = availability_broker.subscribe(building_ids, days)
+    try:
+        await websocket.send_text(filter_message(subscription))
+        tasks = {
+            asyncio.create_task(send_events(websocket, subscription)),
+            asyncio.create_task(receive_filters(websocket, subscription)),
+        }
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if not isinstance(task.exception(), WebSocketDisconnect):
+                task.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        availability_broker.unsubscribe(subscription)
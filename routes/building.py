@@ -1,63 +1,140 @@
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi.routing import APIRouter
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from dtos import *
-from dtos.object_mapper import to_building_info
-from models import get_db
+from dtos.expansion import Include, parse_expansion
+from dtos.object_mapper import to_building_info, building_info_loader
+from models import get_async_db
 from models.models import Building
+from services.availability import publish_availability_resync
+from services.catalog import catalog_cache, invalidate_catalog, BUILDING, ROOM, RESERVATION
+from utils.conditional import tables_version, is_not_modified, not_modified_response, with_version
+from utils.pagination import paginate, split_page
 from utils.utils import exception_to_string, error_response, success_response
 
 building_router = APIRouter()
 
 
+async def load_building(db: AsyncSession, building_id: int, include: Optional[Include] = None) -> Optional[Building]:
+    return await db.scalar(
+        select(Building)
+        .options(*building_info_loader(include))
+        .filter(Building.id == building_id)
+    )
+
+
 @building_router.get(path="/", response_model=ResponseEntity[List[BuildingInfo]])
-async def get_buildings(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_buildings(
+        request: Request,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include: Optional[str] = None,
+        fields: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
     try:
-        building = db.query(Building).offset(skip).limit(limit).all()
-        return success_response(200, [to_building_info(b) for b in building])
-
+        expansion = parse_expansion("building", include, fields)
+        cached = catalog_cache.cached_response(request, expansion.resources)
+        if cached is not None:
+            return cached
+        generation = catalog_cache.generation
+        version = await tables_version(db, request, expansion.models)
+        if is_not_modified(request, version):
+            return not_modified_response(version)
+
+        building, next_cursor = split_page((await db.scalars(
+            paginate(
+                select(Building).options(*building_info_loader(expansion.include)), Building.id, skip, limit, cursor
+            )
+        )).all(), limit)
+        return catalog_cache.store(
+            request,
+            with_version(
+                success_response(
+                    200, [expansion.render(to_building_info(b, expansion.include)) for b in building], next_cursor
+                ),
+                version
+            ),
+            version,
+            generation,
+            expansion.resources
+        )
+
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @building_router.get(path="/{building_id}", response_model=ResponseEntity[List[BuildingInfo]])
-async def get_building_by_id(building_id: int, db: Session = Depends(get_db)):
+async def get_building_by_id(
+        building_id: int,
+        request: Request,
+        include: Optional[str] = None,
+        fields: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
     try:
-        building = db.query(Building).filter(Building.id == building_id).first()
+        expansion = parse_expansion("building", include, fields)
+        cached = catalog_cache.cached_response(request, expansion.resources)
+        if cached is not None:
+            return cached
+        generation = catalog_cache.generation
+        version = await tables_version(db, request, expansion.models, Building.id == building_id)
+        if is_not_modified(request, version):
+            return not_modified_response(version)
+
+        building = await load_building(db, building_id, expansion.include)
         if building is None:
             return error_response(404, "Building Not Found")
 
-        return success_response(200, to_building_info(building))
-
+        return catalog_cache.store(
+            request,
+            with_version(
+                success_response(200, expansion.render(to_building_info(building, expansion.include))), version
+            ),
+            version,
+            generation,
+            expansion.resources
+        )
+
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @building_router.post(path="/", response_model=ResponseEntity[BuildingInfo])
-async def create_building(building: BuildingCreate, db: Session = Depends(get_db)):
+async def create_building(building: BuildingCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         new_building = Building(name=building.name, code=building.code)
         db.add(new_building)
-        db.commit()
-        db.refresh(new_building)
+        await db.commit()
+        await invalidate_catalog(BUILDING)
+        db.expunge_all()
+        new_building = await load_building(db, new_building.id)
         return success_response(201, to_building_info(new_building))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @building_router.put(path="/{building_id}", response_model=ResponseEntity[BuildingInfo])
-async def update_building(building_id: int, building: BuildingUpdate, db: Session = Depends(get_db)):
+async def update_building(building_id: int, building: BuildingUpdate, db: AsyncSession = Depends(get_async_db)):
     try:
-        existing_building: Optional[Building] = db.query(Building).filter(Building.id == building_id).first()
+        existing_building: Optional[Building] = await db.scalar(select(Building).filter(Building.id == building_id))
         if existing_building is None:
             return error_response(404, "Building Not Found")
 
         existing_building.name = building.name if building.name is not None else existing_building.name
         existing_building.code = building.code if building.code is not None else existing_building.code
 
-        db.commit()
-        db.refresh(existing_building)
+        await db.commit()
+        await invalidate_catalog(BUILDING)
+        db.expunge_all()
+        existing_building = await load_building(db, building_id)
         return success_response(200, to_building_info(existing_building))
 
     except Exception as ex:
@@ -65,12 +142,14 @@ async def update_building(building_id: int, building: BuildingUpdate, db: Sessio
 
 
 @building_router.delete(path="/{building_id}", response_model=ResponseEntity[str])
-async def delete_building(building_id: int, db: Session = Depends(get_db)):
+async def delete_building(building_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        building = db.query(Building).filter(Building.id == building_id).first()
+        building = await db.scalar(select(Building).filter(Building.id == building_id))
         if building is not None:
-            db.delete(building)
-            db.commit()
+            await db.delete(building)
+            await db.commit()
+            await invalidate_catalog(BUILDING, ROOM, RESERVATION)
+            await publish_availability_resync()
             return success_response(200, "Success")
 
         else:
@@ -0,0 +1,54 @@
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRouter
+
+from dtos import *
+from models import engine, async_engine, pool_status
+from services.availability import availability_broker
+from services.catalog import catalog_cache
+from services.reservation_locks import local_slot_locks
+from utils.crypto import password_hasher
+from utils.jwt_token import current_user_cache
+from utils.metrics import gauge, render_metrics
+from utils.utils import success_response
+
+internal_router = APIRouter()
+metrics_router = APIRouter()
+
+
+@internal_router.get(path="/pool", response_model=ResponseEntity[dict])
+async def get_pool_status():
+    return success_response(
+        200,
+        {
+            "async": pool_status(async_engine.pool),
+            "sync": pool_status(engine.pool),
+        }
+    )
+
+
+def stats_gauges(prefix: str, documentation: str, stats: dict, **labels: str):
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield gauge(f"{prefix}_{key}", f"{documentation} ({key}).", [(labels, value)])
+
+
+def pool_gauges():
+    pools = {"async": pool_status(async_engine.pool), "sync": pool_status(engine.pool)}
+    for key in pools["async"]:
+        samples = [({"engine": name}, stats[key]) for name, stats in pools.items()]
+        yield gauge(f"db_pool_{key}", f"Connection pool {key}.", samples)
+
+
+@metrics_router.get(path="/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(
+        render_metrics([
+            *pool_gauges(),
+            *stats_gauges("password_hasher", "Password hashing executor", password_hasher.stats()),
+            *stats_gauges("auth_cache", "Authenticated lecturer cache", current_user_cache.stats()),
+            *stats_gauges("catalog_cache", "Building and room response cache", catalog_cache.entries.stats()),
+            *stats_gauges("availability", "Availability websocket broker", availability_broker.stats()),
+            *stats_gauges("reservation_locks", "In-process reservation slot locks", local_slot_locks.stats()),
+        ]),
+        media_type="text/plain; version=0.0.4",
+    )
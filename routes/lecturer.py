@@ -1,72 +1,157 @@
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi.routing import APIRouter
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from dtos import *
-from dtos.object_mapper import to_lecturer_info
-from models import get_db, Lecturer
+from dtos.expansion import Include, parse_expansion
+from dtos.object_mapper import to_lecturer_info, lecturer_info_loader
+from models import get_async_db, Lecturer
+from services.availability import publish_availability_resync
+from services.catalog import invalidate_catalog, LECTURER, SCHEDULE, RESERVATION
+from services.timetable import timetable_response
+from utils.conditional import tables_version, is_not_modified, not_modified_response, with_version
+from utils.pagination import paginate, split_page
+from utils.crypto import hash_password_async, PasswordHasherBusy
+from utils.jwt_token import invalidate_current_user
 from utils.utils import success_response, error_response, exception_to_string
 
 lecturer_router = APIRouter()
 
 
+async def load_lecturer(db: AsyncSession, lid: int, include: Optional[Include] = None) -> Optional[Lecturer]:
+    return await db.scalar(
+        select(Lecturer)
+        .options(*lecturer_info_loader(include))
+        .filter(Lecturer.id == lid)
+    )
+
+
 @lecturer_router.get(path="/", response_model=ResponseEntity[LecturerInfo])
-async def get_lecturers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_lecturers(
+        request: Request,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include: Optional[str] = None,
+        fields: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
     try:
-        lecturers = db.query(Lecturer).offset(skip).limit(limit).all()
-        return success_response(
-            200,
-            [to_lecturer_info(lecturer) for lecturer in lecturers]
+        expansion = parse_expansion("lecturer", include, fields)
+        version = await tables_version(db, request, expansion.models)
+        if is_not_modified(request, version):
+            return not_modified_response(version)
+
+        lecturers, next_cursor = split_page((await db.scalars(
+            paginate(
+                select(Lecturer).options(*lecturer_info_loader(expansion.include)), Lecturer.id, skip, limit, cursor
+            )
+        )).all(), limit)
+        return with_version(
+            success_response(
+                200,
+                [expansion.render(to_lecturer_info(lecturer, expansion.include)) for lecturer in lecturers],
+                next_cursor
+            ),
+            version
         )
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @lecturer_router.get(path="/{lid}", response_model=ResponseEntity[LecturerInfo])
-async def get_lecturer_by_id(lid: int, db: Session = Depends(get_db)):
+async def get_lecturer_by_id(
+        lid: int,
+        request: Request,
+        include: Optional[str] = None,
+        fields: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
     try:
-        lecturer = db.query(Lecturer).filter(Lecturer.id == lid).first()
-        return success_response(
-            200,
-            to_lecturer_info(lecturer)
+        expansion = parse_expansion("lecturer", include, fields)
+        version = await tables_version(db, request, expansion.models, Lecturer.id == lid)
+        if is_not_modified(request, version):
+            return not_modified_response(version)
+
+        lecturer = await load_lecturer(db, lid, expansion.include)
+        if lecturer is None:
+            return error_response(404, "Lecturer is not found!")
+        return with_version(
+            success_response(
+                200,
+                expansion.render(to_lecturer_info(lecturer, expansion.include))
+            ),
+            version
         )
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
+    except Exception as ex:
+        return error_response(500, exception_to_string(ex))
+
+
+@lecturer_router.get(path="/{lid}/timetable", response_model=ResponseEntity[Timetable])
+async def get_lecturer_timetable(
+        lid: int,
+        request: Request,
+        week: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        timetable = await timetable_response(db, request, "lecturer", lid, week)
+        if timetable is None:
+            return error_response(404, "Lecturer is not found!")
+        return timetable
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @lecturer_router.put(path="/{lid}", response_model=ResponseEntity[LecturerInfo])
-async def update_lecturer(lid: int, lecturerInfo: LectureUpdate, db: Session = Depends(get_db)):
+async def update_lecturer(lid: int, lecturerInfo: LectureUpdate, db: AsyncSession = Depends(get_async_db)):
     try:
-        lecturer = db.query(Lecturer).filter(Lecturer.id == lid).first()
+        lecturer = await db.scalar(select(Lecturer).filter(Lecturer.id == lid))
         if lecturer is None:
             return error_response(404, "Lecturer not found!")
+        previous_username = lecturer.username
 
         lecturer.dob = lecturerInfo.dob if lecturerInfo.dob is not None else lecturer.dob
         lecturer.first_name = lecturerInfo.first_name if lecturerInfo.first_name is not None else lecturer.first_name
         lecturer.last_name = lecturerInfo.last_name if lecturerInfo.last_name is not None else lecturer.last_name
         lecturer.username = lecturerInfo.username if lecturerInfo.username is not None else lecturer.username
-        lecturer.password = lecturerInfo.password if lecturerInfo.password is not None else lecturer.password
+        lecturer.password = await hash_password_async(lecturerInfo.password) if lecturerInfo.password is not None else lecturer.password
         lecturer.email = lecturerInfo.email if lecturerInfo.email is not None else lecturer.email
         lecturer.faculty = lecturerInfo.faculty if lecturerInfo.faculty is not None else lecturer.faculty
         lecturer.gender = lecturerInfo.gender if lecturerInfo.gender is not None else lecturer.gender
 
-        db.commit()
-        db.refresh(lecturer)
+        await db.commit()
+        await invalidate_catalog(LECTURER)
+        await invalidate_current_user(previous_username, lecturer.username)
+        db.expunge_all()
+        lecturer = await load_lecturer(db, lid)
 
         return success_response(
             200,
             to_lecturer_info(lecturer)
         )
+    except PasswordHasherBusy as ex:
+        return error_response(503, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @lecturer_router.delete(path="/{lid}", response_model=ResponseEntity[str])
-async def delete_lecturer(lid: int, db: Session = Depends(get_db)):
+async def delete_lecturer(lid: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        lec = db.query(Lecturer).filter(Lecturer.id == lid).first()
-        db.delete(lec)
-        db.commit()
+        lec = await db.scalar(select(Lecturer).filter(Lecturer.id == lid))
+        await db.delete(lec)
+        await db.commit()
+        await invalidate_catalog(LECTURER, SCHEDULE, RESERVATION)
+        await publish_availability_resync()
+        await invalidate_current_user(lec.username)
         return success_response(200, "Success!")
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
@@ -1,61 +1,187 @@
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi.routing import APIRouter
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from dtos import *
-from dtos.object_mapper import to_room_info
-from models import get_db
-from models.models import Room
+from dtos.expansion import Include, parse_expansion
+from dtos.object_mapper import to_room_info, room_info_loader, string_to_datetime
+from models import get_async_db, TimeBlock
+from models.models import Room, RoomOccupancy
+from services.availability import publish_availability_resync
+from services.occupancy import block_mask
+from services.catalog import catalog_cache, invalidate_catalog, ROOM, RESERVATION
+from services.timetable import timetable_response
+from utils.conditional import tables_version, is_not_modified, not_modified_response, with_version
+from utils.pagination import paginate, split_page
 from utils.utils import exception_to_string, error_response, success_response
 
 room_router = APIRouter()
 
 
+async def load_room(db: AsyncSession, room_id: int, include: Optional[Include] = None) -> Optional[Room]:
+    return await db.scalar(
+        select(Room)
+        .options(*room_info_loader(include))
+        .filter(Room.id == room_id)
+    )
+
+
 @room_router.get(path="/", response_model=ResponseEntity[List[RoomInfo]])
-async def get_rooms(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_rooms(
+        request: Request,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include: Optional[str] = None,
+        fields: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
     try:
-        room = db.query(Room).offset(skip).limit(limit).all()
-        return success_response(200, [to_room_info(b) for b in room])
+        expansion = parse_expansion("room", include, fields)
+        cached = catalog_cache.cached_response(request, expansion.resources)
+        if cached is not None:
+            return cached
+        generation = catalog_cache.generation
+        version = await tables_version(db, request, expansion.models)
+        if is_not_modified(request, version):
+            return not_modified_response(version)
+
+        room, next_cursor = split_page((await db.scalars(
+            paginate(select(Room).options(*room_info_loader(expansion.include)), Room.id, skip, limit, cursor)
+        )).all(), limit)
+        return catalog_cache.store(
+            request,
+            with_version(
+                success_response(
+                    200, [expansion.render(to_room_info(b, expansion.include)) for b in room], next_cursor
+                ),
+                version
+            ),
+            version,
+            generation,
+            expansion.resources
+        )
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
+    except Exception as ex:
+        return error_response(500, exception_to_string(ex))
+
+
+@room_router.get(path="/available", response_model=ResponseEntity[List[RoomInfo]])
+async def get_available_rooms(
+        date: str,
+        start_block: TimeBlock,
+        end_block: TimeBlock,
+        min_capacity: Optional[int] = None,
+        building_id: Optional[int] = None,
+        include: Optional[str] = None,
+        fields: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        expansion = parse_expansion("room", include, fields)
+        mask = block_mask(start_block, end_block)
+        busy = select(RoomOccupancy.id).where(
+            RoomOccupancy.room_id == Room.id,
+            RoomOccupancy.date == string_to_datetime(date).date(),
+            RoomOccupancy.mask.bitwise_and(mask) != 0,
+        )
+        query = select(Room).options(*room_info_loader(expansion.include)).where(~busy.exists())
+        if min_capacity is not None:
+            query = query.where(Room.capacity >= min_capacity)
+        if building_id is not None:
+            query = query.where(Room.building_id == building_id)
+
+        rooms = (await db.scalars(query.order_by(Room.id))).all()
+        return success_response(200, [expansion.render(to_room_info(room, expansion.include)) for room in rooms])
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @room_router.get(path="/{room_id}", response_model=ResponseEntity[List[RoomInfo]])
-async def get_room_by_id(room_id: int, db: Session = Depends(get_db)):
+async def get_room_by_id(
+        room_id: int,
+        request: Request,
+        include: Optional[str] = None,
+        fields: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
     try:
-        room = db.query(Room).filter(Room.id == room_id).first()
+        expansion = parse_expansion("room", include, fields)
+        cached = catalog_cache.cached_response(request, expansion.resources)
+        if cached is not None:
+            return cached
+        generation = catalog_cache.generation
+        version = await tables_version(db, request, expansion.models, Room.id == room_id)
+        if is_not_modified(request, version):
+            return not_modified_response(version)
+
+        room = await load_room(db, room_id, expansion.include)
         if room is None:
             return error_response(404, "Room Not Found")
-        return success_response(200, to_room_info(room))
+        return catalog_cache.store(
+            request,
+            with_version(success_response(200, expansion.render(to_room_info(room, expansion.include))), version),
+            version,
+            generation,
+            expansion.resources
+        )
+
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
+    except Exception as ex:
+        return error_response(500, exception_to_string(ex))
 
+
+@room_router.get(path="/{room_id}/timetable", response_model=ResponseEntity[Timetable])
+async def get_room_timetable(
+        room_id: int,
+        request: Request,
+        week: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        timetable = await timetable_response(db, request, "room", room_id, week)
+        if timetable is None:
+            return error_response(404, "Room is not found!")
+        return timetable
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @room_router.post(path="/", response_model=ResponseEntity[RoomInfo])
-async def create_room(room: RoomCreate, db: Session = Depends(get_db)):
+async def create_room(room: RoomCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         new_room = Room(**room.model_dump())
         db.add(new_room)
-        db.commit()
-        db.refresh(new_room)
+        await db.commit()
+        await invalidate_catalog(ROOM)
+        db.expunge_all()
+        new_room = await load_room(db, new_room.id)
         return success_response(201, to_room_info(new_room))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @room_router.put(path="/{room_id}", response_model=ResponseEntity[RoomInfo])
-async def update_room(room_id: int, room: RoomUpdate, db: Session = Depends(get_db)):
+async def update_room(room_id: int, room: RoomUpdate, db: AsyncSession = Depends(get_async_db)):
     try:
-        existing_room: Optional[Room] = db.query(Room).filter(Room.id == room_id).first()
+        existing_room: Optional[Room] = await db.scalar(select(Room).filter(Room.id == room_id))
         if existing_room is None:
             return error_response(404, "Room Not Found")
 
         existing_room.name = room.name if room.name is not None else existing_room.name
         existing_room.code = room.code if room.code is not None else existing_room.code
 
-        db.commit()
-        db.refresh(existing_room)
+        await db.commit()
+        await invalidate_catalog(ROOM)
+        db.expunge_all()
+        existing_room = await load_room(db, room_id)
         return success_response(200, to_room_info(existing_room))
 
     except Exception as ex:
@@ -63,12 +189,14 @@ async def update_room(room_id: int, room: RoomUpdate, db: Session = Depends(get_
 
 
 @room_router.delete(path="/{room_id}", response_model=ResponseEntity[str])
-async def delete_room(room_id: int, db: Session = Depends(get_db)):
+async def delete_room(room_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        room = db.query(Room).filter(Room.id == room_id).first()
+        room = await db.scalar(select(Room).filter(Room.id == room_id))
         if room is not None:
-            db.delete(room)
-            db.commit()
+            await db.delete(room)
+            await db.commit()
+            await invalidate_catalog(ROOM, RESERVATION)
+            await publish_availability_resync()
             return success_response(200, "Success")
 
         else:
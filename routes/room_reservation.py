@@ -1,27 +1,130 @@
-from fastapi import Depends
+import asyncio
+import io
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from fastapi import Depends, Query, UploadFile
 from fastapi.routing import APIRouter
-from sqlalchemy.orm import Session
-from sqlalchemy.sql.operators import or_, and_
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse, FileResponse
 
 from dtos import *
-from dtos.object_mapper import to_room_reservation, string_to_datetime
-from models import get_db
+from dtos.expansion import Include, parse_expansion
+from dtos.object_mapper import to_room_reservation, string_to_datetime, datetime_to_string, room_reservation_loader
+from models import get_async_db, AsyncSessionLocal, run_in_sync_session
 from models.models import Room, RoomReservation, Schedule, Lecturer
-from utils.jwt_token import get_current_user
-from utils.utils import exception_to_string, error_response, success_response
+from services import occupancy
+from services.occupancy import block_mask
+from services.export import export_query, export_reservations, stream_csv, EXPORT_FORMATS, DEFAULT_CHUNK_SIZE
+from services.assignment_solver import solve
+from services.audit import run_audit
+from services.availability import (
+    availability_event, publish_availability, publish_availability_resync, RESERVED, RELEASED,
+)
+from services.reservation_locks import run_locked, ReservationBusy
+from services.reservations import bulk_reserve, dates_between
+from services.room_assignment import load_assignment_problem, commit_assignments, AssignmentConflict
+from services.timetable_import import import_timetable
+from services.catalog import invalidate_catalog, RESERVATION, SCHEDULE, TIMETABLE
+from services.timetable import timetable_tags
+from setting import settings
+from utils.jwt_token import get_current_user, CurrentLecturer
+from utils.pagination import paginate, split_page
+from utils.utils import exception_to_string, error_response, success_response, EntityResponse
 
 room_reservation_router = APIRouter()
 
 
+async def load_reservation(db: AsyncSession, rid: int, include: Optional[Include] = None) -> Optional[RoomReservation]:
+    return await db.scalar(
+        select(RoomReservation)
+        .options(*room_reservation_loader(include))
+        .filter(RoomReservation.id == rid)
+    )
+
+
+async def room_buildings(db: AsyncSession, room_ids: Iterable[int]) -> Dict[int, int]:
+    return dict((await db.execute(select(Room.id, Room.building_id).where(Room.id.in_(set(room_ids))))).all())
+
+
 @room_reservation_router.get(path="/", response_model=ResponseEntity[List[RoomReservationInfo]])
-async def get_reservations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_reservations(
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include: Optional[str] = None,
+        fields: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
     try:
-        reservations = db.query(RoomReservation).offset(skip).limit(limit).all()
+        expansion = parse_expansion("reservation", include, fields)
+        reservations, next_cursor = split_page((await db.scalars(
+            paginate(
+                select(RoomReservation).options(*room_reservation_loader(expansion.include)),
+                RoomReservation.id, skip, limit, cursor
+            )
+        )).all(), limit)
         return success_response(
             200,
-            [to_room_reservation(reservation) for reservation in reservations]
+            [expansion.render(to_room_reservation(reservation, expansion.include)) for reservation in reservations],
+            next_cursor
         )
 
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
+    except Exception as ex:
+        return error_response(500, exception_to_string(ex))
+
+
+@room_reservation_router.get(path="/export")
+async def export_reservation_snapshot(
+        export_format: str = Query(default="csv", alias="format"),
+        start: Optional[str] = Query(default=None, alias="from"),
+        end: Optional[str] = Query(default=None, alias="to"),
+        building_id: Optional[int] = None,
+):
+    try:
+        if export_format not in EXPORT_FORMATS:
+            return error_response(400, f"Unsupported export format: {export_format}")
+        first = string_to_datetime(start) if start is not None else None
+        last = string_to_datetime(end) if end is not None else None
+
+        if export_format == "csv":
+            query = export_query(first, last, building_id).execution_options(yield_per=DEFAULT_CHUNK_SIZE)
+
+            async def csv_body():
+                async with AsyncSessionLocal() as session:
+                    result = await session.stream(query)
+                    async for chunk in stream_csv(result.partitions()):
+                        yield chunk
+
+            return StreamingResponse(
+                csv_body(),
+                media_type="text/csv",
+                headers={"Content-Disposition": 'attachment; filename="reservations.csv"'}
+            )
+
+        with tempfile.NamedTemporaryFile(suffix=".parquet", delete=False) as file:
+            pass
+        try:
+            # encoding row groups is CPU bound, the whole file is built in a worker thread
+            await run_in_sync_session(export_reservations, file.name, export_format, first, last, building_id)
+        except BaseException:
+            os.remove(file.name)
+            raise
+        return FileResponse(
+            file.name,
+            media_type="application/vnd.apache.parquet",
+            filename="reservations.parquet",
+            background=BackgroundTask(os.remove, file.name)
+        )
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
@@ -29,65 +132,327 @@ async def get_reservations(skip: int = 0, limit: int = 100, db: Session = Depend
 @room_reservation_router.post(path="/", response_model=ResponseEntity[List[RoomReservationInfo]])
 async def create_reservations(
         reservation_info: RoomReservationCreate,
-        lecturer: Lecturer = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        lecturer: CurrentLecturer = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
 ):
     try:
         schedule = None
         room = None
 
         if reservation_info.schedule_id is not None:
-            schedule = db.query(Schedule).filter(Schedule.id == reservation_info.schedule_id).first()
+            schedule = await db.scalar(select(Schedule).filter(Schedule.id == reservation_info.schedule_id))
             if schedule is None:
                 return error_response(
                     404,
                     "Schedule is not found!"
                 )
         if reservation_info.lecturer_id is not None:
-            lecturer = db.query(Lecturer).filter(Lecturer.id == reservation_info.lecturer_id).first()
+            lecturer = await db.scalar(select(Lecturer).filter(Lecturer.id == reservation_info.lecturer_id))
             if lecturer is None:
                 return error_response(
                     404,
                     "Lecturer is not found!"
                 )
         if reservation_info.room_id is not None:
-            room = db.query(Room).filter(Room.id == reservation_info.room_id).first()
+            room = await db.scalar(select(Room).filter(Room.id == reservation_info.room_id))
             if room is None:
                 return error_response(
                     404,
                     "Room is not found!"
                 )
 
-        reservations = db.query(RoomReservation).filter(
-            RoomReservation.date == string_to_datetime(reservation_info.date),
-        ).filter(
-            or_(
-                RoomReservation.start_block == schedule.start_block,
-                RoomReservation.end_block == schedule.end_block,
+        if schedule is None or room is None:
+            return error_response(
+                400,
+                "Room and schedule are required!"
             )
-        ).all()
 
-        if len(reservations) > 0:
+        reservation_date = string_to_datetime(reservation_info.date)
+        reservation_info.lecturer_id = lecturer.id
+        reservation_info.start_block = schedule.start_block
+        reservation_info.end_block = schedule.end_block
+        # plain values, a retried attempt rolls back and expires the loaded rows
+        room_id, building_id = room.id, room.building_id
+        mask = block_mask(schedule.start_block, schedule.end_block)
+
+        async def book() -> Optional[int]:
+            if not await db.run_sync(occupancy.reserve, room_id, reservation_date, mask):
+                await db.rollback()
+                return None
+            new_reservation = RoomReservation(**reservation_info.model_dump(exclude={"date"}), date=reservation_date)
+            db.add(new_reservation)
+            await db.commit()
+            return new_reservation.id
+
+        try:
+            reservation_id = await run_locked(db, [(room_id, reservation_date)], book)
+        except ReservationBusy as ex:
+            return error_response(409, exception_to_string(ex))
+        if reservation_id is None:
             return error_response(
                 409,
                 "Room is already reserved!"
             )
-        reservation_info.lecturer_id = lecturer.id
-        reservation_info.start_block = schedule.start_block
-        reservation_info.end_block = schedule.end_block
+        await invalidate_catalog(
+            RESERVATION, *timetable_tags(room_id, reservation_info.lecturer_id, [reservation_date])
+        )
+        await publish_availability([
+            availability_event(
+                RESERVED, reservation_id, room_id, building_id, reservation_date,
+                reservation_info.start_block, reservation_info.end_block,
+            )
+        ])
+        db.expunge_all()
+        new_reservation = await load_reservation(db, reservation_id)
+        return success_response(
+            201,
+            to_room_reservation(new_reservation)
+        )
+
+
+    except Exception as ex:
+        return error_response(500, exception_to_string(ex))
+
+
+@room_reservation_router.post(path="/bulk", response_model=ResponseEntity[List[RoomReservationBulkResult]])
+async def create_bulk_reservations(
+        bulk_info: RoomReservationBulkCreate,
+        lecturer: CurrentLecturer = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        schedule = await db.scalar(select(Schedule).filter(Schedule.id == bulk_info.schedule_id))
+        if schedule is None:
+            return error_response(
+                404,
+                "Schedule is not found!"
+            )
+        room = await db.scalar(select(Room).filter(Room.id == bulk_info.room_id))
+        if room is None:
+            return error_response(
+                404,
+                "Room is not found!"
+            )
+        if bulk_info.lecturer_id is not None:
+            lecturer = await db.scalar(select(Lecturer).filter(Lecturer.id == bulk_info.lecturer_id))
+            if lecturer is None:
+                return error_response(
+                    404,
+                    "Lecturer is not found!"
+                )
 
-        print(reservation_info.model_dump())
+        start = string_to_datetime(bulk_info.start_date)
+        end = string_to_datetime(bulk_info.end_date)
+        if start > end:
+            return error_response(
+                400,
+                "Start date is after end date!"
+            )
+        dates = [datetime.combine(day, start.time()) for day in dates_between(start.date(), end.date(), bulk_info.weekdays)]
 
-        new_reservation = RoomReservation(**reservation_info.model_dump())
+        room_id, building_id, lecturer_id = room.id, room.building_id, lecturer.id
+        start_block, end_block = schedule.start_block, schedule.end_block
+
+        async def book() -> List[Tuple[datetime, Optional[int]]]:
+            booked = await db.run_sync(bulk_reserve, room_id, schedule, lecturer_id, dates)
+            await db.commit()
+            return booked
+
+        try:
+            booked = await run_locked(db, [(room_id, day) for day in dates], book)
+        except ReservationBusy as ex:
+            return error_response(409, exception_to_string(ex))
+        await invalidate_catalog(
+            RESERVATION,
+            *timetable_tags(room_id, lecturer_id, [day for day, reservation_id in booked if reservation_id is not None])
+        )
+        await publish_availability(
+            availability_event(RESERVED, reservation_id, room_id, building_id, day, start_block, end_block)
+            for day, reservation_id in booked if reservation_id is not None
+        )
 
-        db.add(new_reservation)
-        db.commit()
         return success_response(
             201,
-            to_room_reservation(new_reservation)
+            [
+                RoomReservationBulkResult(
+                    date=datetime_to_string(day),
+                    accepted=reservation_id is not None,
+                    reservation_id=reservation_id,
+                    error_message=None if reservation_id is not None else "Room is already reserved!",
+                )
+                for day, reservation_id in booked
+            ]
+        )
+    except Exception as ex:
+        return error_response(500, exception_to_string(ex))
+
+
+@room_reservation_router.post(path="/audit", response_model=ResponseEntity[ReservationAuditInfo])
+async def audit_reservations(
+        incremental: bool = False,
+        start: Optional[str] = Query(default=None, alias="from"),
+        end: Optional[str] = Query(default=None, alias="to"),
+        lecturer: CurrentLecturer = Depends(get_current_user),
+):
+    try:
+        # a full scan takes seconds on a year of bookings, it runs in a worker thread
+        report = await run_in_sync_session(
+            run_audit,
+            incremental,
+            string_to_datetime(start) if start is not None else None,
+            string_to_datetime(end) if end is not None else None,
         )
+        return success_response(
+            200,
+            ReservationAuditInfo(
+                run_id=report.run_id,
+                mode=report.mode,
+                since=datetime_to_string(report.since) if report.since is not None else None,
+                rows_scanned=report.rows_scanned,
+                room_conflicts=report.count("room"),
+                lecturer_conflicts=report.count("lecturer"),
+                overlaps=[
+                    ReservationOverlapInfo(
+                        kind=overlap.kind,
+                        owner_id=overlap.owner_id,
+                        date=overlap.day.isoformat(),
+                        reservation_ids=[overlap.first_id, overlap.second_id],
+                        start_block=overlap.start_block,
+                        end_block=overlap.end_block,
+                    )
+                    for overlap in report.overlaps
+                ],
+            )
+        )
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
+    except Exception as ex:
+        return error_response(500, exception_to_string(ex))
+
 
+def term_dates(start_date: str, end_date: str, weekdays: List[int]) -> List[datetime]:
+    start = string_to_datetime(start_date)
+    end = string_to_datetime(end_date)
+    if start > end:
+        raise ValueError("Start date is after end date!")
+    return [datetime.combine(day, start.time()) for day in dates_between(start.date(), end.date(), weekdays)]
 
+
+@room_reservation_router.post(path="/assignments/preview", response_model=ResponseEntity[RoomAssignmentPlan])
+async def preview_room_assignments(
+        spec: RoomAssignmentRequest,
+        lecturer: CurrentLecturer = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        started = time.perf_counter()
+        dates = term_dates(spec.start_date, spec.end_date, spec.weekdays)
+        schedules, rooms = await db.run_sync(
+            load_assignment_problem, dates, spec.schedule_ids, spec.faculty, spec.building_ids, spec.min_capacity
+        )
+        # hand the connection back to the pool while the solver runs
+        await db.rollback()
+        solution = await asyncio.get_running_loop().run_in_executor(
+            None,
+            solve,
+            schedules,
+            rooms,
+            settings.ASSIGNMENT_TIME_LIMIT_SECONDS,
+            settings.ASSIGNMENT_SOLVER_WORKERS or None,
+        )
+
+        building_of = {room.id: room.building_id for room in rooms}
+        return success_response(
+            200,
+            RoomAssignmentPlan(
+                assignments=[
+                    ScheduleAssignment(
+                        schedule_id=schedule.id,
+                        room_id=solution.rooms.get(schedule.id),
+                        building_id=building_of.get(solution.rooms.get(schedule.id)),
+                    )
+                    for schedule in schedules
+                ],
+                assigned=len(schedules) - solution.unassigned,
+                unassigned=solution.unassigned,
+                building_changes=solution.building_changes,
+                partitions=solution.partitions,
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
+        )
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
+    except Exception as ex:
+        return error_response(500, exception_to_string(ex))
+
+
+@room_reservation_router.post(path="/assignments/commit", response_model=ResponseEntity[RoomAssignmentResult])
+async def commit_room_assignments(
+        plan: RoomAssignmentCommit,
+        lecturer: CurrentLecturer = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        dates = term_dates(plan.start_date, plan.end_date, plan.weekdays)
+        assignments = [
+            (assignment.schedule_id, assignment.room_id)
+            for assignment in plan.assignments if assignment.room_id is not None
+        ]
+        if len({schedule_id for schedule_id, _ in assignments}) != len(assignments):
+            return error_response(400, "A schedule is assigned more than once!")
+
+
+        async def book() -> int:
+            created = await db.run_sync(commit_assignments, assignments, dates)
+            await db.commit()
+            return created
+
+        try:
+            # the distinct (room, day) keys of the whole plan, taken in one statement
+            created = await run_locked(db, [(room_id, day) for _, room_id in assignments for day in dates], book)
+        except AssignmentConflict as ex:
+            await db.rollback()
+            return error_response(409, exception_to_string(ex))
+        except ReservationBusy as ex:
+            return error_response(409, exception_to_string(ex))
+        await invalidate_catalog(RESERVATION, TIMETABLE)
+        await publish_availability_resync()
+        return success_response(201, RoomAssignmentResult(schedules=len(assignments), reservations=created))
+    except ValueError as ex:
+        await db.rollback()
+        return error_response(400, exception_to_string(ex))
+    except Exception as ex:
+        return error_response(500, exception_to_string(ex))
+
+
+@room_reservation_router.post(path="/import", response_model=ResponseEntity[TimetableImportResult])
+async def import_timetable_csv(
+        file: UploadFile,
+        lecturer: CurrentLecturer = Depends(get_current_user),
+):
+    try:
+        text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        try:
+            summary = await run_in_sync_session(import_timetable, text)
+        finally:
+            text.detach()
+        await invalidate_catalog(RESERVATION, SCHEDULE, TIMETABLE)
+        await publish_availability_resync()
+        return success_response(
+            200,
+            TimetableImportResult(
+                rows=summary.rows,
+                imported=summary.imported,
+                rejected=summary.rejected,
+                schedules_created=summary.schedules_created,
+                errors=[
+                    TimetableImportError(line=error.line, error_message=error.error_message)
+                    for error in summary.errors
+                ],
+            )
+        )
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
@@ -95,41 +460,127 @@ async def create_reservations(
 @room_reservation_router.put(path="/{rid}", response_model=ResponseEntity[List[RoomReservationInfo]])
 async def update_reservations(
         rid: int, reservation_info: RoomReservationUpdate,
-        lecturer: Lecturer = Depends(get_current_user),
-        db: Session = Depends(get_db),
+        lecturer: CurrentLecturer = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db),
 ):
     try:
-        reservation: Optional[RoomReservation] = db.query(RoomReservation).filter(RoomReservation.id == rid).first()
+        reservation: Optional[RoomReservation] = await db.scalar(
+            select(RoomReservation).filter(RoomReservation.id == rid)
+        )
         if reservation is None:
             return error_response(
                 404,
                 "Reservation is not found!"
             )
+        previous_tags = timetable_tags(reservation.room_id, reservation.lecturer_id, [reservation.date])
+        released = (reservation.room_id, reservation.date, reservation.start_block, reservation.end_block)
+        target = (
+            reservation_info.room_id if reservation_info.room_id is not None else reservation.room_id,
+            string_to_datetime(reservation_info.date) if reservation_info.date is not None else reservation.date,
+        )
+        blocks = (
+            reservation_info.start_block if reservation_info.start_block is not None else reservation.start_block,
+            reservation_info.end_block if reservation_info.end_block is not None else reservation.end_block,
+        )
+        # an inverted or unknown block range is the client's mistake, rejected before any lock is taken
+        mask = block_mask(*blocks)
+
+        async def move() -> Optional[EntityResponse]:
+            # reloaded under the locks into the same instance, it may have moved or gone since it was read
+            current = await db.scalar(
+                select(RoomReservation).filter(RoomReservation.id == rid).execution_options(populate_existing=True)
+            )
+            if current is None:
+                await db.rollback()
+                return error_response(404, "Reservation is not found!")
+            if (current.room_id, current.date, current.start_block, current.end_block) != released:
+                await db.rollback()
+                return error_response(409, "Reservation was changed by another request, please retry!")
+
+            reservation.lecturer_id = reservation_info.lecturer_id if reservation_info.lecturer_id is not None else reservation.lecturer_id
+            reservation.schedule_id = reservation_info.schedule_id if reservation_info.schedule_id is not None else reservation.schedule_id
+            reservation.room_id, reservation.date = target
+            reservation.start_block, reservation.end_block = blocks
+
+            await db.run_sync(occupancy.release, released[0], released[1], block_mask(*released[2:]))
+            reserved = await db.run_sync(occupancy.reserve, reservation.room_id, reservation.date, mask)
+            if not reserved:
+                await db.rollback()
+                return error_response(
+                    409,
+                    "Room is already reserved!"
+                )
+            await db.commit()
+            return None
 
-        reservation.lecturer_id = reservation_info.lecturer_id if reservation_info.lecturer_id is not None else reservation.lecturer_id
-        reservation.schedule_id = reservation_info.schedule_id if reservation_info.schedule_id is not None else reservation.schedule_id
-        reservation.room_id = reservation_info.room_id if reservation_info.room_id is not None else reservation.room_id
-        reservation.date = reservation_info.date if reservation_info.date is not None else reservation.date
-        reservation.start_block = reservation_info.start_block if reservation_info.start_block is not None else reservation.start_block
-        reservation.end_block = reservation_info.end_block if reservation_info.end_block is not None else reservation.end_block
+        try:
+            error = await run_locked(db, [released[:2], target], move)
+        except ReservationBusy as ex:
+            return error_response(409, exception_to_string(ex))
+        if error is not None:
+            return error
 
-        db.commit()
-        db.refresh(reservation)
+        tags = previous_tags | timetable_tags(reservation.room_id, reservation.lecturer_id, [reservation.date])
+        await invalidate_catalog(RESERVATION, *tags)
+        buildings = await room_buildings(db, [released[0], reservation.room_id])
+        await publish_availability([
+            availability_event(RELEASED, rid, released[0], buildings[released[0]], *released[1:]),
+            availability_event(
+                RESERVED, rid, reservation.room_id, buildings[reservation.room_id], reservation.date,
+                reservation.start_block, reservation.end_block,
+            ),
+        ])
+        db.expunge_all()
+        reservation = await load_reservation(db, rid)
         return success_response(
             200,
             to_room_reservation(reservation)
         )
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @room_reservation_router.delete(path="/{rid}", response_model=ResponseEntity[List[RoomReservationInfo]])
-async def delete_reservations(rid: int, db: Session = Depends(get_db)):
+async def delete_reservations(rid: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        reservation = db.query(RoomReservation).filter(RoomReservation.id == rid).first()
-        if reservation is not None:
-            db.delete(reservation)
-            db.commit()
+        reservation = await db.scalar(select(RoomReservation).filter(RoomReservation.id == rid))
+        if reservation is None:
+            return error_response(404, "Reservation is not found!")
+
+        tags = timetable_tags(reservation.room_id, reservation.lecturer_id, [reservation.date])
+        buildings = await room_buildings(db, [reservation.room_id])
+        released = availability_event(
+            RELEASED, reservation.id, reservation.room_id, buildings[reservation.room_id], reservation.date,
+            reservation.start_block, reservation.end_block,
+        )
+        position = (reservation.room_id, reservation.date, reservation.start_block, reservation.end_block)
+
+        async def remove() -> Optional[EntityResponse]:
+            current = await db.scalar(
+                select(RoomReservation).filter(RoomReservation.id == rid).execution_options(populate_existing=True)
+            )
+            if current is None:
+                await db.rollback()
+                return error_response(404, "Reservation is not found!")
+            if (current.room_id, current.date, current.start_block, current.end_block) != position:
+                await db.rollback()
+                return error_response(409, "Reservation was changed by another request, please retry!")
+            await db.run_sync(occupancy.release_reservation, current)
+            await db.delete(current)
+            await db.commit()
+            return None
+
+        try:
+            error = await run_locked(db, [position[:2]], remove)
+        except ReservationBusy as ex:
+            return error_response(409, exception_to_string(ex))
+        if error is not None:
+            return error
+        await invalidate_catalog(RESERVATION, *tags)
+        await publish_availability([released])
+        return success_response(200, "Success")
 
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
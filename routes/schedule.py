@@ -1,49 +1,108 @@
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi.routing import APIRouter
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from dtos import *
-from dtos.object_mapper import to_schedule_info
-from models import get_db, Schedule, Lecturer
-from utils.utils import error_response, exception_to_string, success_response
+from dtos.expansion import Include, parse_expansion
+from dtos.object_mapper import to_schedule_info, schedule_info_loader
+from models import get_async_db, Schedule, Lecturer, RoomReservation
+from services import occupancy
+from services.availability import publish_availability_resync
+from services.catalog import invalidate_catalog, SCHEDULE, RESERVATION
+from services.reservation_locks import run_locked, ReservationBusy
+from utils.conditional import tables_version, is_not_modified, not_modified_response, with_version
+from utils.pagination import paginate, split_page
+from utils.utils import error_response, exception_to_string, success_response, EntityResponse
 
 schedule_router = APIRouter()
 
 
+def reservation_slots(sche_id: int):
+    return select(RoomReservation.room_id, RoomReservation.date).where(RoomReservation.schedule_id == sche_id)
+
+
+async def load_schedule(db: AsyncSession, sche_id: int, include: Optional[Include] = None) -> Optional[Schedule]:
+    return await db.scalar(
+        select(Schedule)
+        .options(*schedule_info_loader(include))
+        .filter(Schedule.id == sche_id)
+    )
+
+
 @schedule_router.get(path="/", response_model=ResponseEntity[ScheduleInfo])
-async def get_schedules(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_schedules(
+        request: Request,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include: Optional[str] = None,
+        fields: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
     try:
-        schedules = db.query(Schedule).offset(skip).limit(limit).all()
-        return success_response(
-            200,
-            [to_schedule_info(data) for data in schedules]
+        expansion = parse_expansion("schedule", include, fields)
+        version = await tables_version(db, request, expansion.models)
+        if is_not_modified(request, version):
+            return not_modified_response(version)
+
+        schedules, next_cursor = split_page((await db.scalars(
+            paginate(
+                select(Schedule).options(*schedule_info_loader(expansion.include)), Schedule.id, skip, limit, cursor
+            )
+        )).all(), limit)
+        return with_version(
+            success_response(
+                200,
+                [expansion.render(to_schedule_info(data, expansion.include)) for data in schedules],
+                next_cursor
+            ),
+            version
         )
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @schedule_router.get(path="/{sche_id}", response_model=ResponseEntity[ScheduleInfo])
-async def get_schedule_by_id(sche_id: int, db: Session = Depends(get_db)):
+async def get_schedule_by_id(
+        sche_id: int,
+        request: Request,
+        include: Optional[str] = None,
+        fields: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+):
     try:
-        schedule = db.query(Schedule).filter(Schedule.id == sche_id).first()
-        if schedule is not None:
+        expansion = parse_expansion("schedule", include, fields)
+        version = await tables_version(db, request, expansion.models, Schedule.id == sche_id)
+        if is_not_modified(request, version):
+            return not_modified_response(version)
+
+        schedule = await load_schedule(db, sche_id, expansion.include)
+        if schedule is None:
             return error_response(
                 404,
                 "Schedule is not found"
             )
-        return success_response(
-            200,
-            to_schedule_info(schedule)
+        return with_version(
+            success_response(
+                200,
+                expansion.render(to_schedule_info(schedule, expansion.include))
+            ),
+            version
         )
+    except ValueError as ex:
+        return error_response(400, exception_to_string(ex))
     except Exception as ex:
         return error_response(500, exception_to_string(ex))
 
 
 @schedule_router.post(path="/", response_model=ResponseEntity[ScheduleInfo])
-async def create_schedule(schedule: ScheduleCreate, db: Session = Depends(get_db)):
+async def create_schedule(schedule: ScheduleCreate, db: AsyncSession = Depends(get_async_db)):
     try:
 
-        lecturer = db.query(Lecturer).filter(Lecturer.id == schedule.lecturer_id).first()
+        lecturer = await db.scalar(select(Lecturer).filter(Lecturer.id == schedule.lecturer_id))
         if lecturer is None:
             return error_response(
                 404,
@@ -52,8 +111,10 @@ async def create_schedule(schedule: ScheduleCreate, db: Session = Depends(get_db
 
         schedule = Schedule(**schedule.model_dump())
         db.add(schedule)
-        db.commit()
-        db.refresh(schedule)
+        await db.commit()
+        await invalidate_catalog(SCHEDULE)
+        db.expunge_all()
+        schedule = await load_schedule(db, schedule.id)
         return success_response(
             200,
             to_schedule_info(schedule)
@@ -63,9 +124,9 @@ async def create_schedule(schedule: ScheduleCreate, db: Session = Depends(get_db
 
 
 @schedule_router.put(path="/{sche_id}", response_model=ResponseEntity[ScheduleInfo])
-async def update_schedule(sche_id: int, schedule_update: ScheduleUpdate, db: Session = Depends(get_db)):
+async def update_schedule(sche_id: int, schedule_update: ScheduleUpdate, db: AsyncSession = Depends(get_async_db)):
     try:
-        sche: Optional[Schedule] = db.query(Schedule).filter(Schedule.id == sche_id).first()
+        sche: Optional[Schedule] = await db.scalar(select(Schedule).filter(Schedule.id == sche_id))
         if sche is None:
             return error_response(
                 404,
@@ -77,8 +138,10 @@ async def update_schedule(sche_id: int, schedule_update: ScheduleUpdate, db: Ses
         sche.lecturer_id = schedule_update.lecturer_id if schedule_update.lecturer_id is not None else sche.lecturer_id
         sche.course = schedule_update.course if schedule_update.course is not None else sche.course
 
-        db.commit()
-        db.refresh(sche)
+        await db.commit()
+        await invalidate_catalog(SCHEDULE)
+        db.expunge_all()
+        sche = await load_schedule(db, sche_id)
 
         return success_response(
             200,
@@ -89,12 +152,31 @@ async def update_schedule(sche_id: int, schedule_update: ScheduleUpdate, db: Ses
 
 
 @schedule_router.delete(path="/{sche_id}", response_model=ResponseEntity[str])
-async def delete_schedule(sche_id: int, db: Session = Depends(get_db)):
+async def delete_schedule(sche_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        sche: Optional[Schedule] = db.query(Schedule).filter(Schedule.id == sche_id).first()
-        if sche is not None:
-            db.delete(sche)
-            db.commit()
+        slots = set((await db.execute(reservation_slots(sche_id))).all())
+
+        async def remove() -> Optional[EntityResponse]:
+            sche: Optional[Schedule] = await db.scalar(select(Schedule).filter(Schedule.id == sche_id))
+            if sche is None:
+                await db.rollback()
+                return success_response(200, "Success!")
+            if not set((await db.execute(reservation_slots(sche_id))).all()) <= slots:
+                await db.rollback()
+                return error_response(409, "Schedule was changed by another request, please retry!")
+            await db.run_sync(occupancy.release_schedule, sche.id)
+            await db.delete(sche)
+            await db.commit()
+            return None
+
+        try:
+            response = await run_locked(db, slots, remove)
+        except ReservationBusy as ex:
+            return error_response(409, exception_to_string(ex))
+        if response is not None:
+            return response
+        await invalidate_catalog(SCHEDULE, RESERVATION)
+        await publish_availability_resync()
         return success_response(
             200,
             "Success!"
@@ -0,0 +1,287 @@
+import multiprocessing
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Set
+
+# Pure solver, kept free of database imports so spawned pool workers start quickly.
+
+# partitions smaller than this are solved inline, process start-up would cost more than it saves
+MIN_PARALLEL_SCHEDULES = 200
+# share of the time limit given to the partitions, the rest polishes the merged result
+PARTITION_TIME_SHARE = 0.8
+
+
+@dataclass(frozen=True)
+class SolverSchedule:
+    id: int
+    lecturer_id: int
+    # TimeBlock bits the course occupies on every meeting day, see services.occupancy.block_mask
+    mask: int
+
+
+@dataclass(frozen=True)
+class SolverRoom:
+    id: int
+    building_id: int
+    capacity: int
+    # blocks already reserved on any meeting day of the term
+    busy: int
+
+
+@dataclass
+class Partition:
+    schedules: List[SolverSchedule]
+    rooms: List[SolverRoom]
+    deadline: float = 0.0
+
+
+@dataclass
+class Solution:
+    rooms: Dict[int, Optional[int]] = field(default_factory=dict)
+    unassigned: int = 0
+    building_changes: int = 0
+    partitions: int = 0
+
+
+class _State:
+    def __init__(self, partition: Partition):
+        self.schedules = {schedule.id: schedule for schedule in partition.schedules}
+        self.rooms = sorted(partition.rooms, key=lambda room: (room.capacity, room.id))
+        self.room_by_id = {room.id: room for room in self.rooms}
+        self.used: Dict[int, int] = {room.id: 0 for room in self.rooms}
+        # rooms grouped by the blocks they cannot offer any more, there are at most 2 ** len(TimeBlock) groups
+        self.by_taken: Dict[int, Set[int]] = defaultdict(set)
+        for room in self.rooms:
+            self.by_taken[room.busy].add(room.id)
+        self.occupants: Dict[int, List[int]] = defaultdict(list)
+        self.room_of: Dict[int, Optional[int]] = {schedule.id: None for schedule in partition.schedules}
+        self.buildings: Dict[int, Counter] = defaultdict(Counter)
+
+    def fits(self, room_id: int, mask: int) -> bool:
+        return not (self.room_by_id[room_id].busy | self.used[room_id]) & mask
+
+    def _retake(self, room_id: int, used: int):
+        busy = self.room_by_id[room_id].busy
+        group = self.by_taken[busy | self.used[room_id]]
+        group.discard(room_id)
+        if not group:
+            del self.by_taken[busy | self.used[room_id]]
+        self.used[room_id] = used
+        self.by_taken[busy | used].add(room_id)
+
+    def free_rooms(self, mask: int) -> Iterator[int]:
+        for taken, room_ids in self.by_taken.items():
+            if not taken & mask:
+                yield from room_ids
+
+    def place(self, schedule_id: int, room_id: int):
+        schedule = self.schedules[schedule_id]
+        self.room_of[schedule_id] = room_id
+        self._retake(room_id, self.used[room_id] | schedule.mask)
+        self.occupants[room_id].append(schedule_id)
+        self.buildings[schedule.lecturer_id][self.room_by_id[room_id].building_id] += 1
+
+    def remove(self, schedule_id: int) -> Optional[int]:
+        room_id = self.room_of[schedule_id]
+        if room_id is None:
+            return None
+        schedule = self.schedules[schedule_id]
+        self.room_of[schedule_id] = None
+        self._retake(room_id, self.used[room_id] & ~schedule.mask)
+        self.occupants[room_id].remove(schedule_id)
+        counts = self.buildings[schedule.lecturer_id]
+        building_id = self.room_by_id[room_id].building_id
+        counts[building_id] -= 1
+        if not counts[building_id]:
+            del counts[building_id]
+        return room_id
+
+    def lecturer_cost(self, lecturer_id: int) -> int:
+        return max(len(self.buildings[lecturer_id]) - 1, 0)
+
+    def blockers(self, room_id: int, mask: int) -> List[int]:
+        return [other for other in self.occupants[room_id] if self.schedules[other].mask & mask]
+
+    def best_room(self, schedule: SolverSchedule, exclude: Optional[int] = None) -> Optional[int]:
+        home = self.buildings[schedule.lecturer_id]
+        best, best_key = None, None
+        for room_id in self.free_rooms(schedule.mask):
+            if room_id == exclude:
+                continue
+            room = self.room_by_id[room_id]
+            # stay in a building the lecturer already teaches in, pack partly used rooms and keep
+            # large rooms free for later courses
+            key = (room.building_id not in home, -bin(self.used[room_id]).count("1"), room.capacity, room_id)
+            if best_key is None or key < best_key:
+                best, best_key = room_id, key
+        return best
+
+
+def _greedy(state: _State):
+    candidates = {
+        schedule.id: sum(1 for room in state.rooms if not room.busy & schedule.mask)
+        for schedule in state.schedules.values()
+    }
+    # longest courses with the fewest usable rooms go first
+    order = sorted(
+        state.schedules.values(),
+        key=lambda schedule: (
+            -bin(schedule.mask).count("1"), candidates[schedule.id], schedule.lecturer_id, schedule.id
+        )
+    )
+    for schedule in order:
+        room_id = state.best_room(schedule)
+        if room_id is not None:
+            state.place(schedule.id, room_id)
+
+
+def _repair(state: _State, deadline: float) -> bool:
+    # places unassigned courses directly or by moving a single blocking course to another room
+    improved = False
+    for schedule in state.schedules.values():
+        if state.room_of[schedule.id] is not None:
+            continue
+        if time.time() > deadline:
+            break
+        room_id = state.best_room(schedule)
+        if room_id is not None:
+            state.place(schedule.id, room_id)
+            improved = True
+            continue
+        for room in state.rooms:
+            if room.busy & schedule.mask:
+                continue
+            blockers = state.blockers(room.id, schedule.mask)
+            if len(blockers) != 1:
+                continue
+            blocker = blockers[0]
+            state.remove(blocker)
+            target = state.best_room(state.schedules[blocker], exclude=room.id)
+            if target is None:
+                state.place(blocker, room.id)
+                continue
+            state.place(blocker, target)
+            state.place(schedule.id, room.id)
+            improved = True
+            break
+    return improved
+
+
+def _consolidate(state: _State, deadline: float) -> bool:
+    # moves or swaps courses into a building the lecturer already uses whenever that lowers the cost
+    improved = False
+    for schedule in state.schedules.values():
+        if time.time() > deadline:
+            break
+        origin = state.room_of[schedule.id]
+        if origin is None or state.lecturer_cost(schedule.lecturer_id) == 0:
+            continue
+        targets = set(state.buildings[schedule.lecturer_id]) - {state.room_by_id[origin].building_id}
+        for room in state.rooms:
+            if room.building_id not in targets or room.busy & schedule.mask:
+                continue
+            blockers = state.blockers(room.id, schedule.mask)
+            if len(blockers) > 1:
+                continue
+            lecturers = {schedule.lecturer_id} | {state.schedules[other].lecturer_id for other in blockers}
+            before = sum(state.lecturer_cost(lecturer_id) for lecturer_id in lecturers)
+            state.remove(schedule.id)
+            for other in blockers:
+                state.remove(other)
+            if all(state.fits(origin, state.schedules[other].mask) for other in blockers):
+                state.place(schedule.id, room.id)
+                for other in blockers:
+                    state.place(other, origin)
+                if sum(state.lecturer_cost(lecturer_id) for lecturer_id in lecturers) < before:
+                    improved = True
+                    break
+                for other in blockers:
+                    state.remove(other)
+                state.remove(schedule.id)
+            for other in blockers:
+                state.place(other, room.id)
+            state.place(schedule.id, origin)
+    return improved
+
+
+def _improve(state: _State, deadline: float):
+    while time.time() < deadline:
+        repaired = _repair(state, deadline)
+        consolidated = _consolidate(state, deadline)
+        if not repaired and not consolidated:
+            break
+
+
+def solve_partition(partition: Partition) -> Dict[int, Optional[int]]:
+    state = _State(partition)
+    _greedy(state)
+    _improve(state, partition.deadline)
+    return state.room_of
+
+
+# Courses only compete for a room when their blocks overlap, so groups of courses with disjoint
+# blocks (morning and afternoon shifts, say) are solved independently. Building changes of a lecturer
+# teaching in several groups are then reduced on the merged result.
+def partition(schedules: Sequence[SolverSchedule], rooms: List[SolverRoom]) -> List[Partition]:
+    parent = {schedule.id: schedule.id for schedule in schedules}
+
+    def find(node: int) -> int:
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    anchors: Dict[int, int] = {}
+    for schedule in schedules:
+        for bit in range(schedule.mask.bit_length()):
+            if not schedule.mask >> bit & 1:
+                continue
+            if bit in anchors:
+                parent[find(schedule.id)] = find(anchors[bit])
+            else:
+                anchors[bit] = schedule.id
+
+    groups: Dict[int, List[SolverSchedule]] = defaultdict(list)
+    for schedule in schedules:
+        groups[find(schedule.id)].append(schedule)
+    return [Partition(group, rooms) for group in sorted(groups.values(), key=len, reverse=True)]
+
+
+def solve(
+        schedules: Sequence[SolverSchedule],
+        rooms: List[SolverRoom],
+        time_limit: float,
+        workers: Optional[int] = None,
+) -> Solution:
+    started = time.time()
+    partitions = partition(schedules, rooms)
+    for part in partitions:
+        part.deadline = started + time_limit * PARTITION_TIME_SHARE
+
+    parallel = [part for part in partitions if len(part.schedules) >= MIN_PARALLEL_SCHEDULES]
+    if len(parallel) < 2 or workers == 1:
+        parallel = []
+    results: List[Dict[int, Optional[int]]] = []
+    if parallel:
+        # spawn: forking a threaded server process is not safe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers or len(parallel), len(parallel)), mp_context=context) as pool:
+            results.extend(pool.map(solve_partition, parallel))
+    results.extend(solve_partition(part) for part in partitions if part not in parallel)
+
+    state = _State(Partition(list(schedules), rooms))
+    for result in results:
+        for schedule_id, room_id in result.items():
+            if room_id is not None:
+                state.place(schedule_id, room_id)
+    if len(partitions) > 1:
+        _improve(state, started + time_limit)
+
+    return Solution(
+        rooms=state.room_of,
+        unassigned=sum(1 for room_id in state.room_of.values() if room_id is None),
+        building_changes=sum(state.lecturer_cost(lecturer_id) for lecturer_id in list(state.buildings)),
+        partitions=len(partitions),
+    )
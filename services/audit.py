@@ -0,0 +1,189 @@
+import csv
+import heapq
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import AuditRun, RoomReservation, TimeBlock
+from services.occupancy import block_index, occupancy_day
+
+AUDIT_CHUNK_SIZE = 10000
+AUDIT_KINDS = ("room", "lecturer")
+# reservations flushed before a run started but committed after it are picked up by the next run
+WATERMARK_OVERLAP = timedelta(minutes=5)
+OVERLAP_COLUMNS = (
+    "kind", "owner_id", "date", "first_reservation_id", "second_reservation_id", "start_block", "end_block"
+)
+
+BLOCKS = [block.value for block in TimeBlock]
+
+
+@dataclass(frozen=True)
+class AuditRow:
+    id: int
+    owner_id: int
+    day: date
+    start: int
+    end: int
+
+
+@dataclass(frozen=True)
+class Overlap:
+    kind: str
+    owner_id: int
+    day: date
+    first_id: int
+    second_id: int
+    # the blocks both reservations claim
+    start_block: str
+    end_block: str
+
+
+@dataclass
+class AuditReport:
+    run_id: int
+    mode: str
+    since: Optional[datetime]
+    rows_scanned: int = 0
+    overlaps: List[Overlap] = field(default_factory=list)
+
+    def count(self, kind: str) -> int:
+        return sum(1 for overlap in self.overlaps if overlap.kind == kind)
+
+
+# Block ranges of one (owner, day) sorted by start: every range still active when the next one
+# starts overlaps it, so each conflicting pair is found once without comparing all pairs.
+def sweep(rows: Iterable[AuditRow]) -> Iterator[Tuple[AuditRow, AuditRow]]:
+    active: List[Tuple[int, int, AuditRow]] = []
+    for row in sorted(rows, key=lambda row: (row.start, row.end, row.id)):
+        while active and active[0][0] < row.start:
+            heapq.heappop(active)
+        for _, _, other in active:
+            yield other, row
+        heapq.heappush(active, (row.end, row.id, row))
+
+
+def stream_rows(
+        session: Session,
+        kind: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        owners: Optional[Set[int]] = None,
+) -> Iterator[AuditRow]:
+    owner = RoomReservation.room_id if kind == "room" else RoomReservation.lecturer_id
+    query = select(
+        RoomReservation.id, owner, RoomReservation.date, RoomReservation.start_block, RoomReservation.end_block
+    )
+    if start is not None:
+        query = query.where(RoomReservation.date >= start)
+    if end is not None:
+        # end is inclusive of the whole day
+        query = query.where(RoomReservation.date < end.replace(hour=0, minute=0, second=0) + timedelta(days=1))
+    if owners is not None:
+        query = query.where(owner.in_(owners))
+    # server side cursor, memory stays at one chunk plus the (owner, day) group being swept
+    result = session.execute(
+        query.order_by(owner, RoomReservation.date, RoomReservation.id).execution_options(yield_per=AUDIT_CHUNK_SIZE)
+    )
+    for reservation_id, owner_id, day, start_block, end_block in result:
+        yield AuditRow(reservation_id, owner_id, occupancy_day(day), block_index(start_block), block_index(end_block))
+
+
+def find_overlaps(
+        kind: str,
+        rows: Iterable[AuditRow],
+        keys: Optional[Set[Tuple[int, date]]] = None,
+) -> Iterator[Overlap]:
+    for (owner_id, day), group in groupby(rows, key=lambda row: (row.owner_id, row.day)):
+        if keys is not None and (owner_id, day) not in keys:
+            continue
+        for first, second in sweep(group):
+            yield Overlap(
+                kind=kind,
+                owner_id=owner_id,
+                day=day,
+                first_id=first.id,
+                second_id=second.id,
+                start_block=BLOCKS[max(first.start, second.start)],
+                end_block=BLOCKS[min(first.end, second.end)],
+            )
+
+
+def changed_keys(session: Session, since: datetime) -> Dict[str, Set[Tuple[int, date]]]:
+    keys: Dict[str, Set[Tuple[int, date]]] = {kind: set() for kind in AUDIT_KINDS}
+    for room_id, lecturer_id, day in session.execute(
+            select(RoomReservation.room_id, RoomReservation.lecturer_id, RoomReservation.date)
+            .where(RoomReservation.last_edited >= since)
+            .execution_options(yield_per=AUDIT_CHUNK_SIZE)
+    ):
+        keys["room"].add((room_id, occupancy_day(day)))
+        keys["lecturer"].add((lecturer_id, occupancy_day(day)))
+    return keys
+
+
+# Reports every room and lecturer double booking. Incremental runs re-check only the (room, day) and
+# (lecturer, day) groups holding a reservation edited since the previous finished run started; deletes
+# cannot introduce overlaps, so they need no tracking.
+def run_audit(
+        session: Session,
+        incremental: bool = False,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+) -> AuditReport:
+    since = None
+    if incremental:
+        previous = session.scalar(
+            select(AuditRun.started_at).where(AuditRun.finished_at.is_not(None)).order_by(AuditRun.started_at.desc())
+        )
+        since = previous - WATERMARK_OVERLAP if previous is not None else None
+    run = AuditRun(mode="incremental" if since is not None else "full", since=since, started_at=datetime.utcnow())
+    session.add(run)
+    session.commit()
+    report = AuditReport(run_id=run.id, mode=run.mode, since=since)
+
+    def counted(rows: Iterable[AuditRow]) -> Iterator[AuditRow]:
+        for row in rows:
+            report.rows_scanned += 1
+            yield row
+
+    scopes = changed_keys(session, since) if since is not None else {kind: None for kind in AUDIT_KINDS}
+    for kind in AUDIT_KINDS:
+        keys = scopes[kind]
+        if keys is not None and not keys:
+            continue
+        first, last = start, end
+        owners = None
+        if keys is not None:
+            owners = {owner_id for owner_id, _ in keys}
+            changed_first = datetime.combine(min(day for _, day in keys), datetime.min.time())
+            changed_last = datetime.combine(max(day for _, day in keys), datetime.min.time())
+            first = max(first, changed_first) if first is not None else changed_first
+            last = min(last, changed_last) if last is not None else changed_last
+
+        report.overlaps.extend(find_overlaps(kind, counted(stream_rows(session, kind, first, last, owners)), keys))
+
+    run.finished_at = datetime.utcnow()
+    run.rows_scanned = report.rows_scanned
+    run.room_conflicts = report.count("room")
+    run.lecturer_conflicts = report.count("lecturer")
+    session.commit()
+    return report
+
+
+def write_overlaps(overlaps: Iterable[Overlap], file: TextIO):
+    writer = csv.writer(file)
+    writer.writerow(OVERLAP_COLUMNS)
+    for overlap in overlaps:
+        writer.writerow([
+            overlap.kind,
+            overlap.owner_id,
+            overlap.day.isoformat(),
+            overlap.first_id,
+            overlap.second_id,
+            overlap.start_block,
+            overlap.end_block,
+        ])
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from setting import settings
+from services.occupancy import block_value, occupancy_day
+from utils.notifier import build_notifier
+
+logger = logging.getLogger(__name__)
+
+RESERVED = "reserved"
+RELEASED = "released"
+RESYNC = "resync"
+RESYNC_MESSAGE = json.dumps({"type": RESYNC})
+# events per notification, keeps NOTIFY payloads well below the 8000 byte limit
+PUBLISH_BATCH_SIZE = 100
+
+
+@dataclass(frozen=True)
+class AvailabilityEvent:
+    kind: str
+    reservation_id: int
+    room_id: int
+    building_id: int
+    day: date
+    start_block: str
+    end_block: str
+
+    # one comma free token per event, the notifier joins tags with commas
+    def encode(self) -> str:
+        return ":".join([
+            self.kind, str(self.reservation_id), str(self.room_id), str(self.building_id),
+            self.day.isoformat(), self.start_block, self.end_block,
+        ])
+
+    @staticmethod
+    def decode(token: str) -> "AvailabilityEvent":
+        kind, reservation_id, room_id, building_id, day, start_block, end_block = token.split(":")
+        return AvailabilityEvent(
+            kind, int(reservation_id), int(room_id), int(building_id), date.fromisoformat(day), start_block, end_block
+        )
+
+    def message(self) -> Dict[str, Any]:
+        return {
+            "type": self.kind,
+            "reservation_id": self.reservation_id,
+            "room_id": self.room_id,
+            "building_id": self.building_id,
+            "date": self.day.isoformat(),
+            "start_block": self.start_block,
+            "end_block": self.end_block,
+        }
+
+
+def availability_event(
+        kind: str,
+        reservation_id: int,
+        room_id: int,
+        building_id: int,
+        day: Union[date, datetime],
+        start_block: Any,
+        end_block: Any,
+) -> AvailabilityEvent:
+    return AvailabilityEvent(
+        kind, reservation_id, room_id, building_id, occupancy_day(day), block_value(start_block), block_value(end_block)
+    )
+
+
+class Subscription:
+    # A bounded queue per socket. Publishing never waits on a slow reader: when the queue is full the
+    # backlog is replaced by a single resync message and the client reloads what it shows.
+    def __init__(self, max_queue: int, buildings: Optional[Set[int]] = None, dates: Optional[Set[date]] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.buildings = buildings
+        self.dates = dates
+        self.dropped = 0
+
+    def matches(self, event: AvailabilityEvent) -> bool:
+        return (
+            (self.buildings is None or event.building_id in self.buildings)
+            and (self.dates is None or event.day in self.dates)
+        )
+
+    def offer(self, message: str):
+        if self.queue.full():
+            self.dropped += self.queue.qsize()
+            self.resync()
+        else:
+            self.queue.put_nowait(message)
+
+    def resync(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC_MESSAGE)
+
+
+class AvailabilityBroker:
+    # In-process fan-out. Subscriptions are indexed by building, or by date when they only filter on
+    # dates, so an event only visits the sockets that can want it.
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self.everything: Set[Subscription] = set()
+        self.by_building: Dict[int, Set[Subscription]] = defaultdict(set)
+        self.by_date: Dict[date, Set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self.dropped = 0
+
+    def _add(self, subscription: Subscription):
+        if subscription.buildings is not None:
+            for building_id in subscription.buildings:
+                self.by_building[building_id].add(subscription)
+        elif subscription.dates is not None:
+            for day in subscription.dates:
+                self.by_date[day].add(subscription)
+        else:
+            self.everything.add(subscription)
+
+    def _remove(self, subscription: Subscription):
+        if subscription.buildings is not None:
+            index, keys = self.by_building, subscription.buildings
+        elif subscription.dates is not None:
+            index, keys = self.by_date, subscription.dates
+        else:
+            self.everything.discard(subscription)
+            return
+        for key in keys:
+            index[key].discard(subscription)
+            if not index[key]:
+                del index[key]
+
+    def subscribe(self, buildings: Optional[Set[int]] = None, dates: Optional[Set[date]] = None) -> Subscription:
+        subscription = Subscription(self.max_queue, buildings, dates)
+        self._add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._remove(subscription)
+        self.dropped += subscription.dropped
+
+    def refilter(self, subscription: Subscription, buildings: Optional[Set[int]], dates: Optional[Set[date]]):
+        self._remove(subscription)
+        subscription.buildings, subscription.dates = buildings, dates
+        self._add(subscription)
+
+    def subscriptions(self) -> Set[Subscription]:
+        found = set(self.everything)
+        for index in (self.by_building, self.by_date):
+            for bucket in index.values():
+                found |= bucket
+        return found
+
+    def deliver(self, tokens: List[str]):
+        for token in tokens:
+            if token == RESYNC:
+                self.reset()
+                continue
+            try:
+                event = AvailabilityEvent.decode(token)
+            except ValueError:
+                logger.warning("Ignoring malformed availability event %r", token)
+                continue
+            self.published += 1
+            # serialized once, every matching socket sends the same text
+            message = json.dumps(event.message())
+            candidates = (
+                self.everything
+                | self.by_building.get(event.building_id, set())
+                | self.by_date.get(event.day, set())
+            )
+            for subscription in candidates:
+                if subscription.matches(event):
+                    subscription.offer(message)
+
+    def reset(self):
+        for subscription in self.subscriptions():
+            subscription.resync()
+
+    def stats(self) -> Dict[str, int]:
+        subscriptions = self.subscriptions()
+        return {
+            "subscribers": len(subscriptions),
+            "published": self.published,
+            "dropped": self.dropped + sum(subscription.dropped for subscription in subscriptions),
+        }
+
+
+availability_broker = AvailabilityBroker(settings.AVAILABILITY_QUEUE_SIZE)
+# a worker that lost its listener connection may have missed events, every socket reloads
+availability_notifier = build_notifier(settings.AVAILABILITY_NOTIFY_CHANNEL, on_reset=availability_broker.reset)
+availability_notifier.subscribe(availability_broker.deliver)
+
+
+async def publish_availability(events: Iterable[AvailabilityEvent]):
+    tokens = [event.encode() for event in events]
+    for offset in range(0, len(tokens), PUBLISH_BATCH_SIZE):
+        await availability_notifier.publish(tokens[offset:offset + PUBLISH_BATCH_SIZE])
+
+
+# for writes that touch too many reservations to describe, such as imports and cascading deletes
+async def publish_availability_resync():
+    await availability_notifier.publish([RESYNC])
@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+from fastapi import Request, Response
+
+from setting import settings
+from utils.cache import TTLCache
+from utils.conditional import ResourceVersion, is_not_modified, not_modified_response
+from utils.notifier import build_notifier
+from utils.utils import EntityResponse
+
+BUILDING = "building"
+ROOM = "room"
+RESERVATION = "reservation"
+LECTURER = "lecturer"
+SCHEDULE = "schedule"
+# every weekly timetable carries this tag, specific weeks are tagged with timetable_tag()
+TIMETABLE = "timetable"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    version: ResourceVersion
+
+
+class CatalogCache:
+    # Serialized catalog responses keyed by (tags, path and query). Readers capture the generation
+    # before querying and only store when no invalidation ran meanwhile, so a read that raced a
+    # write never caches the old payload.
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.entries: TTLCache[CachedResponse] = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.generation = 0
+
+    @staticmethod
+    def key(request: Request, tags: FrozenSet[str]):
+        return tags, request.url.path, request.url.query
+
+    # tags are the resources the payload was built from, see Expansion.resources
+    def cached_response(self, request: Request, tags: FrozenSet[str]) -> Optional[Response]:
+        cached = self.entries.get(self.key(request, tags))
+        if cached is None:
+            return None
+        if is_not_modified(request, cached.version):
+            return not_modified_response(cached.version)
+        return EntityResponse(content=cached.body, headers=cached.version.headers())
+
+    def store(
+            self,
+            request: Request,
+            response: Response,
+            version: ResourceVersion,
+            generation: int,
+            tags: FrozenSet[str],
+    ) -> Response:
+        if response.status_code == 200 and generation == self.generation:
+            self.entries.set(self.key(request, tags), CachedResponse(bytes(response.body), version))
+        return response
+
+    def invalidate_local(self, tags):
+        tags = set(tags)
+        self.generation += 1
+        self.entries.invalidate_where(lambda key: not tags.isdisjoint(key[0]))
+
+    def clear(self):
+        self.generation += 1
+        self.entries.clear()
+
+
+catalog_cache = CatalogCache(settings.CATALOG_CACHE_MAX_ENTRIES, settings.CATALOG_CACHE_TTL_SECONDS)
+catalog_notifier = build_notifier(settings.CATALOG_NOTIFY_CHANNEL, on_reset=catalog_cache.clear)
+catalog_notifier.subscribe(catalog_cache.invalidate_local)
+
+
+async def invalidate_catalog(*tags: str):
+    await catalog_notifier.publish(tags)
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Building, Room, Schedule, Lecturer, Gender, Faculty
+from utils.crypto import get_password_hash
+
+DEMO_USERNAME = "lecturer"
+DEMO_PASSWORD = "123456"
+
+
+# Creates the demo lecturer, buildings, schedules and rooms once, returns False when they already exist.
+def seed_demo_data(session: Session) -> bool:
+    if session.scalar(select(Lecturer.id).where(Lecturer.username == DEMO_USERNAME)) is not None:
+        return False
+
+    lecturer = Lecturer(
+        username=DEMO_USERNAME,
+        password=get_password_hash(DEMO_PASSWORD),
+        first_name="lecturer",
+        last_name="1",
+        email="lecturer1@gmail.com",
+        dob=datetime(2023, 12, 11, 14, 25, 16),
+        gender=Gender.male,
+        enabled=True,
+        active=True,
+        faculty=Faculty.computer_science,
+    )
+    buildings = [
+        Building(name="Nha K", code="K"),
+        Building(name="Nha A", code="A"),
+        Building(name="Nha B", code="B"),
+        Building(name="Nha C", code="C"),
+    ]
+    session.add(lecturer)
+    session.add_all(buildings)
+    session.flush()
+
+    session.add_all([
+        Schedule(lecturer_id=lecturer.id, course="Networking", start_block="BLOCK_1", end_block="BLOCK_2"),
+        Schedule(lecturer_id=lecturer.id, course="Distributed Systems", start_block="BLOCK_1", end_block="BLOCK_2"),
+        Schedule(
+            lecturer_id=lecturer.id,
+            course="Computer Organization in C Programming language perspective.",
+            start_block="BLOCK_1",
+            end_block="BLOCK_2",
+        ),
+        Room(name="Phong 1", code="P1", building_id=buildings[0].id),
+        Room(name="Phong 2", code="P2", building_id=buildings[0].id),
+        Room(name="Phong 3", code="P3", building_id=buildings[1].id),
+        Room(name="Phong 4", code="P4", building_id=buildings[2].id),
+        Room(name="Phong 5", code="P5", building_id=buildings[3].id),
+    ])
+    session.commit()
+    return True
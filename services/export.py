@@ -0,0 +1,145 @@
+import csv
+import io
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Iterable, List, Optional, Sequence
+
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from dtos.object_mapper import datetime_to_string
+from models import Building, Lecturer, Room, RoomReservation, Schedule
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # parquet export is optional
+    pyarrow = None
+
+EXPORT_FORMATS = ("csv", "parquet")
+DEFAULT_CHUNK_SIZE = 10000
+
+EXPORT_COLUMNS = [
+    RoomReservation.id.label("reservation_id"),
+    RoomReservation.date.label("date"),
+    RoomReservation.start_block.label("start_block"),
+    RoomReservation.end_block.label("end_block"),
+    Building.id.label("building_id"),
+    Building.code.label("building_code"),
+    Room.id.label("room_id"),
+    Room.code.label("room_code"),
+    Room.name.label("room_name"),
+    Room.capacity.label("room_capacity"),
+    Lecturer.id.label("lecturer_id"),
+    Lecturer.username.label("lecturer_username"),
+    Schedule.id.label("schedule_id"),
+    Schedule.course.label("course"),
+    RoomReservation.created_at.label("created_at"),
+    RoomReservation.last_edited.label("last_edited"),
+]
+EXPORT_HEADER = [column.name for column in EXPORT_COLUMNS]
+
+
+def parquet_schema():
+    types = {
+        "date": pyarrow.timestamp("us"),
+        "created_at": pyarrow.timestamp("us"),
+        "last_edited": pyarrow.timestamp("us"),
+        "room_capacity": pyarrow.int32(),
+    }
+    return pyarrow.schema([
+        (name, types.get(name, pyarrow.int64() if name.endswith("_id") else pyarrow.string()))
+        for name in EXPORT_HEADER
+    ])
+
+
+def export_query(
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        building_id: Optional[int] = None,
+) -> Select:
+    query = (
+        select(*EXPORT_COLUMNS)
+        .join(Room, Room.id == RoomReservation.room_id)
+        .join(Building, Building.id == Room.building_id)
+        .outerjoin(Lecturer, Lecturer.id == RoomReservation.lecturer_id)
+        .outerjoin(Schedule, Schedule.id == RoomReservation.schedule_id)
+    )
+    if start is not None:
+        query = query.where(RoomReservation.date >= start)
+    if end is not None:
+        # end is inclusive of the whole day
+        query = query.where(RoomReservation.date < end.replace(hour=0, minute=0, second=0) + timedelta(days=1))
+    if building_id is not None:
+        query = query.where(Room.building_id == building_id)
+    return query.order_by(RoomReservation.id)
+
+
+def _csv_value(value: Any) -> Any:
+    return datetime_to_string(value) if isinstance(value, datetime) else value
+
+
+def csv_chunk(rows: Iterable[Sequence[Any]], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_HEADER)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+class ParquetChunkWriter:
+    def __init__(self, sink):
+        if pyarrow is None:
+            raise RuntimeError("Parquet export needs the pyarrow package")
+        self._schema = parquet_schema()
+        self._writer = pyarrow.parquet.ParquetWriter(sink, self._schema)
+
+    # every chunk becomes one row group
+    def write(self, rows: List[Sequence[Any]]):
+        if rows:
+            columns = list(zip(*rows))
+            self._writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+                schema=self._schema,
+            ))
+
+    def close(self):
+        self._writer.close()
+
+
+# Streams the query through a server side cursor, chunk_size rows at a time, into path.
+def export_reservations(
+        session: Session,
+        path: str,
+        export_format: str = "csv",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        building_id: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    result = session.execute(export_query(start, end, building_id).execution_options(yield_per=chunk_size))
+    exported = 0
+    if export_format == "csv":
+        with open(path, "w", newline="") as file:
+            file.write(csv_chunk([], header=True))
+            for partition in result.partitions():
+                file.write(csv_chunk(partition))
+                exported += len(partition)
+    else:
+        writer = ParquetChunkWriter(path)
+        try:
+            for partition in result.partitions():
+                writer.write(partition)
+                exported += len(partition)
+        finally:
+            writer.close()
+    return exported
+
+
+async def stream_csv(partitions: AsyncIterator[Sequence[Sequence[Any]]]) -> AsyncIterator[str]:
+    yield csv_chunk([], header=True)
+    async for partition in partitions:
+        yield csv_chunk(partition)
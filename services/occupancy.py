@@ -0,0 +1,120 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Tuple, Union
+
+from sqlalchemy import select, update, delete, insert, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import RoomOccupancy, RoomReservation, TimeBlock
+
+BLOCK_INDEX: Dict[str, int] = {block.value: index for index, block in enumerate(TimeBlock)}
+FULL_DAY: int = (1 << len(BLOCK_INDEX)) - 1
+
+
+def block_value(block: Union[TimeBlock, str]) -> str:
+    return block.value if isinstance(block, TimeBlock) else block
+
+
+def block_index(block: Union[TimeBlock, str]) -> int:
+    value = block_value(block)
+    if value not in BLOCK_INDEX:
+        raise ValueError(f"Unknown time block: {value}")
+    return BLOCK_INDEX[value]
+
+
+def block_mask(start_block: Union[TimeBlock, str], end_block: Union[TimeBlock, str]) -> int:
+    start, end = block_index(start_block), block_index(end_block)
+    if start > end:
+        raise ValueError(f"Start block {block_value(start_block)} is after end block {block_value(end_block)}")
+    return ((1 << (end + 1)) - 1) ^ ((1 << start) - 1)
+
+
+def occupancy_day(value: Union[date, datetime]) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _key_filter(room_id: int, day: date):
+    return (RoomOccupancy.room_id == room_id) & (RoomOccupancy.date == occupancy_day(day))
+
+
+# Marks the blocks of mask as taken for the room on that day, False means one of them already was.
+def reserve(session: Session, room_id: int, day: Union[date, datetime], mask: int) -> bool:
+    result = session.execute(
+        update(RoomOccupancy)
+        .where(_key_filter(room_id, day))
+        .where(RoomOccupancy.mask.bitwise_and(mask) == 0)
+        .values(mask=RoomOccupancy.mask.bitwise_or(mask))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        return True
+
+    if session.scalar(select(RoomOccupancy.id).where(_key_filter(room_id, day))) is not None:
+        return False
+
+    try:
+        with session.begin_nested():
+            session.add(RoomOccupancy(room_id=room_id, date=occupancy_day(day), mask=mask))
+    except IntegrityError:
+        # another transaction created the row first, settle the conflict against it
+        return reserve(session, room_id, day, mask)
+    return True
+
+
+def release(session: Session, room_id: int, day: Union[date, datetime], mask: int) -> None:
+    session.execute(
+        update(RoomOccupancy)
+        .where(_key_filter(room_id, day))
+        .values(mask=RoomOccupancy.mask.bitwise_and(FULL_DAY ^ mask))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def release_reservation(session: Session, reservation: RoomReservation) -> None:
+    release(
+        session,
+        reservation.room_id,
+        reservation.date,
+        block_mask(reservation.start_block, reservation.end_block)
+    )
+
+
+def release_schedule(session: Session, schedule_id: int) -> None:
+    rows = session.execute(
+        select(
+            RoomReservation.room_id, RoomReservation.date, RoomReservation.start_block, RoomReservation.end_block
+        ).where(RoomReservation.schedule_id == schedule_id)
+    ).all()
+    for room_id, day, start_block, end_block in rows:
+        release(session, room_id, day, block_mask(start_block, end_block))
+
+
+def compute_masks(rows: Iterable[Tuple[int, datetime, str, str]]) -> Dict[Tuple[int, date], int]:
+    masks: Dict[Tuple[int, date], int] = defaultdict(int)
+    for room_id, day, start_block, end_block in rows:
+        masks[(room_id, occupancy_day(day))] |= block_mask(start_block, end_block)
+    return masks
+
+
+def rebuild(session: Session) -> int:
+    rows = session.execute(
+        select(
+            RoomReservation.room_id, RoomReservation.date, RoomReservation.start_block, RoomReservation.end_block
+        ).execution_options(yield_per=5000)
+    )
+    masks = compute_masks(rows)
+
+    session.execute(delete(RoomOccupancy))
+    if masks:
+        session.execute(
+            insert(RoomOccupancy),
+            [{"room_id": room_id, "date": day, "mask": mask} for (room_id, day), mask in masks.items()]
+        )
+    return len(masks)
+
+
+def rebuild_if_empty(session: Session) -> int:
+    if session.scalar(select(func.count(RoomOccupancy.id))):
+        return 0
+    return rebuild(session)
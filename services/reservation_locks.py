@@ -0,0 +1,178 @@
+import asyncio
+import random
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Tuple, TypeVar, Union
+
+from sqlalchemy import Executable, Integer, column, func, select, text, values
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from services.occupancy import occupancy_day
+from setting import settings
+
+T = TypeVar("T")
+SlotKey = Tuple[int, date]
+
+# deadlock, serialization failure, lock timeout and unique violation: the transaction lost a race with
+# another booking and a fresh attempt will see its result
+RETRY_SQLSTATES = {"40P01", "40001", "55P03", "23505"}
+RETRY_SQLITE_ERRORS = ("database is locked", "UNIQUE constraint failed")
+# exclusion violation: the overlap constraint caught a booking the occupancy check let through
+CONFLICT_SQLSTATES = {"23P01"}
+
+
+class SlotBusy(Exception):
+    pass
+
+
+class ReservationBusy(Exception):
+    def __init__(self, message: str = "Room is being reserved by another request, please retry!"):
+        super().__init__(message)
+
+
+# a 409 like ReservationBusy, but retrying cannot help
+class ReservationConflict(ReservationBusy):
+    def __init__(self):
+        super().__init__("Room is already reserved!")
+
+
+def slot_keys(slots: Iterable[Tuple[int, Union[date, datetime]]]) -> List[SlotKey]:
+    # one global order, so two requests locking overlapping slots can never wait on each other in a cycle
+    return sorted({(room_id, occupancy_day(day)) for room_id, day in slots})
+
+
+def is_contention(ex: DBAPIError) -> bool:
+    sqlstate = getattr(ex.orig, "sqlstate", None)
+    if sqlstate is not None:
+        return sqlstate in RETRY_SQLSTATES
+    return any(message in str(ex.orig) for message in RETRY_SQLITE_ERRORS)
+
+
+def is_conflict(ex: DBAPIError) -> bool:
+    return getattr(ex.orig, "sqlstate", None) in CONFLICT_SQLSTATES
+
+
+def _release_if_acquired(lock: asyncio.Lock) -> Callable[[asyncio.Future], None]:
+    # a cancelled acquire can still have won the lock just before the cancellation landed
+    def release(waiter: asyncio.Future):
+        if not waiter.cancelled() and waiter.exception() is None:
+            lock.release()
+    return release
+
+
+async def _acquire(lock: asyncio.Lock, timeout: float) -> bool:
+    waiter = asyncio.ensure_future(lock.acquire())
+    try:
+        done, _ = await asyncio.wait({waiter}, timeout=max(timeout, 0))
+    except BaseException:
+        waiter.cancel()
+        waiter.add_done_callback(_release_if_acquired(lock))
+        raise
+    if done:
+        return True
+    waiter.cancel()
+    waiter.add_done_callback(_release_if_acquired(lock))
+    return False
+
+
+class LocalSlotLocks:
+    # Stand-in for advisory locks on databases without them. Only serializes bookings of this process,
+    # SQLite deployments run a single worker and its database lock covers the rest.
+    def __init__(self):
+        self.locks: Dict[SlotKey, asyncio.Lock] = {}
+        self.users: Counter = Counter()
+
+    @asynccontextmanager
+    async def hold(self, keys: List[SlotKey], timeout: float) -> AsyncIterator[None]:
+        for key in keys:
+            self.users[key] += 1
+            if key not in self.locks:
+                self.locks[key] = asyncio.Lock()
+        held: List[SlotKey] = []
+        try:
+            deadline = asyncio.get_running_loop().time() + timeout
+            for key in keys:
+                if not await _acquire(self.locks[key], deadline - asyncio.get_running_loop().time()):
+                    raise SlotBusy()
+                held.append(key)
+            yield
+        finally:
+            for key in reversed(held):
+                self.locks[key].release()
+            for key in keys:
+                self.users[key] -= 1
+                if not self.users[key]:
+                    del self.users[key]
+                    del self.locks[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"slots": len(self.locks), "waiting": sum(self.users.values()) - len(self.users)}
+
+
+local_slot_locks = LocalSlotLocks()
+
+
+def _advisory_locks(keys: List[SlotKey]) -> List[Executable]:
+    # transaction scoped, released by the commit or rollback that ends the booking
+    slots = values(column("room_id", Integer), column("day", Integer), name="slots").data(
+        [(room_id, day.toordinal()) for room_id, day in keys]
+    )
+    return [
+        text(f"SET LOCAL lock_timeout = {int(settings.RESERVATION_LOCK_TIMEOUT_SECONDS * 1000)}"),
+        # volatile select list entries are evaluated after ORDER BY, so the locks are taken in key order
+        select(func.pg_advisory_xact_lock(slots.c.room_id, slots.c.day))
+        .select_from(slots)
+        .order_by(slots.c.room_id, slots.c.day),
+    ]
+
+
+# For sync writers such as the timetable import. Only Postgres is covered: a worker thread cannot
+# take the in-process asyncio locks, so elsewhere the caller retries when it loses a race.
+def lock_slots(session: Session, slots: Iterable[Tuple[int, Union[date, datetime]]]):
+    keys = slot_keys(slots)
+    if keys and session.get_bind().dialect.name == "postgresql":
+        for statement in _advisory_locks(keys):
+            session.execute(statement)
+
+
+@asynccontextmanager
+async def slot_locks(db: AsyncSession, keys: List[SlotKey]) -> AsyncIterator[None]:
+    if not keys:
+        yield
+    elif db.bind.dialect.name == "postgresql":
+        for statement in _advisory_locks(keys):
+            await db.execute(statement)
+        yield
+    else:
+        async with local_slot_locks.hold(keys, settings.RESERVATION_LOCK_TIMEOUT_SECONDS):
+            yield
+
+
+# Runs operation, which must end its transaction, while holding the (room, date) locks. Bookings that
+# lose a race are rolled back and tried again, ReservationBusy is raised once the attempts run out and
+# ReservationConflict when the database rejects an overlap.
+async def run_locked(
+        db: AsyncSession,
+        slots: Iterable[Tuple[int, Union[date, datetime]]],
+        operation: Callable[[], Awaitable[T]],
+) -> T:
+    keys = slot_keys(slots)
+    for attempt in range(settings.RESERVATION_LOCK_ATTEMPTS):
+        try:
+            async with slot_locks(db, keys):
+                return await operation()
+        except SlotBusy:
+            pass
+        except DBAPIError as ex:
+            if is_conflict(ex):
+                await db.rollback()
+                raise ReservationConflict() from ex
+            if not is_contention(ex):
+                raise
+        await db.rollback()
+        if attempt + 1 < settings.RESERVATION_LOCK_ATTEMPTS:
+            await asyncio.sleep(random.uniform(0, settings.RESERVATION_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+    raise ReservationBusy()
@@ -0,0 +1,75 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, insert, update
+from sqlalchemy.orm import Session
+
+from models import RoomOccupancy, RoomReservation, Schedule
+from services.occupancy import block_mask
+
+
+def dates_between(start: date, end: date, weekdays: Iterable[int]) -> List[date]:
+    wanted = set(weekdays)
+    return [
+        start + timedelta(days=offset)
+        for offset in range((end - start).days + 1)
+        if (start + timedelta(days=offset)).weekday() in wanted
+    ]
+
+
+# Books every free date in one statement per table, returns (date, reservation id or None) per requested date.
+def bulk_reserve(
+        session: Session,
+        room_id: int,
+        schedule: Schedule,
+        lecturer_id: int,
+        dates: List[datetime],
+) -> List[Tuple[datetime, Optional[int]]]:
+    if not dates:
+        return []
+    mask = block_mask(schedule.start_block, schedule.end_block)
+
+    occupied: Dict[date, RoomOccupancy] = {
+        row.date: row
+        for row in session.scalars(
+            select(RoomOccupancy)
+            .where(RoomOccupancy.room_id == room_id)
+            .where(RoomOccupancy.date.in_({day.date() for day in dates}))
+            .order_by(RoomOccupancy.date)
+            .with_for_update()
+        )
+    }
+    accepted = [day for day in dates if day.date() not in occupied or not occupied[day.date()].mask & mask]
+    if not accepted:
+        return [(day, None) for day in dates]
+
+    # keyed by the returned date: asking for parameter order makes SQLite insert one row per statement
+    created: Dict[datetime, int] = dict(session.execute(
+        insert(RoomReservation).returning(RoomReservation.date, RoomReservation.id),
+        [
+            {
+                "room_id": room_id,
+                "schedule_id": schedule.id,
+                "lecturer_id": lecturer_id,
+                "date": day,
+                "start_block": schedule.start_block,
+                "end_block": schedule.end_block,
+            }
+            for day in accepted
+        ]
+    ).all())
+
+    updates = [
+        {"id": occupied[day.date()].id, "mask": occupied[day.date()].mask | mask}
+        for day in accepted if day.date() in occupied
+    ]
+    if updates:
+        session.execute(update(RoomOccupancy), updates)
+    inserts = [
+        {"room_id": room_id, "date": day.date(), "mask": mask}
+        for day in accepted if day.date() not in occupied
+    ]
+    if inserts:
+        session.execute(insert(RoomOccupancy), inserts)
+
+    return [(day, created.get(day)) for day in dates]
@@ -0,0 +1,136 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, insert, update, exists
+from sqlalchemy.orm import Session
+
+from models import Faculty, Lecturer, Room, RoomOccupancy, RoomReservation, Schedule
+from services.assignment_solver import SolverRoom, SolverSchedule
+from services.occupancy import block_mask
+
+
+class AssignmentConflict(Exception):
+    def __init__(self, schedule_ids: List[int]):
+        super().__init__(f"Rooms are already reserved for schedules {', '.join(map(str, schedule_ids))}!")
+        self.schedule_ids = schedule_ids
+
+
+# Courses of the term that have no reservation yet, plus every room with its blocks already taken on
+# any meeting day. Each course meets on all the given days, so it needs one room free on all of them.
+def load_assignment_problem(
+        session: Session,
+        dates: Sequence[datetime],
+        schedule_ids: Optional[Iterable[int]] = None,
+        faculty: Optional[Faculty] = None,
+        building_ids: Optional[Iterable[int]] = None,
+        min_capacity: Optional[int] = None,
+) -> Tuple[List[SolverSchedule], List[SolverRoom]]:
+    if not dates:
+        return [], []
+    first, last = min(dates), max(dates)
+
+    query = select(Schedule.id, Schedule.lecturer_id, Schedule.start_block, Schedule.end_block)
+    if schedule_ids is not None:
+        query = query.where(Schedule.id.in_(list(schedule_ids)))
+    else:
+        query = query.where(~exists().where(
+            RoomReservation.schedule_id == Schedule.id,
+            RoomReservation.date >= datetime.combine(first.date(), datetime.min.time()),
+            RoomReservation.date < datetime.combine(last.date() + timedelta(days=1), datetime.min.time()),
+        ))
+    if faculty is not None:
+        query = query.join(Lecturer, Schedule.lecturer_id == Lecturer.id).where(Lecturer.faculty == faculty)
+    schedules = [
+        SolverSchedule(row.id, row.lecturer_id, block_mask(row.start_block, row.end_block))
+        for row in session.execute(query.order_by(Schedule.id))
+    ]
+
+    query = select(Room.id, Room.building_id, Room.capacity)
+    if building_ids is not None:
+        query = query.where(Room.building_id.in_(list(building_ids)))
+    if min_capacity is not None:
+        query = query.where(Room.capacity >= min_capacity)
+    busy: Dict[int, int] = {}
+    for room_id, mask in session.execute(
+            select(RoomOccupancy.room_id, RoomOccupancy.mask)
+            .where(RoomOccupancy.date.in_({day.date() for day in dates}))
+    ):
+        busy[room_id] = busy.get(room_id, 0) | mask
+    rooms = [
+        SolverRoom(row.id, row.building_id, row.capacity or 0, busy.get(row.id, 0))
+        for row in session.execute(query.order_by(Room.id))
+    ]
+    return schedules, rooms
+
+
+# Books every (schedule, room) pair on every meeting day in one transaction. Nothing is written when
+# any pair collides with a reservation made after the preview or with another pair of the plan.
+def commit_assignments(session: Session, assignments: Sequence[Tuple[int, int]], dates: Sequence[datetime]) -> int:
+    if not assignments or not dates:
+        return 0
+    schedules = {
+        row.id: row
+        for row in session.execute(
+            select(Schedule.id, Schedule.lecturer_id, Schedule.start_block, Schedule.end_block)
+            .where(Schedule.id.in_({schedule_id for schedule_id, _ in assignments}))
+        )
+    }
+    missing = sorted({schedule_id for schedule_id, _ in assignments} - schedules.keys())
+    if missing:
+        raise ValueError(f"Schedules {', '.join(map(str, missing))} are not found!")
+    room_ids = {room_id for _, room_id in assignments}
+    missing = sorted(room_ids - set(session.scalars(select(Room.id).where(Room.id.in_(room_ids)))))
+    if missing:
+        raise ValueError(f"Rooms {', '.join(map(str, missing))} are not found!")
+
+    days = sorted({day.date() for day in dates})
+    occupied: Dict[Tuple[int, date], RoomOccupancy] = {
+        (occupancy.room_id, occupancy.date): occupancy
+        for occupancy in session.scalars(
+            select(RoomOccupancy)
+            .where(RoomOccupancy.room_id.in_(room_ids))
+            .where(RoomOccupancy.date.in_(days))
+            .order_by(RoomOccupancy.room_id, RoomOccupancy.date)
+            .with_for_update()
+        )
+    }
+    masks = {key: occupancy.mask for key, occupancy in occupied.items()}
+
+    conflicts = []
+    for schedule_id, room_id in assignments:
+        schedule = schedules[schedule_id]
+        mask = block_mask(schedule.start_block, schedule.end_block)
+        if any(masks.get((room_id, day), 0) & mask for day in days):
+            conflicts.append(schedule_id)
+            continue
+        for day in days:
+            masks[(room_id, day)] = masks.get((room_id, day), 0) | mask
+    if conflicts:
+        raise AssignmentConflict(conflicts)
+
+    session.execute(
+        insert(RoomReservation),
+        [
+            {
+                "room_id": room_id,
+                "schedule_id": schedule_id,
+                "lecturer_id": schedules[schedule_id].lecturer_id,
+                "date": day,
+                "start_block": schedules[schedule_id].start_block,
+                "end_block": schedules[schedule_id].end_block,
+            }
+            for schedule_id, room_id in assignments
+            for day in dates
+        ]
+    )
+    touched = {(room_id, day) for _, room_id in assignments for day in days}
+    updates = [{"id": occupied[key].id, "mask": masks[key]} for key in touched if key in occupied]
+    if updates:
+        session.execute(update(RoomOccupancy), updates)
+    inserts = [
+        {"room_id": room_id, "date": day, "mask": masks[(room_id, day)]}
+        for room_id, day in touched - occupied.keys()
+    ]
+    if inserts:
+        session.execute(insert(RoomOccupancy), inserts)
+    return len(assignments) * len(dates)
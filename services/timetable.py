@@ -0,0 +1,132 @@
+from datetime import date, datetime, timedelta
+from typing import FrozenSet, Iterable, List, Optional, Set, Union
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from dtos import Timetable, TimetableDay, TimetableEntry
+from models import Lecturer, Room, RoomReservation, Schedule, TimeBlock
+from services.catalog import catalog_cache, LECTURER, ROOM, SCHEDULE, TIMETABLE
+from services.occupancy import block_index, occupancy_day
+from utils.conditional import content_version, is_not_modified, not_modified_response, with_version
+from utils.utils import success_response
+
+
+def parse_week(value: Optional[str], today: Optional[date] = None) -> date:
+    # accepts an ISO week (2024-W05) or any day of the week (2024-01-31), returns its Monday
+    if not value:
+        day = today or date.today()
+    elif "W" in value:
+        year, week = value.split("-W")
+        return date.fromisocalendar(int(year), int(week), 1)
+    else:
+        day = datetime.strptime(value, "%Y-%m-%d").date()
+    return day - timedelta(days=day.weekday())
+
+
+def week_label(monday: date) -> str:
+    year, week, _ = monday.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def timetable_tag(kind: str, entity_id: int, monday: date) -> str:
+    return f"{TIMETABLE}:{kind}:{entity_id}:{monday.isoformat()}"
+
+
+# Tags of every timetable that shows a reservation of this room and lecturer on these days.
+def timetable_tags(room_id: int, lecturer_id: int, days: Iterable[Union[date, datetime]]) -> Set[str]:
+    tags = set()
+    for day in days:
+        day = occupancy_day(day)
+        monday = day - timedelta(days=day.weekday())
+        tags.add(timetable_tag("room", room_id, monday))
+        tags.add(timetable_tag("lecturer", lecturer_id, monday))
+    return tags
+
+
+# Entries show course, room code and username, so edits of those rows drop the cached weeks as well.
+def timetable_resources(kind: str, entity_id: int, monday: date) -> FrozenSet[str]:
+    return frozenset({TIMETABLE, timetable_tag(kind, entity_id, monday), ROOM, LECTURER, SCHEDULE})
+
+
+def build_timetable(session: Session, kind: str, entity_id: int, monday: date) -> Optional[Timetable]:
+    model, column = (Room, RoomReservation.room_id) if kind == "room" else (Lecturer, RoomReservation.lecturer_id)
+    start = datetime.combine(monday, datetime.min.time())
+    rows = session.execute(
+        select(
+            RoomReservation.id,
+            RoomReservation.date,
+            RoomReservation.start_block,
+            RoomReservation.end_block,
+            RoomReservation.schedule_id,
+            RoomReservation.room_id,
+            RoomReservation.lecturer_id,
+            Schedule.course,
+            Room.code,
+            Lecturer.username,
+        )
+        .join(Schedule, RoomReservation.schedule_id == Schedule.id)
+        .join(Room, RoomReservation.room_id == Room.id)
+        .join(Lecturer, RoomReservation.lecturer_id == Lecturer.id)
+        .where(column == entity_id, RoomReservation.date >= start, RoomReservation.date < start + timedelta(days=7))
+    ).all()
+    if not rows and session.scalar(select(model.id).where(model.id == entity_id)) is None:
+        return None
+
+    rows = sorted(rows, key=lambda row: (row.date, block_index(row.start_block)))
+    days: List[List[List[int]]] = [[[] for _ in TimeBlock] for _ in range(7)]
+    entries = []
+    for index, row in enumerate(rows):
+        entries.append(TimetableEntry(
+            reservation_id=row.id,
+            schedule_id=row.schedule_id,
+            course=row.course,
+            room_id=row.room_id,
+            room_code=row.code,
+            lecturer_id=row.lecturer_id,
+            lecturer_username=row.username,
+            start_block=row.start_block,
+            end_block=row.end_block,
+        ))
+        weekday = (occupancy_day(row.date) - monday).days
+        for block in range(block_index(row.start_block), block_index(row.end_block) + 1):
+            days[weekday][block].append(index)
+
+    return Timetable(
+        week=week_label(monday),
+        start_date=monday.isoformat(),
+        end_date=(monday + timedelta(days=6)).isoformat(),
+        blocks=[block.value for block in TimeBlock],
+        entries=entries,
+        days=[
+            TimetableDay(date=(monday + timedelta(days=offset)).isoformat(), blocks=blocks)
+            for offset, blocks in enumerate(days)
+        ],
+    )
+
+
+async def timetable_response(
+        db: AsyncSession,
+        request: Request,
+        kind: str,
+        entity_id: int,
+        week: Optional[str],
+) -> Optional[Response]:
+    monday = parse_week(week)
+    resources = timetable_resources(kind, entity_id, monday)
+    cached = catalog_cache.cached_response(request, resources)
+    if cached is not None:
+        return cached
+    generation = catalog_cache.generation
+
+    timetable = await db.run_sync(build_timetable, kind, entity_id, monday)
+    if timetable is None:
+        return None
+    response = success_response(200, timetable)
+    version = content_version(bytes(response.body))
+    if is_not_modified(request, version):
+        catalog_cache.store(request, response, version, generation, resources)
+        return not_modified_response(version)
+    return catalog_cache.store(request, with_version(response, version), version, generation, resources)
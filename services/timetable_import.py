@@ -0,0 +1,242 @@
+import csv
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import select, insert, update, tuple_
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from models import Building, Lecturer, Room, RoomOccupancy, RoomReservation, Schedule
+from services.occupancy import block_mask
+from services.reservation_locks import is_contention, lock_slots
+from setting import settings
+
+IMPORT_COLUMNS = ("lecturer", "course", "building", "room", "date", "start_block", "end_block")
+IMPORT_DATE_FORMAT = "%Y-%m-%d"
+DEFAULT_IMPORT_CHUNK_SIZE = 2000
+
+ScheduleKey = Tuple[int, str, str, str]
+
+
+@dataclass
+class ImportRow:
+    line: int
+    values: Dict[str, str]
+    lecturer_id: int = 0
+    room_id: int = 0
+    day: Optional[date] = None
+    mask: int = 0
+
+    @property
+    def schedule_key(self) -> ScheduleKey:
+        return self.lecturer_id, self.values["course"], self.values["start_block"], self.values["end_block"]
+
+
+@dataclass
+class RejectedRow:
+    line: int
+    values: Dict[str, str]
+    error_message: str
+
+
+@dataclass
+class ChunkResult:
+    imported: int = 0
+    conflicts: List[RejectedRow] = field(default_factory=list)
+    schedules: Dict[ScheduleKey, int] = field(default_factory=dict)
+
+
+@dataclass
+class ImportSummary:
+    rows: int = 0
+    imported: int = 0
+    schedules_created: int = 0
+    errors: List[RejectedRow] = field(default_factory=list)
+
+    @property
+    def rejected(self) -> int:
+        return len(self.errors)
+
+
+class LookupMaps:
+    # Every foreign key the file can reference, loaded once instead of one SELECT per row.
+    def __init__(self, session: Session):
+        self.lecturers: Dict[str, int] = dict(session.execute(select(Lecturer.username, Lecturer.id)).all())
+        self.rooms: Dict[Tuple[str, str], int] = {
+            (building_code, room_code): room_id
+            for building_code, room_code, room_id in session.execute(
+                select(Building.code, Room.code, Room.id).join(Room.building)
+            )
+        }
+        self.schedules: Dict[ScheduleKey, int] = {
+            (lecturer_id, course, start_block, end_block): schedule_id
+            for lecturer_id, course, start_block, end_block, schedule_id in session.execute(
+                select(Schedule.lecturer_id, Schedule.course, Schedule.start_block, Schedule.end_block, Schedule.id)
+            )
+        }
+
+
+def resolve(row: ImportRow, lookups: LookupMaps) -> Optional[str]:
+    missing = [column for column in IMPORT_COLUMNS if not row.values.get(column)]
+    if missing:
+        return f"Missing {', '.join(missing)}"
+    if row.values["lecturer"] not in lookups.lecturers:
+        return f"Lecturer {row.values['lecturer']} is not found!"
+    if (row.values["building"], row.values["room"]) not in lookups.rooms:
+        return f"Room {row.values['room']} in building {row.values['building']} is not found!"
+    try:
+        row.day = datetime.strptime(row.values["date"], IMPORT_DATE_FORMAT).date()
+        row.mask = block_mask(row.values["start_block"], row.values["end_block"])
+    except ValueError as ex:
+        return str(ex)
+    row.lecturer_id = lookups.lecturers[row.values["lecturer"]]
+    row.room_id = lookups.rooms[(row.values["building"], row.values["room"])]
+    return None
+
+
+def read_rows(file: TextIO) -> Iterator[ImportRow]:
+    reader = csv.DictReader(file)
+    missing = [column for column in IMPORT_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Timetable CSV is missing columns: {', '.join(missing)}")
+    for row in reader:
+        yield ImportRow(line=reader.line_num, values={key: (value or "").strip() for key, value in row.items() if key})
+
+
+def chunked(rows: Iterable[ImportRow], size: int) -> Iterator[List[ImportRow]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Writes one chunk without touching the lookups or the summary, so a chunk that lost a race with a
+# concurrent booking can be rolled back and run again.
+def import_chunk(session: Session, rows: List[ImportRow], lookups: LookupMaps) -> ChunkResult:
+    result = ChunkResult()
+    lock_slots(session, [(row.room_id, row.day) for row in rows])
+    # one locked read of every (room, day) the chunk touches, conflicts are then checked in memory,
+    # including rows of the same file that overlap each other
+    keys = {(row.room_id, row.day) for row in rows}
+    occupied: Dict[Tuple[int, date], RoomOccupancy] = {
+        (occupancy.room_id, occupancy.date): occupancy
+        for occupancy in session.scalars(
+            select(RoomOccupancy)
+            .where(tuple_(RoomOccupancy.room_id, RoomOccupancy.date).in_(keys))
+            .order_by(RoomOccupancy.room_id, RoomOccupancy.date)
+            .with_for_update()
+        )
+    }
+    masks = {key: occupancy.mask for key, occupancy in occupied.items()}
+
+    accepted = []
+    for row in rows:
+        key = (row.room_id, row.day)
+        if masks.get(key, 0) & row.mask:
+            result.conflicts.append(RejectedRow(row.line, row.values, "Room is already reserved!"))
+            continue
+        masks[key] = masks.get(key, 0) | row.mask
+        accepted.append(row)
+    if not accepted:
+        return result
+
+    new_schedules = list(dict.fromkeys(
+        row.schedule_key for row in accepted if row.schedule_key not in lookups.schedules
+    ))
+    if new_schedules:
+        created = session.execute(
+            insert(Schedule).returning(Schedule.id, sort_by_parameter_order=True),
+            [
+                {"lecturer_id": lecturer_id, "course": course, "start_block": start_block, "end_block": end_block}
+                for lecturer_id, course, start_block, end_block in new_schedules
+            ]
+        ).scalars().all()
+        result.schedules.update(zip(new_schedules, created))
+
+    session.execute(
+        insert(RoomReservation),
+        [
+            {
+                "room_id": row.room_id,
+                "schedule_id": lookups.schedules.get(row.schedule_key) or result.schedules[row.schedule_key],
+                "lecturer_id": row.lecturer_id,
+                "date": datetime.combine(row.day, datetime.min.time()),
+                "start_block": row.values["start_block"],
+                "end_block": row.values["end_block"],
+            }
+            for row in accepted
+        ]
+    )
+    touched = {(row.room_id, row.day) for row in accepted}
+    updates = [{"id": occupied[key].id, "mask": masks[key]} for key in touched if key in occupied]
+    if updates:
+        session.execute(update(RoomOccupancy), updates)
+    inserts = [
+        {"room_id": room_id, "date": day, "mask": masks[(room_id, day)]}
+        for room_id, day in touched - occupied.keys()
+    ]
+    if inserts:
+        session.execute(insert(RoomOccupancy), inserts)
+    result.imported = len(accepted)
+    return result
+
+
+def import_chunk_with_retry(session: Session, rows: List[ImportRow], lookups: LookupMaps) -> ChunkResult:
+    for attempt in range(settings.RESERVATION_LOCK_ATTEMPTS):
+        try:
+            result = import_chunk(session, rows, lookups) if rows else ChunkResult()
+            session.commit()
+            return result
+        except DBAPIError as ex:
+            session.rollback()
+            if not is_contention(ex) or attempt + 1 == settings.RESERVATION_LOCK_ATTEMPTS:
+                raise
+            time.sleep(random.uniform(0, settings.RESERVATION_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+    return ChunkResult()
+
+
+# Streams a timetable CSV into schedules and reservations, committing once per chunk. Rows that
+# cannot be resolved or that conflict are collected in the summary instead of aborting the run, a
+# chunk that collides with concurrent bookings is retried.
+def import_timetable(
+        session: Session,
+        file: TextIO,
+        chunk_size: int = DEFAULT_IMPORT_CHUNK_SIZE,
+        on_chunk: Optional[Callable[[ImportSummary], None]] = None,
+) -> ImportSummary:
+    summary = ImportSummary()
+    lookups = LookupMaps(session)
+
+    for chunk in chunked(read_rows(file), chunk_size):
+        summary.rows += len(chunk)
+        valid = []
+        for row in chunk:
+            error_message = resolve(row, lookups)
+            if error_message is None:
+                valid.append(row)
+            else:
+                summary.errors.append(RejectedRow(row.line, row.values, error_message))
+        result = import_chunk_with_retry(session, valid, lookups)
+        summary.imported += result.imported
+        summary.errors.extend(result.conflicts)
+        summary.schedules_created += len(result.schedules)
+        lookups.schedules.update(result.schedules)
+        if on_chunk is not None:
+            on_chunk(summary)
+    summary.errors.sort(key=lambda error: error.line)
+    return summary
+
+
+def write_errors(errors: Iterable[RejectedRow], file: TextIO):
+    writer = csv.writer(file)
+    writer.writerow(("line",) + IMPORT_COLUMNS + ("error",))
+    for error in errors:
+        values = tuple(error.values.get(column, "") for column in IMPORT_COLUMNS)
+        writer.writerow((error.line,) + values + (error.error_message,))
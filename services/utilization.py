@@ -0,0 +1,135 @@
+from datetime import date
+from typing import Optional, Tuple
+
+import numpy
+from sqlalchemy import Connection, Select, String, cast, func, select
+from sqlalchemy.orm import Session
+
+from dtos import RoomUtilization
+from models import Room, RoomOccupancy, TimeBlock
+
+MAX_UTILIZATION_DAYS = 366
+PEAK_BLOCK_COUNT = 3
+WEEKDAYS = ("MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY")
+BLOCKS = [block.value for block in TimeBlock]
+MASK_LIMIT = 1 << len(BLOCKS)
+ROOM_DTYPE = numpy.dtype([("id", numpy.int64), ("building_id", numpy.int64)])
+
+
+def _fetch_array(connection: Connection, query: Select, dtype: numpy.dtype) -> numpy.ndarray:
+    # DBAPI tuples go straight into a structured array, without building a Row object per record
+    result = connection.execute(query)
+    try:
+        return numpy.array(result.cursor.fetchall(), dtype=dtype)
+    finally:
+        result.close()
+
+
+# One row per day with "room_id * MASK_LIMIT + mask" of every occupied room joined into a string: the
+# (date, room_id, mask) index covers the scan and numpy parses each day in one call, where fetching a
+# row per (room, day) would cost a Python tuple each.
+def _fetch_occupancy(
+        session: Session,
+        start: date,
+        end: date,
+        building_id: Optional[int],
+) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    packed = cast(RoomOccupancy.room_id * MASK_LIMIT + RoomOccupancy.mask, String)
+    query = (
+        select(RoomOccupancy.date, func.aggregate_strings(packed, ","))
+        .where(RoomOccupancy.date >= start, RoomOccupancy.date <= end, RoomOccupancy.mask != 0)
+        .group_by(RoomOccupancy.date)
+    )
+    if building_id is not None:
+        query = query.join(Room, Room.id == RoomOccupancy.room_id).where(Room.building_id == building_id)
+    days, values = [], []
+    for day, joined in session.execute(query):
+        occupied = numpy.fromstring(joined, dtype=numpy.int64, sep=",")
+        days.append(numpy.full(len(occupied), (day - start).days, dtype=numpy.int64))
+        values.append(occupied)
+    if not values:
+        empty = numpy.zeros(0, dtype=numpy.int64)
+        return empty, empty, empty
+    occupancy = numpy.concatenate(values)
+    return occupancy // MASK_LIMIT, numpy.concatenate(days), occupancy % MASK_LIMIT
+
+
+def _rates(counts: numpy.ndarray, totals: numpy.ndarray) -> list:
+    # share of reserved (room, day, block) slots, 0 where there was nothing to reserve
+    rates = numpy.divide(counts, totals, out=numpy.zeros(counts.shape), where=totals > 0)
+    return numpy.round(rates, 4).tolist()
+
+
+def _block_counts(index: numpy.ndarray, bits: numpy.ndarray, length: int) -> numpy.ndarray:
+    # reserved slots per block for each of length groups, index holds the group of every occupancy
+    return numpy.stack(
+        [numpy.bincount(index, weights=bits[:, block], minlength=length) for block in range(len(BLOCKS))], axis=1
+    ).astype(numpy.int64)
+
+
+# Occupancy masks already hold one row per booked (room, day), so every figure below is a sum of their
+# bits per room or per day, without materializing the room x day x block array.
+def room_utilization(
+        session: Session,
+        start: date,
+        end: date,
+        building_id: Optional[int] = None,
+) -> RoomUtilization:
+    days = (end - start).days + 1
+    if days < 1:
+        raise ValueError("Start date is after end date!")
+    if days > MAX_UTILIZATION_DAYS:
+        raise ValueError(f"Utilization covers at most {MAX_UTILIZATION_DAYS} days!")
+
+    rooms = select(Room.id, Room.building_id).order_by(Room.id)
+    if building_id is not None:
+        rooms = rooms.where(Room.building_id == building_id)
+    room_rows = _fetch_array(session.connection(), rooms, ROOM_DTYPE)
+    occupied_rooms, day_index, masks = _fetch_occupancy(session, start, end, building_id)
+
+    room_ids, room_buildings = room_rows["id"], room_rows["building_id"]
+    if not len(room_ids):
+        occupied_rooms, day_index, masks = occupied_rooms[:0], day_index[:0], masks[:0]
+    room_index = numpy.searchsorted(room_ids, occupied_rooms)
+    # column i holds bit i of every mask
+    bits = numpy.unpackbits(
+        masks.astype("<u2").view(numpy.uint8).reshape(-1, 2), axis=1, bitorder="little"
+    )[:, :len(BLOCKS)]
+
+    room_block = _block_counts(room_index, bits, len(room_ids))
+    day_block = _block_counts(day_index, bits, days)
+    block_counts = day_block.sum(axis=0)
+    slots_per_block = len(room_ids) * days
+
+    weekdays = (numpy.arange(days) + start.weekday()) % 7
+    weekday_block = numpy.zeros((7, len(BLOCKS)), dtype=numpy.int64)
+    numpy.add.at(weekday_block, weekdays, day_block)
+    weekday_slots = numpy.bincount(weekdays, minlength=7) * len(room_ids)
+
+    building_ids, building_index = numpy.unique(room_buildings, return_inverse=True)
+    building_block = numpy.zeros((len(building_ids), len(BLOCKS)), dtype=numpy.int64)
+    numpy.add.at(building_block, building_index, room_block)
+    building_slots = numpy.bincount(building_index, minlength=len(building_ids)) * days
+
+    block_rates = numpy.array(_rates(block_counts, numpy.full(len(BLOCKS), slots_per_block)))
+    peaks = numpy.argsort(-block_rates, kind="stable")[:PEAK_BLOCK_COUNT]
+
+    return RoomUtilization(
+        start_date=start.isoformat(),
+        end_date=end.isoformat(),
+        days=days,
+        blocks=BLOCKS,
+        weekdays=list(WEEKDAYS),
+        rate=_rates(numpy.array(block_counts.sum()), numpy.array(slots_per_block * len(BLOCKS))),
+        block_rates=block_rates.tolist(),
+        peak_blocks=[BLOCKS[block] for block in peaks if block_rates[block] > 0],
+        weekday_block_rates=_rates(weekday_block, weekday_slots[:, None]),
+        building_ids=building_ids.tolist(),
+        building_rates=_rates(building_block.sum(axis=1), building_slots * len(BLOCKS)),
+        building_block_rates=_rates(building_block, building_slots[:, None]),
+        room_ids=room_ids.tolist(),
+        room_building_ids=room_buildings.tolist(),
+        room_rates=_rates(room_block.sum(axis=1), numpy.full(len(room_ids), days * len(BLOCKS))),
+        room_block_rates=_rates(room_block, numpy.full((len(room_ids), 1), days)),
+        idle_room_ids=room_ids[room_block.sum(axis=1) == 0].tolist(),
+    )
@@ -10,37 +10,92 @@ from pydantic_settings import BaseSettings
 
 load_dotenv(".env")
 
+POSTGRES_SETTINGS = ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB", "POSTGRES_PORT")
+
 
 class Settings(BaseSettings):
     SERVER_HOST: str = "localhost"
     SERVER_PORT: str = "8080"
+    # production worker processes, defaults to one per CPU core
+    WEB_CONCURRENCY: Optional[int] = None
     SECRET_KEY: str = secrets.token_urlsafe(32)
 
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
 
-    POSTGRES_SERVER: str
-    POSTGRES_USER: str
-    POSTGRES_PASSWORD: str
-    POSTGRES_DB: str
-    POSTGRES_PORT: str
+    # scheme new hashes are written with, older schemes are rehashed on the next successful login
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    # bcrypt cost factor or argon2 time cost, None keeps the passlib default
+    PASSWORD_HASH_ROUNDS: Optional[int] = None
+    ARGON2_MEMORY_COST: Optional[int] = None
+    ARGON2_PARALLELISM: Optional[int] = None
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+
+    # authenticated lecturer lookups, invalidated on lecturer updates in every worker through the notifier
+    AUTH_CACHE_TTL_SECONDS: float = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_NOTIFY_CHANNEL: str = "auth_invalidation"
+    # cross-worker invalidation, "postgres" uses LISTEN/NOTIFY, "memory" only reaches this process, "auto" picks by database
+    NOTIFIER: str = "auto"
+
+    # only required when SQLALCHEMY_DATABASE_URI is unset
+    POSTGRES_SERVER: Optional[str] = None
+    POSTGRES_USER: Optional[str] = None
+    POSTGRES_PASSWORD: Optional[str] = None
+    POSTGRES_DB: Optional[str] = None
+    POSTGRES_PORT: Optional[str] = None
+
+    # any SQLAlchemy URL, built from the POSTGRES_* values when unset; sqlite:///file.db works for local runs
+    SQLALCHEMY_DATABASE_URI: Optional[str] = None
+
+    # per engine and per worker, size it so workers * (pool + overflow) stays below max_connections
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # milliseconds, 0 disables the limit
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    # room assignment solver, 0 workers uses one process per independent partition
+    ASSIGNMENT_TIME_LIMIT_SECONDS: float = 45
+    ASSIGNMENT_SOLVER_WORKERS: int = 0
+
+    # serialized building and room responses, invalidated on writes and across workers by the notifier
+    CATALOG_CACHE_TTL_SECONDS: float = 300
+    CATALOG_CACHE_MAX_ENTRIES: int = 1000
+    CATALOG_NOTIFY_CHANNEL: str = "catalog_invalidation"
+    # /ws/availability, events reach other workers over this channel through the NOTIFIER backend
+    AVAILABILITY_NOTIFY_CHANNEL: str = "availability_events"
+    # events buffered per socket, a subscriber that falls further behind is told to resync
+    AVAILABILITY_QUEUE_SIZE: int = 100
+
+    # reservation writes lock each (room, date) they touch: seconds to wait for a lock, attempts before a 409
+    RESERVATION_LOCK_TIMEOUT_SECONDS: float = 5
+    RESERVATION_LOCK_ATTEMPTS: int = 3
+    # upper bound of the random pause before the first retry, doubled on every further attempt
+    RESERVATION_RETRY_BACKOFF_SECONDS: float = 0.05
 
-    SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
+    # requests running more SQL statements than this are logged and counted, 0 disables the check
+    SQL_QUERY_BUDGET: int = 20
 
     @field_validator("SQLALCHEMY_DATABASE_URI", mode="after")
     @classmethod
     def assemble_db_connection(cls, v: Optional[str], values) -> Any:
         if isinstance(v, str):
             return v
-        print(values.data)
-        return PostgresDsn.build(
+        missing = [name for name in POSTGRES_SETTINGS if not values.data.get(name)]
+        if missing:
+            raise ValueError(f"Set SQLALCHEMY_DATABASE_URI or {', '.join(missing)}")
+        return str(PostgresDsn.build(
             scheme="postgresql+psycopg",
             username=values.data.get("POSTGRES_USER"),
             password=values.data.get("POSTGRES_PASSWORD"),
             host=values.data.get("POSTGRES_SERVER"),
             port=int(values.data.get("POSTGRES_PORT")),
             path=f"{values.data.get('POSTGRES_DB')}",
-        )
+        ))
 
 
 settings = Settings()
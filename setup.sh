@@ -1,2 +1,4 @@
 pip install -r ./requirement.txt
+python ./manage.py migrate
+python ./manage.py seed
 uvicorn main:app --reload --log-level debug
\ No newline at end of file
@@ -0,0 +1,90 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+# settings are read at import, the app must see the test database before anything imports it
+DATABASE = os.path.join(tempfile.mkdtemp(prefix="reservation-tests-"), "test.db")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{DATABASE}"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import migrations
+from main import app
+from models import SessionLocal, engine, async_engine, Building, Room, Lecturer, Schedule, RoomReservation, Gender, Faculty
+from services import occupancy
+from services.catalog import catalog_cache
+from utils.jwt_token import create_access_token
+
+BUILDINGS = 3
+ROOMS_PER_BUILDING = 3
+LECTURERS = 3
+SCHEDULES_PER_LECTURER = 2
+RESERVATION_DAYS = 3
+
+
+def seed():
+    with SessionLocal() as session:
+        for index in range(BUILDINGS):
+            building = Building(name=f"Building {index}", code=f"B{index}")
+            session.add(building)
+            for number in range(ROOMS_PER_BUILDING):
+                session.add(Room(name=f"Room {index}.{number}", code=f"R{index}{number}", capacity=40, building=building))
+        for index in range(LECTURERS):
+            lecturer = Lecturer(
+                username=f"lecturer{index}", password="", first_name="First", last_name=f"Last{index}",
+                email=f"lecturer{index}@example.com", dob=datetime(1980, 1, 1), gender=Gender.female,
+                faculty=Faculty.computer_science,
+            )
+            session.add(lecturer)
+            for number in range(SCHEDULES_PER_LECTURER):
+                session.add(Schedule(lecturer=lecturer, course=f"Course {index}.{number}", start_block="BLOCK_1", end_block="BLOCK_2"))
+        session.flush()
+        rooms = session.query(Room).order_by(Room.id).all()
+        schedules = session.query(Schedule).order_by(Schedule.id).all()
+        for index, schedule in enumerate(schedules):
+            for day in range(RESERVATION_DAYS):
+                session.add(RoomReservation(
+                    room=rooms[index % len(rooms)], schedule=schedule, lecturer_id=schedule.lecturer_id,
+                    date=datetime(2024, 1, 1 + day), start_block=schedule.start_block, end_block=schedule.end_block,
+                ))
+        session.flush()
+        occupancy.rebuild(session)
+        session.commit()
+
+
+@pytest.fixture(scope="session")
+def client():
+    migrations.migrate(engine)
+    seed()
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def empty_catalog_cache():
+    catalog_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'lecturer0'})}"}
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", record)
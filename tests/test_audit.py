@@ -0,0 +1,67 @@
+import random
+from datetime import date, datetime
+from itertools import combinations
+
+from sqlalchemy import delete
+
+from models import SessionLocal, RoomReservation
+from services.audit import AuditRow, sweep
+
+AUDIT_DAY = "2028-01-03T00:00:00Z"
+
+
+def test_sweep_finds_the_same_pairs_as_comparing_all():
+    rng = random.Random(22)
+    for _ in range(50):
+        rows = []
+        for id in range(1, rng.randrange(2, 12)):
+            start = rng.randrange(10)
+            rows.append(AuditRow(id, 1, date(2028, 1, 3), start, rng.randrange(start, 10)))
+
+        found = {frozenset((first.id, second.id)) for first, second in sweep(rows)}
+
+        expected = {
+            frozenset((first.id, second.id))
+            for first, second in combinations(rows, 2)
+            if first.start <= second.end and second.start <= first.end
+        }
+        assert found == expected
+
+
+def test_audit_reports_double_bookings(client, auth_headers):
+    with SessionLocal() as session:
+        # written behind the occupancy bookkeeping, as data from before it existed would be
+        rows = [
+            RoomReservation(room_id=3, schedule_id=1, lecturer_id=1, date=datetime(2028, 1, 3, 8),
+                            start_block="BLOCK_1", end_block="BLOCK_3"),
+            RoomReservation(room_id=3, schedule_id=3, lecturer_id=2, date=datetime(2028, 1, 3, 8),
+                            start_block="BLOCK_3", end_block="BLOCK_4"),
+            RoomReservation(room_id=4, schedule_id=2, lecturer_id=1, date=datetime(2028, 1, 3, 8),
+                            start_block="BLOCK_2", end_block="BLOCK_2"),
+        ]
+        session.add_all(rows)
+        session.commit()
+        ids = [row.id for row in rows]
+    try:
+        full = client.post("/reservation/audit", params={"from": AUDIT_DAY, "to": AUDIT_DAY}, headers=auth_headers)
+        incremental = client.post("/reservation/audit", params={"incremental": True}, headers=auth_headers)
+    finally:
+        with SessionLocal() as session:
+            session.execute(delete(RoomReservation).where(RoomReservation.id.in_(ids)))
+            session.commit()
+
+    assert full.status_code == 200
+    report = full.json()["data"]
+    assert (report["mode"], report["rows_scanned"]) == ("full", 6)
+    assert [(overlap["kind"], overlap["owner_id"], overlap["reservation_ids"], overlap["start_block"],
+             overlap["end_block"]) for overlap in report["overlaps"]] == [
+        ("room", 3, [ids[0], ids[1]], "BLOCK_3", "BLOCK_3"),
+        ("lecturer", 1, [ids[0], ids[2]], "BLOCK_2", "BLOCK_2"),
+    ]
+
+    assert incremental.status_code == 200
+    report = incremental.json()["data"]
+    assert report["mode"] == "incremental"
+    # the seed was written moments ago too, so its own double bookings are re-checked alongside
+    assert [(overlap["kind"], overlap["reservation_ids"]) for overlap in report["overlaps"]
+            if set(overlap["reservation_ids"]) & set(ids)] == [("room", [ids[0], ids[1]]), ("lecturer", [ids[0], ids[2]])]
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime
+
+from models import SessionLocal, Lecturer, Gender, Faculty
+from utils.cache import TTLCache
+from utils.jwt_token import create_access_token, current_user_cache, current_user_notifier, invalidate_current_user
+
+BOOKING = {"room_id": 9, "schedule_id": 5, "date": "2026-11-02T08:00:00Z"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def headers(username: str):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+def add_lecturer(username: str) -> int:
+    with SessionLocal() as session:
+        lecturer = Lecturer(
+            username=username, password="", first_name="Cached", last_name="Lecturer", email=f"{username}@example.com",
+            dob=datetime(1985, 5, 5), gender=Gender.male, faculty=Faculty.computer_science,
+        )
+        session.add(lecturer)
+        session.commit()
+        return lecturer.id
+
+
+def test_ttl_cache_counts_hits_misses_and_expiry():
+    clock = Clock()
+    cache = TTLCache(max_entries=2, ttl_seconds=10, clock=clock)
+
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    cache.invalidate("c")
+
+    assert cache.stats() == {
+        "entries": 1, "max_entries": 2, "ttl_seconds": 10, "hits": 1, "misses": 2, "evictions": 1, "invalidations": 1,
+    }
+
+
+def test_lecturer_lookup_is_cached_until_an_update(client):
+    add_lecturer("cached")
+    before = current_user_cache.stats()
+
+    first = client.post("/reservation/", json=BOOKING, headers=headers("cached"))
+    second = client.post("/reservation/", json=BOOKING, headers=headers("cached"))
+
+    assert (first.status_code, second.status_code) == (201, 409)
+    after = current_user_cache.stats()
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (1, 1)
+    assert current_user_cache.get("cached") is not None
+
+
+def test_update_and_delete_drop_the_cached_lecturer(client):
+    lecturer_id = add_lecturer("renamed")
+    assert client.post("/reservation/", json=BOOKING, headers=headers("renamed")).status_code == 409
+    assert current_user_cache.get("renamed") is not None
+
+    assert client.put(f"/lecturer/{lecturer_id}", json={"username": "renamed2"}).status_code == 200
+    assert current_user_cache.get("renamed") is None
+    assert client.post("/reservation/", json=BOOKING, headers=headers("renamed")).status_code == 401
+
+    assert client.post("/reservation/", json=BOOKING, headers=headers("renamed2")).status_code == 409
+    assert client.delete(f"/lecturer/{lecturer_id}").status_code == 200
+    assert client.post("/reservation/", json=BOOKING, headers=headers("renamed2")).status_code == 401
+
+
+def test_invalidation_reaches_notifier_subscribers():
+    received = []
+    current_user_cache.set("with,comma", object())
+    current_user_notifier.subscribe(received.append)
+    try:
+        asyncio.run(invalidate_current_user("with,comma", None))
+    finally:
+        current_user_notifier._subscribers.remove(received.append)
+
+    # other workers get the same quoted tags over LISTEN/NOTIFY
+    assert received == [["with%2Ccomma"]]
+    assert current_user_cache.get("with,comma") is None
@@ -0,0 +1,95 @@
+import asyncio
+import json
+from datetime import date
+
+from services.availability import (
+    AvailabilityBroker, RESERVED, RESYNC, RESYNC_MESSAGE, availability_broker, availability_event
+)
+from utils.notifier import PostgresNotifier
+
+
+class FakePublisher:
+    closed = False
+
+    def __init__(self):
+        self.payloads = []
+
+    async def execute(self, statement, parameters):
+        self.payloads.append(parameters[1])
+
+
+def event_token(building_id: int, day: date = date(2026, 10, 5)) -> str:
+    return availability_event(RESERVED, 1, 2, building_id, day, "BLOCK_1", "BLOCK_2").encode()
+
+
+def drain(subscription):
+    messages = []
+    while not subscription.queue.empty():
+        messages.append(subscription.queue.get_nowait())
+    return messages
+
+
+def test_notifier_skips_its_own_loopback():
+    async def publish():
+        notifier, other = PostgresNotifier("postgresql://", "events"), PostgresNotifier("postgresql://", "events")
+        delivered = []
+        notifier.subscribe(delivered.append)
+        notifier._publish_lock, notifier._publisher = asyncio.Lock(), FakePublisher()
+        other._publish_lock, other._publisher = asyncio.Lock(), FakePublisher()
+
+        await notifier.publish(["a", "b"])
+        await other.publish(["c"])
+        # LISTEN hands every worker its own notifications as well
+        for payload in notifier._publisher.payloads + other._publisher.payloads:
+            notifier.receive(payload)
+        return delivered
+
+    assert asyncio.run(publish()) == [["a", "b"], ["c"]]
+
+
+def test_broker_routes_events_by_building_and_date():
+    broker = AvailabilityBroker(max_queue=10)
+    everything = broker.subscribe()
+    building = broker.subscribe(buildings={1})
+    day = broker.subscribe(dates={date(2026, 10, 6)})
+
+    broker.deliver([event_token(1), event_token(2, date(2026, 10, 6))])
+
+    assert [json.loads(message)["building_id"] for message in drain(everything)] == [1, 2]
+    assert [json.loads(message)["building_id"] for message in drain(building)] == [1]
+    assert [json.loads(message)["date"] for message in drain(day)] == ["2026-10-06"]
+    assert broker.stats()["published"] == 2
+
+
+def test_slow_subscriber_is_told_to_resync():
+    broker = AvailabilityBroker(max_queue=2)
+    subscription = broker.subscribe()
+
+    broker.deliver([event_token(1)] * 3)
+    assert drain(subscription) == [RESYNC_MESSAGE]
+
+    broker.deliver([RESYNC])
+    assert drain(subscription) == [RESYNC_MESSAGE]
+    broker.unsubscribe(subscription)
+    assert broker.stats() == {"subscribers": 0, "published": 3, "dropped": 2}
+
+
+def test_socket_receives_each_booking_once(client, auth_headers):
+    with client.websocket_connect("/ws/availability?buildings=2") as socket:
+        assert json.loads(socket.receive_text()) == {"type": "subscribed", "buildings": [2], "dates": None}
+        published = availability_broker.published
+
+        other = client.post(
+            "/reservation/", json={"room_id": 1, "schedule_id": 4, "date": "2026-10-05T08:00:00Z"}, headers=auth_headers
+        )
+        booked = client.post(
+            "/reservation/", json={"room_id": 4, "schedule_id": 4, "date": "2026-10-05T08:00:00Z"}, headers=auth_headers
+        )
+        assert (other.status_code, booked.status_code) == (201, 201)
+
+        message = json.loads(socket.receive_text())
+        assert message["type"] == RESERVED
+        assert (message["reservation_id"], message["room_id"], message["building_id"]) == (
+            booked.json()["data"]["id"], 4, 2
+        )
+        assert availability_broker.published - published == 2
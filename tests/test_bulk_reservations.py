@@ -0,0 +1,55 @@
+from tests.conftest import count_statements
+
+MONDAY_WEDNESDAY = [0, 2]
+
+
+def bulk(client, auth_headers, room_id, start, end, weekdays=MONDAY_WEDNESDAY):
+    return client.post(
+        "/reservation/bulk",
+        json={"schedule_id": 2, "room_id": room_id, "start_date": start, "end_date": end, "weekdays": weekdays},
+        headers=auth_headers,
+    )
+
+
+def test_bulk_books_every_meeting_day(client, auth_headers):
+    response = bulk(client, auth_headers, 4, "2026-04-06T08:00:00Z", "2026-04-19T08:00:00Z")
+
+    assert response.status_code == 201
+    assert [(result["date"], result["accepted"]) for result in response.json()["data"]] == [
+        ("2026-04-06T08:00:00Z", True),
+        ("2026-04-08T08:00:00Z", True),
+        ("2026-04-13T08:00:00Z", True),
+        ("2026-04-15T08:00:00Z", True),
+    ]
+
+
+def test_bulk_rejects_only_taken_days(client, auth_headers):
+    taken = client.post(
+        "/reservation/", json={"room_id": 5, "schedule_id": 1, "date": "2026-04-08T08:00:00Z"}, headers=auth_headers
+    )
+    assert taken.status_code == 201
+
+    response = bulk(client, auth_headers, 5, "2026-04-06T08:00:00Z", "2026-04-13T08:00:00Z")
+
+    assert response.status_code == 201
+    results = {result["date"]: result for result in response.json()["data"]}
+    assert results["2026-04-08T08:00:00Z"]["accepted"] is False
+    assert results["2026-04-08T08:00:00Z"]["error_message"] == "Room is already reserved!"
+    assert results["2026-04-06T08:00:00Z"]["accepted"] and results["2026-04-13T08:00:00Z"]["accepted"]
+
+
+def test_bulk_statement_count_does_not_grow_with_the_term(client, auth_headers):
+    with count_statements() as short_statements:
+        short = bulk(client, auth_headers, 6, "2026-05-04T08:00:00Z", "2026-05-10T08:00:00Z")
+    with count_statements() as long_statements:
+        long = bulk(client, auth_headers, 7, "2026-05-04T08:00:00Z", "2026-08-30T08:00:00Z")
+
+    assert len(short.json()["data"]) == 2
+    assert len(long.json()["data"]) == 34
+    assert len(short_statements) == len(long_statements)
+
+
+def test_bulk_rejects_reversed_range(client, auth_headers):
+    response = bulk(client, auth_headers, 4, "2026-04-19T08:00:00Z", "2026-04-06T08:00:00Z")
+
+    assert response.status_code == 400
@@ -0,0 +1,33 @@
+from tests.conftest import count_statements
+from utils.conditional import ResourceVersion, is_not_modified
+
+
+class FakeRequest:
+    def __init__(self, **headers: str):
+        self.headers = {name.replace("_", "-"): value for name, value in headers.items()}
+
+
+def test_weak_etags_match_in_a_list():
+    version = ResourceVersion(etag='W/"abc"', last_modified=None)
+
+    assert is_not_modified(FakeRequest(if_none_match='"xyz", "abc"'), version)
+    assert is_not_modified(FakeRequest(if_none_match="*"), version)
+    assert not is_not_modified(FakeRequest(if_none_match='W/"xyz"'), version)
+    assert not is_not_modified(FakeRequest(), version)
+
+
+def test_revalidation_is_served_from_the_catalog_cache_until_the_row_changes(client):
+    first = client.get("/building/3")
+    etag = first.headers["etag"]
+
+    with count_statements() as statements:
+        revalidated = client.get("/building/3", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert statements == []
+
+    assert client.put("/building/3", json={"name": "Renamed building"}).status_code == 200
+    changed = client.get("/building/3", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["data"]["name"] == "Renamed building"
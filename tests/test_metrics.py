@@ -0,0 +1,39 @@
+import pytest
+
+from setting import settings
+from utils.metrics import Histogram, over_budget_total, request_queries
+
+
+def sample(text: str, line_prefix: str) -> float:
+    return next(float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(line_prefix))
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram("test_seconds", "Test.", (1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3):
+        histogram.observe(value, route="/")
+
+    key = (("route", "/"),)
+    assert histogram.quantile(0.5, key) == 1.5
+    assert histogram.quantile(0.99, key) == pytest.approx(3.92)
+
+
+def test_requests_are_counted_per_route_template(client):
+    client.get("/building/1")
+    client.get("/building/2")
+
+    text = client.get("/metrics").text
+
+    assert sample(text, 'http_requests_total{method="GET",route="/building/{building_id}",status="200"}') >= 2
+    assert sample(text, 'http_request_sql_queries_count{method="GET",route="/building/{building_id}"}') >= 2
+
+
+def test_requests_over_the_query_budget_are_flagged(client, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_QUERY_BUDGET", 1)
+    labels = (("method", "GET"), ("route", "/lecturer/"))
+    before = over_budget_total._values.get(labels, 0)
+
+    client.get("/lecturer/")
+
+    assert over_budget_total._values[labels] == before + 1
+    assert request_queries._sums[labels] > 1
@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from models import SessionLocal, RoomOccupancy
+from services import occupancy
+
+DAY = "2026-03-02T08:00:00Z"
+
+
+def occupancy_masks(session):
+    rows = session.execute(select(RoomOccupancy.room_id, RoomOccupancy.date, RoomOccupancy.mask))
+    return {(room_id, day): mask for room_id, day, mask in rows}
+
+
+def test_block_mask():
+    assert occupancy.block_mask("BLOCK_1", "BLOCK_1") == 0b1
+    assert occupancy.block_mask("BLOCK_2", "BLOCK_4") == 0b1110
+    with pytest.raises(ValueError):
+        occupancy.block_mask("BLOCK_3", "BLOCK_2")
+    with pytest.raises(ValueError):
+        occupancy.block_mask("BLOCK_0", "BLOCK_2")
+
+
+def test_reserve_rejects_overlapping_blocks(client):
+    day = date(2026, 3, 3)
+    with SessionLocal() as session:
+        assert occupancy.reserve(session, 9, day, 0b0011)
+        assert not occupancy.reserve(session, 9, day, 0b0110)
+        assert occupancy.reserve(session, 9, day, 0b1100)
+        occupancy.release(session, 9, day, 0b0011)
+        assert occupancy.reserve(session, 9, day, 0b0001)
+        assert session.scalar(select(RoomOccupancy.mask).where(RoomOccupancy.room_id == 9)
+                              .where(RoomOccupancy.date == day)) == 0b1101
+        session.rollback()
+
+
+def test_reservation_routes_keep_occupancy_in_sync(client, auth_headers):
+    booking = {"room_id": 2, "schedule_id": 1, "date": DAY}
+
+    created = client.post("/reservation/", json=booking, headers=auth_headers)
+    assert created.status_code == 201
+    conflict = client.post("/reservation/", json=booking, headers=auth_headers)
+    assert conflict.status_code == 409
+    assert conflict.json()["error_message"] == "Room is already reserved!"
+
+    assert client.delete(f"/reservation/{created.json()['data']['id']}").status_code == 200
+    assert client.post("/reservation/", json=booking, headers=auth_headers).status_code == 201
+
+    with SessionLocal() as session:
+        current = occupancy_masks(session)
+        occupancy.rebuild(session)
+        rebuilt = occupancy_masks(session)
+        session.rollback()
+    assert {key: mask for key, mask in current.items() if mask} == rebuilt
+
+
+def test_moving_to_an_inverted_block_range_is_rejected(client, auth_headers):
+    created = client.post(
+        "/reservation/", json={"room_id": 3, "schedule_id": 2, "date": "2026-03-09T08:00:00Z"}, headers=auth_headers
+    )
+    reservation_id = created.json()["data"]["id"]
+
+    response = client.put(
+        f"/reservation/{reservation_id}", json={"start_block": "BLOCK_4", "end_block": "BLOCK_2"}, headers=auth_headers
+    )
+
+    assert response.status_code == 400
+    with SessionLocal() as session:
+        assert session.scalar(select(RoomOccupancy.mask).where(RoomOccupancy.room_id == 3)
+                              .where(RoomOccupancy.date == date(2026, 3, 9))) == 0b11
@@ -0,0 +1,58 @@
+import pytest
+
+from tests.conftest import count_statements
+
+# One statement for the version check, one for the page and one per included to-many relation, no
+# matter how many rows come back. Reservations join their to-one relations and skip the version check.
+ROUTES = [
+    ("/building/", None, 2),
+    ("/building/", "rooms", 3),
+    ("/building/", "rooms.reservations", 4),
+    ("/building/1", None, 2),
+    ("/building/1", "rooms", 3),
+    ("/building/1", "rooms.reservations", 4),
+    ("/room/", None, 2),
+    ("/room/", "building,reservations", 3),
+    ("/room/1", None, 2),
+    ("/room/1", "building,reservations", 3),
+    ("/lecturer/", None, 2),
+    ("/lecturer/", "schedules,reservations", 4),
+    ("/lecturer/1", None, 2),
+    ("/lecturer/1", "schedules,reservations", 4),
+    ("/schedule/", None, 2),
+    ("/schedule/", "lecturer,reservations", 3),
+    ("/schedule/1", None, 2),
+    ("/schedule/1", "lecturer,reservations", 3),
+    ("/reservation/", None, 1),
+    ("/reservation/", "room,lecturer,schedule", 1),
+]
+
+
+@pytest.mark.parametrize("path,include,queries", ROUTES)
+def test_statement_count(client, path, include, queries):
+    with count_statements() as statements:
+        response = client.get(path, params={"include": include} if include else {})
+
+    assert response.status_code == 200
+    assert response.json()["data"]
+    assert len(statements) == queries
+
+
+def test_cached_response_runs_no_statements(client):
+    client.get("/building/", params={"include": "rooms"})
+    with count_statements() as statements:
+        response = client.get("/building/", params={"include": "rooms"})
+
+    assert response.status_code == 200
+    assert statements == []
+
+
+@pytest.mark.parametrize("path", ["/building/", "/room/", "/lecturer/", "/schedule/", "/reservation/"])
+def test_statement_count_does_not_grow_with_the_page(client, path):
+    with count_statements() as one:
+        client.get(path, params={"limit": 1})
+    with count_statements() as page:
+        response = client.get(path)
+
+    assert len(response.json()["data"]) > 1
+    assert len(one) == len(page)
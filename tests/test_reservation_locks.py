@@ -0,0 +1,143 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from models import SessionLocal, RoomOccupancy, Schedule
+from services import reservation_locks
+from services.reservation_locks import (
+    LocalSlotLocks, ReservationBusy, ReservationConflict, SlotBusy, local_slot_locks, run_locked, slot_keys
+)
+from setting import settings
+
+BURST = 8
+
+
+class FakeSession:
+    class bind:
+        class dialect:
+            name = "sqlite"
+
+    def __init__(self):
+        self.rollbacks = 0
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+class PostgresError(Exception):
+    def __init__(self, sqlstate: str):
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+def occupancy_mask(room_id: int, day: date) -> int:
+    with SessionLocal() as session:
+        return session.scalar(
+            select(RoomOccupancy.mask).where(RoomOccupancy.room_id == room_id, RoomOccupancy.date == day)
+        ) or 0
+
+
+def test_concurrent_bookings_of_one_slot_book_it_once(client, auth_headers):
+    booking = {"room_id": 6, "schedule_id": 3, "date": "2026-09-07T08:00:00Z"}
+
+    with ThreadPoolExecutor(BURST) as pool:
+        responses = list(pool.map(
+            lambda _: client.post("/reservation/", json=booking, headers=auth_headers), range(BURST)
+        ))
+
+    assert sorted(response.status_code for response in responses) == [201] + [409] * (BURST - 1)
+    assert occupancy_mask(6, date(2026, 9, 7)) == 0b11
+    assert local_slot_locks.stats() == {"slots": 0, "waiting": 0}
+
+
+def test_slot_keys_are_distinct_and_ordered():
+    assert slot_keys([(2, date(2026, 1, 2)), (1, date(2026, 1, 3)), (2, date(2026, 1, 2))]) == [
+        (1, date(2026, 1, 3)), (2, date(2026, 1, 2))
+    ]
+
+
+def test_advisory_locks_take_every_key_in_one_statement():
+    keys = [(room_id, date(2026, 1, day)) for room_id in range(1, 4) for day in range(1, 6)]
+
+    timeout, locks = reservation_locks._advisory_locks(keys)
+    sql = str(locks.compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("SELECT pg_advisory_xact_lock(slots.room_id, slots.day)")
+    assert sql.count("(%(param_") == len(keys)
+    assert sql.endswith("ORDER BY slots.room_id, slots.day")
+
+
+def test_local_locks_time_out():
+    async def hold_twice():
+        locks = LocalSlotLocks()
+        keys = [(1, date(2026, 1, 1))]
+        async with locks.hold(keys, 1):
+            with pytest.raises(SlotBusy):
+                async with locks.hold(keys, 0.01):
+                    pass
+        return locks.stats()
+
+    assert asyncio.run(hold_twice()) == {"slots": 0, "waiting": 0}
+
+
+def test_lost_race_is_retried(monkeypatch):
+    monkeypatch.setattr(settings, "RESERVATION_RETRY_BACKOFF_SECONDS", 0)
+    attempts = []
+
+    async def book():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OperationalError("UPDATE", {}, sqlite3.OperationalError("database is locked"))
+        return 42
+
+    db = FakeSession()
+
+    assert asyncio.run(run_locked(db, [(1, date(2026, 1, 1))], book)) == 42
+    assert (len(attempts), db.rollbacks) == (2, 1)
+
+
+def test_busy_after_the_last_attempt(monkeypatch):
+    monkeypatch.setattr(settings, "RESERVATION_RETRY_BACKOFF_SECONDS", 0)
+
+    async def book():
+        raise IntegrityError("INSERT", {}, PostgresError("40P01"))
+
+    db = FakeSession()
+
+    with pytest.raises(ReservationBusy):
+        asyncio.run(run_locked(db, [(1, date(2026, 1, 1))], book))
+    assert db.rollbacks == settings.RESERVATION_LOCK_ATTEMPTS
+
+
+def test_exclusion_violation_is_a_conflict():
+    async def book():
+        raise IntegrityError("INSERT", {}, PostgresError("23P01"))
+
+    db = FakeSession()
+
+    with pytest.raises(ReservationConflict, match="Room is already reserved!"):
+        asyncio.run(run_locked(db, [(1, date(2026, 1, 1))], book))
+    assert db.rollbacks == 1
+
+
+def test_deleting_a_schedule_releases_its_slots(client, auth_headers):
+    with SessionLocal() as session:
+        schedule = Schedule(lecturer_id=3, course="Dropped", start_block="BLOCK_5", end_block="BLOCK_6")
+        session.add(schedule)
+        session.commit()
+        schedule_id = schedule.id
+    for day in ("2026-09-14T08:00:00Z", "2026-09-15T08:00:00Z"):
+        booking = {"room_id": 6, "schedule_id": schedule_id, "date": day}
+        assert client.post("/reservation/", json=booking, headers=auth_headers).status_code == 201
+    assert occupancy_mask(6, date(2026, 9, 14)) == 0b110000
+
+    response = client.delete(f"/schedule/{schedule_id}")
+
+    assert response.status_code == 200
+    assert occupancy_mask(6, date(2026, 9, 14)) == occupancy_mask(6, date(2026, 9, 15)) == 0
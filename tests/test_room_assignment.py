@@ -0,0 +1,77 @@
+import random
+
+from services.assignment_solver import SolverRoom, SolverSchedule, solve
+
+TERM = {"start_date": "2027-02-01T08:00:00Z", "end_date": "2027-02-14T08:00:00Z", "weekdays": [1, 3]}
+
+
+def assert_valid(schedules, rooms, solution):
+    busy = {room.id: room.busy for room in rooms}
+    for schedule in schedules:
+        room_id = solution.rooms[schedule.id]
+        if room_id is not None:
+            assert not busy[room_id] & schedule.mask
+            busy[room_id] |= schedule.mask
+
+
+def test_solver_places_every_course_of_a_feasible_term():
+    rng = random.Random(21)
+    rooms, schedules = [], []
+    # planted: each room gets a busy block and a few courses that fit around it, then the rooms are hidden
+    for room_id in range(1, 41):
+        busy_block = rng.randrange(10)
+        rooms.append(SolverRoom(room_id, 1 + room_id % 4, 40, 1 << busy_block))
+        block = 0
+        while block < 9:
+            length = rng.randrange(1, 3)
+            if block + length <= 10 and not block <= busy_block < block + length and rng.random() < 0.6:
+                schedules.append(SolverSchedule(len(schedules) + 1, rng.randrange(1, 31), ((1 << length) - 1) << block))
+            block += length
+    rng.shuffle(schedules)
+
+    solution = solve(schedules, rooms, time_limit=1.0, workers=1)
+
+    assert solution.unassigned == 0
+    assert_valid(schedules, rooms, solution)
+
+
+def test_solver_reports_courses_without_a_room():
+    rooms = [SolverRoom(1, 1, 40, 0), SolverRoom(2, 1, 40, 0b1)]
+    schedules = [SolverSchedule(id, id, 0b11) for id in range(1, 4)]
+
+    solution = solve(schedules, rooms, time_limit=0.5, workers=1)
+
+    assert solution.unassigned == 2
+    assert_valid(schedules, rooms, solution)
+
+
+def test_solver_keeps_a_lecturer_in_one_building():
+    rooms = [SolverRoom(1, 1, 40, 0), SolverRoom(2, 2, 40, 0), SolverRoom(3, 2, 40, 0)]
+    # the morning and afternoon courses share no block, so they are solved as separate partitions
+    schedules = [SolverSchedule(1, 7, 0b11), SolverSchedule(2, 7, 0b1100000), SolverSchedule(3, 8, 0b11)]
+
+    solution = solve(schedules, rooms, time_limit=0.5, workers=1)
+
+    assert solution.partitions == 2
+    assert solution.unassigned == 0
+    assert solution.building_changes == 0
+    assert_valid(schedules, rooms, solution)
+
+
+def test_preview_then_commit(client, auth_headers):
+    spec = {**TERM, "schedule_ids": [3, 4, 5, 6], "building_ids": [3]}
+
+    preview = client.post("/reservation/assignments/preview", json=spec, headers=auth_headers)
+
+    assert preview.status_code == 200
+    plan = preview.json()["data"]
+    assert (plan["assigned"], plan["unassigned"]) == (3, 1)
+    assert {assignment["building_id"] for assignment in plan["assignments"] if assignment["room_id"]} == {3}
+
+    commit = {**TERM, "assignments": plan["assignments"]}
+    created = client.post("/reservation/assignments/commit", json=commit, headers=auth_headers)
+    assert created.status_code == 201
+    assert created.json()["data"] == {"schedules": 3, "reservations": 12}
+
+    repeated = client.post("/reservation/assignments/commit", json=commit, headers=auth_headers)
+    assert repeated.status_code == 409
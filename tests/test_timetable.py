@@ -0,0 +1,52 @@
+from datetime import date
+
+import pytest
+
+from services.timetable import parse_week, week_label
+
+
+def test_parse_week():
+    assert parse_week("2024-W05") == date(2024, 1, 29)
+    assert parse_week("2024-01-31") == date(2024, 1, 29)
+    assert parse_week(None, today=date(2024, 2, 4)) == date(2024, 1, 29)
+    assert week_label(date(2024, 12, 30)) == "2025-W01"
+    with pytest.raises(ValueError):
+        parse_week("last week")
+
+
+def test_room_timetable_grid(client):
+    response = client.get("/room/1/timetable", params={"week": "2024-W01"})
+
+    assert response.status_code == 200
+    timetable = response.json()["data"]
+    assert (timetable["start_date"], timetable["end_date"]) == ("2024-01-01", "2024-01-07")
+    assert [entry["reservation_id"] for entry in timetable["entries"]] == [1, 2, 3]
+    assert [day["blocks"][:3] for day in timetable["days"][:4]] == [
+        [[0], [0], []], [[1], [1], []], [[2], [2], []], [[], [], []],
+    ]
+
+
+def test_lecturer_timetable_shows_both_schedules(client):
+    timetable = client.get("/lecturer/1/timetable", params={"week": "2024-01-03"}).json()["data"]
+
+    assert {entry["schedule_id"] for entry in timetable["entries"]} == {1, 2}
+    assert len(timetable["days"][0]["blocks"][0]) == 2
+
+
+def test_unknown_room_and_bad_week(client):
+    assert client.get("/room/999/timetable").status_code == 404
+    assert client.get("/room/1/timetable", params={"week": "someday"}).status_code == 400
+
+
+def test_reservation_write_drops_the_cached_week(client, auth_headers):
+    params = {"week": "2026-07-06"}
+    assert client.get("/room/8/timetable", params=params).json()["data"]["entries"] == []
+
+    created = client.post(
+        "/reservation/", json={"room_id": 8, "schedule_id": 3, "date": "2026-07-08T08:00:00Z"}, headers=auth_headers
+    )
+    assert created.status_code == 201
+
+    timetable = client.get("/room/8/timetable", params=params).json()["data"]
+    assert [entry["reservation_id"] for entry in timetable["entries"]] == [created.json()["data"]["id"]]
+    assert timetable["days"][2]["blocks"][0] == [0]
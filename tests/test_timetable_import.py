@@ -0,0 +1,71 @@
+import io
+import sqlite3
+
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+
+from models import SessionLocal, engine, RoomReservation
+from services.timetable_import import import_timetable
+
+HEADER = "lecturer,course,building,room,date,start_block,end_block\n"
+
+
+def csv_file(*rows: str) -> io.StringIO:
+    return io.StringIO(HEADER + "\n".join(rows) + "\n")
+
+
+def reservation_count(room_id: int) -> int:
+    with SessionLocal() as session:
+        return session.scalar(select(func.count(RoomReservation.id)).where(RoomReservation.room_id == room_id))
+
+
+def test_import_reports_rejected_rows(client, auth_headers):
+    upload = csv_file(
+        "lecturer1,Imported,B1,R10,2026-06-01,BLOCK_1,BLOCK_2",
+        "lecturer1,Imported,B1,R10,2026-06-02,BLOCK_1,BLOCK_2",
+        "lecturer1,Other,B1,R10,2026-06-02,BLOCK_2,BLOCK_3",
+        "nobody,Imported,B1,R10,2026-06-03,BLOCK_1,BLOCK_2",
+        "lecturer1,Imported,B1,R99,2026-06-03,BLOCK_1,BLOCK_2",
+        "lecturer1,Imported,B1,R10,06/03/2026,BLOCK_1,BLOCK_2",
+        "lecturer0,Seeded,B0,R00,2024-01-01,BLOCK_1,BLOCK_1",
+    )
+
+    response = client.post(
+        "/reservation/import", files={"file": ("timetable.csv", upload.getvalue(), "text/csv")}, headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    result = response.json()["data"]
+    assert (result["rows"], result["imported"], result["rejected"], result["schedules_created"]) == (7, 2, 5, 1)
+    assert [(error["line"], error["error_message"]) for error in result["errors"]] == [
+        (4, "Room is already reserved!"),
+        (5, "Lecturer nobody is not found!"),
+        (6, "Room R99 in building B1 is not found!"),
+        (7, "time data '06/03/2026' does not match format '%Y-%m-%d'"),
+        (8, "Room is already reserved!"),
+    ]
+
+
+def test_import_retries_a_chunk_that_lost_a_race(client):
+    failed = []
+
+    def lose_race(conn, cursor, statement, *args):
+        if statement.startswith("INSERT INTO room_occupancies") and not failed:
+            failed.append(statement)
+            raise IntegrityError(statement, None, sqlite3.IntegrityError("UNIQUE constraint failed: room_occupancies"))
+
+    before = reservation_count(8)
+    event.listen(engine, "before_cursor_execute", lose_race)
+    try:
+        with SessionLocal() as session:
+            summary = import_timetable(
+                session,
+                csv_file(*(f"lecturer2,Raced,B2,R21,2026-06-{day:02d},BLOCK_3,BLOCK_4" for day in range(1, 6))),
+                chunk_size=2,
+            )
+    finally:
+        event.remove(engine, "before_cursor_execute", lose_race)
+
+    assert failed
+    assert (summary.rows, summary.imported, summary.rejected) == (5, 5, 0)
+    assert reservation_count(8) - before == 5
@@ -0,0 +1,115 @@
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from models import SessionLocal, Building, Room, RoomOccupancy
+from services.utilization import BLOCKS, room_utilization
+
+START = date(2030, 1, 7)
+DAYS = 45
+# a third of the 3,000-room campus the one second budget is set for, the report scales with the rows
+BUDGET_ROOMS = 1000
+BUDGET_SECONDS = 1.0
+
+
+def reference(rooms, masks, days):
+    # every share counted slot by slot
+    def rate(slots):
+        slots = list(slots)
+        return round(sum(slots) / len(slots), 4) if slots else 0.0
+
+    def taken(room_id, day, block):
+        return masks.get((room_id, day), 0) >> block & 1
+
+    all_days = [START + timedelta(days=offset) for offset in range(days)]
+    return {
+        "block_rates": [rate(taken(room_id, day, block) for room_id, _ in rooms for day in all_days)
+                        for block in range(len(BLOCKS))],
+        "room_rates": [rate(taken(room_id, day, block) for day in all_days for block in range(len(BLOCKS)))
+                       for room_id, _ in rooms],
+        "weekday_block_rates": [
+            [rate(taken(room_id, day, block) for room_id, _ in rooms for day in all_days if day.weekday() == weekday)
+             for block in range(len(BLOCKS))]
+            for weekday in range(7)
+        ],
+        "idle_room_ids": [room_id for room_id, _ in rooms
+                          if not any(masks.get((room_id, day)) for day in all_days)],
+    }
+
+
+def test_report_matches_slot_by_slot_counts(client):
+    rng = random.Random(23)
+    with SessionLocal() as session:
+        rooms = session.execute(select(Room.id, Room.building_id).order_by(Room.id)).all()
+        masks = {
+            (room_id, START + timedelta(days=offset)): rng.randrange(1, 1 << len(BLOCKS))
+            for room_id, _ in rooms[:-2] for offset in range(DAYS) if rng.random() < 0.5
+        }
+        session.execute(insert(RoomOccupancy), [
+            {"room_id": room_id, "date": day, "mask": mask} for (room_id, day), mask in masks.items()
+        ])
+        session.commit()
+        try:
+            report = room_utilization(session, START, START + timedelta(days=DAYS - 1))
+            building = room_utilization(session, START, START + timedelta(days=DAYS - 1), rooms[0].building_id)
+        finally:
+            session.execute(delete(RoomOccupancy).where(RoomOccupancy.date >= START))
+            session.commit()
+
+    expected = reference(rooms, masks, DAYS)
+    assert report.room_ids == [room_id for room_id, _ in rooms]
+    assert report.block_rates == expected["block_rates"]
+    assert report.room_rates == expected["room_rates"]
+    assert report.weekday_block_rates == expected["weekday_block_rates"]
+    assert report.idle_room_ids == expected["idle_room_ids"]
+
+    in_building = [(room_id, building_id) for room_id, building_id in rooms if building_id == rooms[0].building_id]
+    assert building.room_ids == [room_id for room_id, _ in in_building]
+    assert building.block_rates == reference(in_building, masks, DAYS)["block_rates"]
+
+
+def test_a_year_is_accepted_and_longer_ranges_are_not(client):
+    year = client.get("/analytics/utilization", params={"from": "2031-01-01T00:00:00Z", "to": "2031-12-31T00:00:00Z"})
+    longer = client.get("/analytics/utilization", params={"from": "2031-01-01T00:00:00Z", "to": "2032-01-02T00:00:00Z"})
+
+    assert year.status_code == 200
+    assert year.json()["data"]["days"] == 365
+    assert year.json()["data"]["rate"] == 0.0
+    assert longer.status_code == 400
+
+
+def test_a_year_stays_within_the_budget(client):
+    rng = random.Random(366)
+    start = date(2040, 1, 1)
+    with SessionLocal() as session:
+        building = Building(name="Budget", code="BUDGET")
+        session.add(building)
+        session.flush()
+        session.execute(insert(Room.__table__), [
+            {"name": f"Budget {index}", "code": f"BG{index}", "capacity": 30, "building_id": building.id}
+            for index in range(BUDGET_ROOMS)
+        ])
+        room_ids = session.scalars(select(Room.id).where(Room.building_id == building.id)).all()
+        session.execute(insert(RoomOccupancy.__table__), [
+            {"room_id": room_id, "date": start + timedelta(days=offset), "mask": rng.randrange(1, 1 << len(BLOCKS))}
+            for room_id in room_ids for offset in range(366) if rng.random() < 0.6
+        ])
+        session.commit()
+        try:
+            timings = []
+            for _ in range(2):
+                began = time.perf_counter()
+                report = room_utilization(session, start, start + timedelta(days=365))
+                timings.append(time.perf_counter() - began)
+        finally:
+            session.execute(delete(RoomOccupancy).where(RoomOccupancy.room_id.in_(room_ids)))
+            session.execute(delete(Room).where(Room.building_id == building.id))
+            session.execute(delete(Building).where(Building.id == building.id))
+            session.commit()
+
+    assert report.days == 366
+    assert set(room_ids) <= set(report.room_ids)
+    assert 0 < report.rate < 1
+    assert min(timings) < BUDGET_SECONDS
@@ -0,0 +1,94 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional, Sequence
+
+from fastapi import Request, Response
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+
+@dataclass(frozen=True)
+class ResourceVersion:
+    etag: str
+    last_modified: Optional[datetime]
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+        return headers
+
+
+def changes(model, *criteria) -> Select:
+    # max(last_edited) moves on every insert and update, the row count catches deletes
+    return select(func.max(model.last_edited), func.count(model.id)).where(*criteria)
+
+
+# Fingerprints everything a payload is built from in a single round trip, so a revalidation
+# costs one aggregate query instead of loading and serializing the nested DTOs.
+async def resource_version(db: AsyncSession, request: Request, *sources: Select) -> ResourceVersion:
+    columns = []
+    for source in sources:
+        latest, count = source.selected_columns
+        columns.append(source.with_only_columns(latest).scalar_subquery())
+        columns.append(source.with_only_columns(count).scalar_subquery())
+    values = (await db.execute(select(*columns))).one()
+
+    timestamps = [value for value in values[::2] if value is not None]
+    last_modified = max(timestamps).replace(microsecond=0) if timestamps else None
+    # the query string is part of the key: pages and filters of a collection are different representations
+    fingerprint = hashlib.blake2b(f"{request.url.path}?{request.url.query}|{values!r}".encode(), digest_size=12)
+    return ResourceVersion(etag=f'W/"{fingerprint.hexdigest()}"', last_modified=last_modified)
+
+
+async def tables_version(db: AsyncSession, request: Request, models: Sequence[Any], *criteria) -> ResourceVersion:
+    # the first model is the requested resource and is narrowed by criteria, the others are read through relations
+    root, *related = models
+    return await resource_version(db, request, changes(root, *criteria), *(changes(model) for model in related))
+
+
+def content_version(body: bytes, last_modified: Optional[datetime] = None) -> ResourceVersion:
+    # for payloads that are cheaper to rebuild than to fingerprint through aggregates
+    return ResourceVersion(etag=f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"', last_modified=last_modified)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any(
+        (tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()) == opaque
+        for tag in header.split(",")
+    )
+
+
+def is_not_modified(request: Request, version: ResourceVersion) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, version.etag)
+
+    # only consulted without If-None-Match: a deleted row does not move max(last_edited), the ETag notices
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or version.last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since is None:
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return version.last_modified.replace(tzinfo=timezone.utc) <= since.astimezone(timezone.utc)
+
+
+def not_modified_response(version: ResourceVersion) -> Response:
+    return Response(status_code=304, headers=version.headers())
+
+
+def with_version(response: Response, version: ResourceVersion) -> Response:
+    response.headers.update(version.headers())
+    return response
@@ -1,6 +1,39 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from setting import settings
+
+SUPPORTED_SCHEMES = ("argon2", "bcrypt")
+
+
+def build_crypt_context(scheme: str, rounds: Optional[int] = None) -> CryptContext:
+    if scheme not in SUPPORTED_SCHEMES:
+        raise ValueError(f"Unsupported password hash scheme: {scheme}")
+
+    options: Dict[str, Any] = {}
+    if rounds is not None:
+        # pinning min and max to the default makes hashes with any other cost count as outdated
+        options[f"{scheme}__default_rounds"] = rounds
+        options[f"{scheme}__min_rounds"] = rounds
+        options[f"{scheme}__max_rounds"] = rounds
+    if settings.ARGON2_MEMORY_COST is not None:
+        options["argon2__memory_cost"] = settings.ARGON2_MEMORY_COST
+    if settings.ARGON2_PARALLELISM is not None:
+        options["argon2__parallelism"] = settings.ARGON2_PARALLELISM
+
+    return CryptContext(
+        schemes=[scheme] + [other for other in SUPPORTED_SCHEMES if other != scheme],
+        default=scheme,
+        deprecated="auto",
+        **options
+    )
+
+
+pwd_context = build_crypt_context(settings.PASSWORD_HASH_SCHEME, settings.PASSWORD_HASH_ROUNDS)
 
 
 def verify_password(plain_password, hashed_password):
@@ -9,3 +42,74 @@ def verify_password(plain_password, hashed_password):
 
 def get_password_hash(password):
     return pwd_context.hash(password)
+
+
+class PasswordHasherBusy(Exception):
+    message = "Too many password checks in progress, try again later"
+
+
+class PasswordHasher:
+    # bcrypt and argon2 release the GIL while hashing, so a small thread pool keeps the event loop free.
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        if self.pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+
+        submitted = time.perf_counter()
+
+        def job() -> Tuple[Any, float, float]:
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        self.pending += 1
+        try:
+            result, waited, ran = await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self.run_seconds_total += ran
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "pending": self.pending,
+            "queued": max(self.pending - self.workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+            "run_seconds_total": self.run_seconds_total,
+        }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.run(pwd_context.hash, password)
+
+
+# Returns whether the password matches and, when the stored hash uses an outdated scheme or cost,
+# the replacement hash to persist.
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
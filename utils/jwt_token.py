@@ -1,21 +1,71 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Annotated, Optional
+from typing import Annotated, Iterable, Optional
+from urllib.parse import quote, unquote
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 import setting
 from dtos import TokenData
-from models import get_db, Lecturer
+from models import get_async_db, Lecturer
+from utils.cache import TTLCache
+from utils.notifier import build_notifier
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token", scheme_name="JWT")
 
 
+@dataclass(frozen=True)
+class CurrentLecturer:
+    id: int
+    username: str
+    first_name: str
+    last_name: str
+    email: str
+    enabled: bool
+    active: bool
+
+    @classmethod
+    def from_lecturer(cls, lecturer: Lecturer) -> CurrentLecturer:
+        return cls(
+            id=lecturer.id,
+            username=lecturer.username,
+            first_name=lecturer.first_name,
+            last_name=lecturer.last_name,
+            email=lecturer.email,
+            enabled=lecturer.enabled,
+            active=lecturer.active,
+        )
+
+
+current_user_cache: TTLCache[CurrentLecturer] = TTLCache(
+    max_entries=setting.settings.AUTH_CACHE_MAX_ENTRIES,
+    ttl_seconds=setting.settings.AUTH_CACHE_TTL_SECONDS,
+)
+
+
+def forget_current_users(tags: Iterable[str]):
+    for tag in tags:
+        current_user_cache.invalidate(unquote(tag))
+
+
+# renamed, deleted and re-passworded lecturers are dropped by every worker, not only the one that
+# handled the change; a worker that lost its listener clears the whole cache
+current_user_notifier = build_notifier(setting.settings.AUTH_NOTIFY_CHANNEL, on_reset=current_user_cache.clear)
+current_user_notifier.subscribe(forget_current_users)
+
+
+async def invalidate_current_user(*usernames: Optional[str]):
+    # quoted, the notifier joins tags with commas
+    await current_user_notifier.publish(quote(username, safe="") for username in usernames if username is not None)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -27,7 +77,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)):
+async def get_current_user(
+        token: Annotated[str, Depends(oauth2_scheme)],
+        db: AsyncSession = Depends(get_async_db)
+) -> CurrentLecturer:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -41,7 +94,14 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Se
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = db.query(Lecturer).filter(Lecturer.username == token_data.username).one()
+
+    cached = current_user_cache.get(token_data.username)
+    if cached is not None:
+        return cached
+
+    user = await db.scalar(select(Lecturer).filter(Lecturer.username == token_data.username))
     if user is None:
         raise credentials_exception
-    return user
+    snapshot = CurrentLecturer.from_lecturer(user)
+    current_user_cache.set(token_data.username, snapshot)
+    return snapshot
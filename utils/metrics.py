@@ -0,0 +1,217 @@
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from setting import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+QUANTILES = (0.5, 0.95, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels: str) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(labels) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {}
+        self._sums: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = _labels(**labels)
+        with self._lock:
+            counts = self._series.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    # Estimates a quantile from the bucket counts the same way Prometheus' histogram_quantile does.
+    def quantile(self, q: float, labels: Labels) -> float:
+        counts = self._series.get(labels)
+        if not counts or not sum(counts):
+            return 0.0
+        rank = q * sum(counts)
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def expose(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {key: list(counts) for key, counts in self._series.items()}
+            sums = dict(self._sums)
+        for key, counts in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(key, {'le': _format_number(float(bound))})} {cumulative}"
+            cumulative += counts[-1]
+            yield f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(key)} {_format_number(sums[key])}"
+            yield f"{self.name}_count{_format_labels(key)} {cumulative}"
+
+    def expose_quantiles(self, name: str, documentation: str) -> Iterable[str]:
+        yield f"# HELP {name} {documentation}"
+        yield f"# TYPE {name} gauge"
+        with self._lock:
+            for key in sorted(self._series):
+                for q in QUANTILES:
+                    yield f"{name}{_format_labels(key, {'quantile': str(q)})} {_format_number(self.quantile(q, key))}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = _labels(**labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def expose(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(key)} {_format_number(value)}"
+
+
+def gauge(name: str, documentation: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> Iterable[str]:
+    yield f"# HELP {name} {documentation}"
+    yield f"# TYPE {name} gauge"
+    for labels, value in samples:
+        yield f"{name}{_format_labels(_labels(**labels))} {_format_number(value)}"
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds", "Request latency per route.", LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "http_request_sql_queries", "SQL statements executed per request.", QUERY_COUNT_BUCKETS
+)
+requests_total = Counter("http_requests_total", "Requests per route and status code.")
+request_sql_seconds = Counter("http_request_sql_seconds_total", "Time spent executing SQL per route.")
+over_budget_total = Counter(
+    "http_requests_over_query_budget_total", "Requests that executed more SQL statements than SQL_QUERY_BUDGET."
+)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    sql_seconds: float = 0.0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += time.perf_counter() - started
+
+
+def install_sql_hooks(engine: Engine):
+    if not event.contains(engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_metrics(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            request_latency.observe(time.perf_counter() - started, method=method, route=route_path)
+            request_queries.observe(stats.queries, method=method, route=route_path)
+            request_sql_seconds.inc(stats.sql_seconds, method=method, route=route_path)
+            requests_total.inc(method=method, route=route_path, status=str(status_code))
+            if settings.SQL_QUERY_BUDGET and stats.queries > settings.SQL_QUERY_BUDGET:
+                over_budget_total.inc(method=method, route=route_path)
+                logger.warning(
+                    "%s %s executed %d SQL statements, budget is %d",
+                    method, route_path, stats.queries, settings.SQL_QUERY_BUDGET
+                )
+
+
+def render_metrics(extra: Iterable[Iterable[str]] = ()) -> str:
+    lines: List[str] = []
+    for family in (
+            request_latency.expose(),
+            request_latency.expose_quantiles(
+                "http_request_duration_quantile_seconds", "Latency quantiles estimated from the histogram."
+            ),
+            requests_total.expose(),
+            request_queries.expose(),
+            request_sql_seconds.expose(),
+            over_budget_total.expose(),
+            *extra,
+    ):
+        lines.extend(family)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import uuid
+from typing import Callable, Iterable, List, Optional
+
+from sqlalchemy import make_url
+
+from models.base import is_sqlite
+from setting import settings
+
+logger = logging.getLogger(__name__)
+
+Subscriber = Callable[[List[str]], None]
+
+
+class InMemoryNotifier:
+    # Delivers invalidations inside this process only, enough for a single worker and for tests.
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+
+    def _deliver(self, tags: List[str]):
+        for subscriber in self._subscribers:
+            subscriber(tags)
+
+    def subscribe(self, subscriber: Subscriber):
+        self._subscribers.append(subscriber)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, tags: Iterable[str]):
+        self._deliver(list(tags))
+
+
+class PostgresNotifier(InMemoryNotifier):
+    # Fans invalidations out to every worker through LISTEN/NOTIFY. The listening connection is
+    # dedicated to notifications, publishing uses a second one because psycopg serializes all
+    # commands on a connection while it waits for notifies.
+    def __init__(self, conninfo: str, channel: str, on_reset: Optional[Callable[[], None]] = None):
+        super().__init__()
+        self.conninfo = conninfo
+        self.channel = channel
+        self.on_reset = on_reset
+        # payloads carry the publishing process, which already delivered them locally and skips the loopback
+        self.origin = uuid.uuid4().hex
+        self._listen_task: Optional[asyncio.Task] = None
+        self._publisher = None
+        self._publish_lock: Optional[asyncio.Lock] = None
+
+    async def start(self):
+        # created on the running loop, Python 3.9 binds locks to the loop current at construction
+        self._publish_lock = asyncio.Lock()
+        self._listen_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            try:
+                await self._listen_task
+            except asyncio.CancelledError:
+                pass
+        if self._publisher is not None:
+            await self._publisher.close()
+
+    async def _listen(self):
+        import psycopg
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as connection:
+                    await connection.execute(f'LISTEN "{self.channel}"')
+                    # anything published while we were disconnected is lost, start from a clean slate
+                    if self.on_reset is not None:
+                        self.on_reset()
+                    async for notify in connection.notifies():
+                        self.receive(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                logger.warning("Invalidation listener on %s disconnected: %s", self.channel, ex)
+                await asyncio.sleep(1)
+
+    def receive(self, payload: str):
+        origin, _, joined = payload.partition("|")
+        if origin != self.origin:
+            self._deliver([tag for tag in joined.split(",") if tag])
+
+    async def publish(self, tags: Iterable[str]):
+        import psycopg
+
+        tags = list(tags)
+        # this worker delivers right away instead of waiting for its own notification to loop back
+        await super().publish(tags)
+        if self._publish_lock is None:
+            return
+        payload = f"{self.origin}|{','.join(tags)}"
+        async with self._publish_lock:
+            try:
+                if self._publisher is None or self._publisher.closed:
+                    self._publisher = await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True)
+                await self._publisher.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+            except Exception as ex:
+                # other workers fall back to the cache TTL, the write itself already committed
+                logger.warning("Could not publish invalidation %s on %s: %s", payload, self.channel, ex)
+
+
+def build_notifier(channel: str, on_reset: Optional[Callable[[], None]] = None):
+    url = settings.SQLALCHEMY_DATABASE_URI
+    backend = settings.NOTIFIER
+    if backend == "auto":
+        backend = "memory" if is_sqlite(url) else "postgres"
+    if backend == "postgres":
+        conninfo = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        return PostgresNotifier(conninfo, channel, on_reset=on_reset)
+    return InMemoryNotifier()
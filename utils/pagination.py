@@ -0,0 +1,38 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Select
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload: Dict[str, Any] = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(payload["id"])
+    except (ValueError, KeyError, TypeError) as ex:
+        raise InvalidCursor("Invalid cursor") from ex
+
+
+# Pages by primary key when a cursor is given, otherwise keeps the old offset paging.
+# One extra row is fetched to know whether a next page exists.
+def paginate(query: Select, id_column, skip: int, limit: int, cursor: Optional[str]) -> Select:
+    if cursor is None:
+        return query.order_by(id_column).offset(skip).limit(limit + 1)
+    return query.where(id_column > decode_cursor(cursor)).order_by(id_column).limit(limit + 1)
+
+
+def split_page(rows: Sequence[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    if len(rows) <= limit:
+        return list(rows), None
+    page = list(rows[:limit])
+    return page, encode_cursor(page[-1].id)
@@ -1,8 +1,21 @@
-from starlette.responses import JSONResponse
+from typing import Any, Optional
+
+from pydantic_core import to_json
+from starlette.responses import Response
 
 from dtos import ResponseEntity
 
 
+class EntityResponse(Response):
+    # Serializes pydantic models (and plain JSON data) straight to bytes in one pass.
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
+
+
 def exception_to_string(ex: Exception):
     if hasattr(ex, 'message'):
         msg = ex.message
@@ -11,25 +24,26 @@ def exception_to_string(ex: Exception):
     return msg
 
 
-def response(code: int, response_entity: ResponseEntity) -> JSONResponse:
-    return JSONResponse(
+def response(code: int, response_entity: ResponseEntity) -> EntityResponse:
+    return EntityResponse(
         status_code=code,
-        content=response_entity.model_dump()
+        content=response_entity
     )
 
 
-def success_response(code, data: object) -> JSONResponse:
+def success_response(code, data: object, next_cursor: Optional[str] = None) -> EntityResponse:
     return response(
         code=code,
         response_entity=ResponseEntity(
             status=True,
             error_message=None,
-            data=data
+            data=data,
+            next_cursor=next_cursor
         )
     )
 
 
-def error_response(code: int, msg: str) -> JSONResponse:
+def error_response(code: int, msg: str) -> EntityResponse:
     return response(
         code=code,
         response_entity=ResponseEntity(